@@ -3,15 +3,29 @@ Terra Scout Bridge Module
 Provides communication between Python agent and Mineflayer bot
 """
 
-from .client import BridgeClient, AsyncBridgeClient
+from .client import BridgeClient, BinaryBridgeClient, AsyncBridgeClient
+from .backends import BridgeBackend, WebSocketBackend, InProcessBackend, make_backend
 from .environment import TerraScoutEnv
+from .async_env import AsyncTerraScoutVecEnv
 from .observations import ObservationProcessor
 from .rewards import RewardCalculator
+from .latency import LatencyHistogram
+from .timing import StepTimer
+from .voxel_map import VoxelMap
 
 __all__ = [
     "BridgeClient", 
+    "BinaryBridgeClient",
     "AsyncBridgeClient", 
+    "BridgeBackend",
+    "WebSocketBackend",
+    "InProcessBackend",
+    "make_backend",
     "TerraScoutEnv",
+    "AsyncTerraScoutVecEnv",
     "ObservationProcessor",
     "RewardCalculator",
+    "LatencyHistogram",
+    "StepTimer",
+    "VoxelMap",
 ]
\ No newline at end of file
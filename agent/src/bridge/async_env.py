@@ -0,0 +1,162 @@
+"""
+Terra Scout Async Vector Environment
+Steps many Mineflayer bots concurrently over WebSockets
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from gymnasium import spaces
+
+from .backends import BridgeBackend
+from .client import AsyncBridgeClient
+from .environment import TerraScoutEnv
+
+# TerraScoutEnv kwargs the async loop does not implement, with their defaults
+UNSUPPORTED_ENV_KWARGS: Dict[str, Any] = {
+    "backend": None,
+    "protocol": "http",
+    "client_kwargs": None,
+    "action_repeat": 1,
+    "pipeline": False,
+    "prefetch_reset": False,
+}
+
+
+def bot_addresses(
+    hosts: Union[str, Sequence[str]] = "localhost",
+    ports: Sequence[int] = (3000,),
+) -> List[Tuple[str, int]]:
+    """Pair hosts with ports. A single host is shared by every port."""
+    if isinstance(hosts, str):
+        return [(hosts, port) for port in ports]
+    if len(hosts) != len(ports):
+        raise ValueError(f"Got {len(hosts)} hosts for {len(ports)} ports")
+    return list(zip(hosts, ports))
+
+
+class _DetachedBackend(BridgeBackend):
+    """
+    Backend of the per-bot envs: AsyncTerraScoutVecEnv talks to the bots
+    itself, so the envs never open a connection of their own.
+    """
+    
+    def reset(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {"error": "Reset through AsyncTerraScoutVecEnv"}
+    
+    def step(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        return {"error": "Step through AsyncTerraScoutVecEnv"}
+    
+    def get_observation(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+class AsyncTerraScoutVecEnv:
+    """
+    Drives one Terra Scout bot per (host, port) from a single asyncio loop.
+    
+    Each step sends every action at once with asyncio.gather, so an N-bot
+    step costs about the latency of the slowest bot. Observation, reward
+    and smart action logic are the per-bot TerraScoutEnv's; observations of
+    all bots are built with one batched ObservationProcessor call.
+    
+    Envs that finish are reset in the same call (auto-reset): their final
+    observation is returned in info["terminal_observation"] and their row
+    of the returned observations is the first one of the next episode.
+    
+    env_kwargs go to every TerraScoutEnv. The connection options in
+    UNSUPPORTED_ENV_KWARGS (backend, action_repeat, pipeline,
+    prefetch_reset, ...) raise ValueError unless left at their defaults.
+    With block_format="delta" a missed frame cannot be refetched, so that
+    step's observation is empty until the next keyframe.
+    """
+    
+    def __init__(
+        self,
+        hosts: Union[str, Sequence[str]] = "localhost",
+        ports: Sequence[int] = (3000,),
+        **env_kwargs: Any,
+    ):
+        unsupported = sorted(
+            name for name, default in UNSUPPORTED_ENV_KWARGS.items()
+            if name in env_kwargs and env_kwargs[name] != default
+        )
+        if unsupported:
+            raise ValueError(f"AsyncTerraScoutVecEnv does not support {', '.join(unsupported)}")
+        env_kwargs = {name: value for name, value in env_kwargs.items() if name not in UNSUPPORTED_ENV_KWARGS}
+        
+        self.addresses = bot_addresses(hosts, ports)
+        self.num_envs = len(self.addresses)
+        self.envs = [
+            TerraScoutEnv(host, port, backend=_DetachedBackend(), **env_kwargs)
+            for host, port in self.addresses
+        ]
+        self.clients = [AsyncBridgeClient(host, port) for host, port in self.addresses]
+        
+        self.action_space = self.envs[0].action_space
+        self.observation_space: spaces.Box = self.envs[0].observation_space  # type: ignore
+        self._obs = np.zeros((self.num_envs, 35), dtype=np.float32)
+    
+    async def connect(self):
+        """Open the WebSocket of every bot."""
+        await asyncio.gather(*(client.connect() for client in self.clients))
+    
+    async def reset(self) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Reset every bot concurrently."""
+        infos = await self._reset_envs(range(self.num_envs))
+        return self._obs.copy(), infos
+    
+    async def step(
+        self, actions: Union[Sequence[int], np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """Step every bot concurrently, auto-resetting finished ones."""
+        prepared = [env._begin_step(action) for env, action in zip(self.envs, actions)]
+        results = await asyncio.gather(*(
+            self._bridge_step(i, action_dict)
+            for i, (_, _, action_dict) in enumerate(prepared)
+        ))
+        
+        rewards, terminated, truncated, infos = TerraScoutEnv.finish_step_batch(
+            self.envs, prepared, results, self._obs
+        )
+        
+        done = np.flatnonzero(terminated | truncated)
+        if len(done):
+            for i in done:
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+            reset_infos = await self._reset_envs(done)
+            for i, reset_info in zip(done, reset_infos):
+                infos[i]["reset_info"] = reset_info
+        
+        return self._obs.copy(), rewards, terminated, truncated, infos
+    
+    async def _bridge_step(self, i: int, action_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one bot its action, timing the round-trip."""
+        start = time.perf_counter_ns()
+        result = await self.clients[i].send_action(action_dict)
+        self.envs[i].timer.add_bridge(time.perf_counter_ns() - start, 0)
+        return result
+    
+    async def _reset_envs(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """Reset the given envs concurrently and write their first observations."""
+        indices = list(indices)
+        results = await asyncio.gather(*(
+            self.clients[i].reset(self.envs[i]._begin_reset()) for i in indices
+        ))
+        
+        obs = np.zeros((len(indices), 35), dtype=np.float32)
+        infos = TerraScoutEnv.finish_reset_batch([self.envs[i] for i in indices], results, obs)
+        self._obs[indices] = obs
+        return infos
+    
+    def get_timing_stats(self) -> List[Dict[str, Dict[str, float]]]:
+        """Per-phase step timing stats of every env."""
+        return [env.get_timing_stats() for env in self.envs]
+    
+    async def close(self):
+        """Close every bot connection."""
+        await asyncio.gather(*(client.close() for client in self.clients))
+        for env in self.envs:
+            env.close()
@@ -0,0 +1,213 @@
+"""
+Terra Scout Bridge Backends
+Interchangeable ways for TerraScoutEnv to reach a bot
+"""
+
+import abc
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.logger import get_logger # type: ignore
+from .client import AsyncBridgeClient, BinaryBridgeClient, BridgeClient
+from .latency import LatencyHistogram, endpoint_histograms
+
+logger = get_logger(__name__)
+
+
+class BridgeBackend(abc.ABC):
+    """
+    What TerraScoutEnv needs from a bot connection.
+    
+    reset(options) returns {"observation", "info"} (info: spawn state,
+    confirmed, resetMs), step(action) returns {"observation", "reward",
+    "done", "info"} and step_many(actions, options) returns {"results":
+    [...]}, all as bot.js builds them, or {"error": message} on failure.
+    last_decode_ns is the payload decode time of the last call (0 when
+    nothing is decoded). Subclasses implement reset, step and
+    get_observation; BridgeClient and BinaryBridgeClient have the same
+    interface without subclassing.
+    """
+    
+    last_decode_ns = 0
+    
+    @abc.abstractmethod
+    def reset(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ...
+    
+    @abc.abstractmethod
+    def step(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+    
+    def step_many(
+        self,
+        actions: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute actions back-to-back: {"results": [...]}, stopping after a
+        failed or final step. Backends with a native sequence request
+        override this; here it is one step() per action.
+        """
+        results = []
+        for action in actions:
+            result = self.step(action)
+            results.append(result)
+            if "error" in result or result.get("done"):
+                break
+        return {"results": results}
+    
+    @abc.abstractmethod
+    def get_observation(self) -> Optional[Dict[str, Any]]:
+        ...
+    
+    def close(self):
+        pass
+
+
+class WebSocketBackend(BridgeBackend):
+    """
+    Blocking wrapper around AsyncBridgeClient.
+    
+    The client lives on a private event loop thread; calls hand their
+    coroutine to it and wait, so the backend can be used from any thread
+    (one call at a time). A request that outlives its timeout is
+    cancelled and returned as {"error": "timeout"}.
+    """
+    
+    def __init__(self, host: str = "localhost", port: int = 3000, timeout: float = 10.0):
+        self.timeout = timeout
+        self.client = AsyncBridgeClient(host, port)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=f"terra-scout-ws-{port}", daemon=True
+        )
+        self._thread.start()
+        self._call(self.client.connect())
+    
+    @property
+    def latency(self) -> Dict[str, LatencyHistogram]:
+        return self.client.latency
+    
+    def _call(self, coroutine, timeout: Optional[float] = None) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout or self.timeout)
+    
+    def _request(self, coroutine, timeout: Optional[float] = None, failed: Any = None) -> Any:
+        """_call for bot requests: on timeout the request is cancelled and failed returned."""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout or self.timeout)
+        except concurrent.futures.TimeoutError:
+            # Cancelling drops the pending id, so a late reply is discarded
+            future.cancel()
+            logger.error(f"WebSocket request timed out after {timeout or self.timeout:.1f}s")
+            return failed
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.client.get_latency_stats()
+    
+    def reset(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._request(self.client.reset(options), failed={"error": "timeout"})
+    
+    def step(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request(self.client.send_action(action), failed={"error": "timeout"})
+    
+    def step_many(
+        self,
+        actions: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        # The bot runs the actions in turn, so wait up to timeout for each
+        return self._request(
+            self.client.send_actions(actions, options),
+            self.timeout * max(1, len(actions)),
+            failed={"error": "timeout"},
+        )
+    
+    def get_observation(self) -> Optional[Dict[str, Any]]:
+        return self._request(self.client.get_observation())
+    
+    def close(self):
+        if self.loop.is_running():
+            try:
+                self._call(self.client.close())
+            except Exception as e:
+                logger.warning(f"WebSocket close failed: {e}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+
+
+class InProcessBackend(BridgeBackend):
+    """
+    Runs a SimulatedBot in the calling process.
+    
+    Results are the bot's own dicts, handed to the env with no encoding or
+    copying; grid observations carry the palette id array itself instead
+    of base64 text.
+    """
+    
+    def __init__(self, seed: int = 0, block_format: str = "list"):
+        from ..simulator.bot import SimulatedBot
+        
+        self.bot = SimulatedBot(seed=seed, block_format=block_format)
+        self.bot.raw_grid = True
+        self.latency: Dict[str, LatencyHistogram] = endpoint_histograms()
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        return {endpoint: histogram.summary() for endpoint, histogram in self.latency.items()}
+    
+    def reset(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        start = time.perf_counter_ns()
+        result = {"observation": self.bot.reset(options), "info": self.bot.last_reset}
+        self.latency["/reset"].record_ns(time.perf_counter_ns() - start)
+        return result
+    
+    def step(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter_ns()
+        result = self.bot.step(action)
+        self.latency["/action"].record_ns(time.perf_counter_ns() - start)
+        return result
+    
+    def step_many(
+        self,
+        actions: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        start = time.perf_counter_ns()
+        result = self.bot.step_many(actions, options)
+        self.latency["/actions"].record_ns(time.perf_counter_ns() - start)
+        return result
+    
+    def get_observation(self) -> Optional[Dict[str, Any]]:
+        return self.bot.get_observation()
+
+
+def _sim_backend(host: str, port: int, block_format: str, seed: Optional[int] = None) -> InProcessBackend:
+    # Without a seed every port gets its own world, so vector envs differ
+    return InProcessBackend(seed=port if seed is None else seed, block_format=block_format)
+
+
+# name -> factory(host, port, block_format, **kwargs)
+BACKENDS: Dict[str, Callable[..., Any]] = {
+    "http": lambda host, port, block_format, **kwargs: BridgeClient(host, port, **kwargs),
+    "binary": lambda host, port, block_format, **kwargs: BinaryBridgeClient(host, port, **kwargs),
+    "websocket": lambda host, port, block_format, **kwargs: WebSocketBackend(host, port, **kwargs),
+    "sim": _sim_backend,
+}
+
+
+def make_backend(
+    name: str,
+    host: str = "localhost",
+    port: int = 3000,
+    block_format: str = "list",
+    **kwargs: Any,
+):
+    """Create a backend by name; kwargs go to its constructor."""
+    factory = BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return factory(host, port, block_format, **kwargs)
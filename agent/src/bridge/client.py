@@ -5,23 +5,123 @@ Communicates with the Node.js Mineflayer bot
 
 import asyncio
 import json
-from typing import Any, Dict, Optional
+import socket
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import httpx
 import websockets
 
+try:
+    import msgpack
+except ImportError:  # Optional: framed protocol falls back to JSON frames
+    msgpack = None
+
+try:
+    import h2  # noqa: F401  # Needed by httpx for HTTP/2
+except ImportError:
+    h2 = None
+
 from ..utils.logger import get_logger # type: ignore
+from .latency import LatencyHistogram, endpoint_histograms
 
 logger = get_logger(__name__)
 
+# Framed protocol: 4-byte big-endian payload length, then the payload
+FRAME_HEADER = struct.Struct(">I")
+
+
+# httpx errors raised before the request reached the bot: safe to retry
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class FrameNotSentError(ConnectionError):
+    """A request frame failed before any of its bytes left: safe to resend."""
+
+
+def _reset_options(options: Optional[Dict[str, Any]], spawn: Union[int, str, None]) -> Dict[str, Any]:
+    """Reset options with the requested spawn state (index or "random") added."""
+    options = dict(options or {})
+    if spawn is not None:
+        options["spawn"] = spawn
+    return options
+
 
 class BridgeClient:
-    """HTTP client for communicating with Terra Scout bot."""
+    """
+    HTTP client for communicating with Terra Scout bot.
     
-    def __init__(self, host: str = "localhost", port: int = 3000):
+    Keeps a pool of keep-alive connections with separate connect, read and
+    write deadlines, and records the round-trip time of every /action,
+    /actions, /reset and /observation request in a per-endpoint
+    LatencyHistogram.
+    """
+    
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 3000,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 10.0,
+        write_timeout: float = 5.0,
+        max_connections: int = 4,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        retry_backoff: float = 0.1,
+    ):
         self.base_url = f"http://{host}:{port}"
         self.ws_url = f"ws://{host}:{port}"
-        self.client = httpx.Client(timeout=10.0)  # Reduced from 30s
+        self.retry_backoff = retry_backoff
+        self.read_timeout = read_timeout
+        
+        if http2 and h2 is None:
+            logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+            http2 = False
+        
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=connect_timeout,
+        )
+        self.client = httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+        )
+        self.latency: Dict[str, LatencyHistogram] = endpoint_histograms()
+        self.last_decode_ns = 0  # JSON decode time of the last response
+    
+    def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send one HTTP request, recording its latency for tracked endpoints."""
+        self.last_decode_ns = 0
+        start = time.perf_counter_ns()
+        response = self.client.request(method, f"{self.base_url}{path}", **kwargs)
+        histogram = self.latency.get(path)
+        if histogram is not None:
+            histogram.record_ns(time.perf_counter_ns() - start)
+        return response
+    
+    def _json(self, response: httpx.Response) -> Any:
+        """Decode a JSON response body, recording the decode time."""
+        start = time.perf_counter_ns()
+        data = response.json()
+        self.last_decode_ns = time.perf_counter_ns() - start
+        return data
+    
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-endpoint request count and mean/p50/p95/p99/max latency in ms."""
+        return {endpoint: histogram.summary() for endpoint, histogram in self.latency.items()}
+    
+    def reset_latency_stats(self):
+        """Clear the latency histograms."""
+        for histogram in self.latency.values():
+            histogram.clear()
         
     def health_check(self) -> bool:
         """Check if bot server is running."""
@@ -34,39 +134,110 @@ class BridgeClient:
     def get_observation(self) -> Optional[Dict[str, Any]]:
         """Get current observation from bot."""
         try:
-            response = self.client.get(f"{self.base_url}/observation")
+            response = self._send("GET", "/observation")
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
             return None
         except Exception as e:
             logger.error(f"Failed to get observation: {e}")
             return None
     
     def step(self, action: Dict[str, Any], max_retries: int = 3) -> Dict[str, Any]:
-        """Execute action and get result with retry logic."""
+        """
+        Execute action and get result.
+        
+        Only failures to connect are retried (with exponential backoff): the
+        action never reached the bot. A read or write failure may leave the
+        action applied, so it is reported instead of sending it twice.
+        """
         for attempt in range(max_retries):
             try:
-                response = self.client.post(
-                    f"{self.base_url}/action",
-                    json=action
-                )
-                return response.json()
-            except Exception as e:
+                response = self._send("POST", "/action", json=action)
+                return self._json(response)
+            except CONNECT_ERRORS as e:
                 if attempt < max_retries - 1:
-                    logger.warning(f"Action attempt {attempt + 1} failed, retrying...")
+                    delay = self.retry_backoff * 2 ** attempt
+                    logger.warning(f"Action attempt {attempt + 1} could not connect, retrying in {delay:.2f}s...")
+                    time.sleep(delay)
                     continue
                 logger.error(f"Failed to execute action after {max_retries} attempts: {e}")
                 return {"error": str(e)}
+            except Exception as e:
+                logger.error(f"Failed to execute action: {e}")
+                return {"error": str(e)}
+    
+    def step_many(
+        self,
+        actions: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Execute a sequence of actions in one round-trip (bot.stepMany).
+        
+        Returns {"results": [step result, ...]} or, with the "aggregate"
+        option, one step result with "substeps". Retried like step(). The
+        read deadline is read_timeout per action.
+        """
+        timeout = httpx.Timeout(
+            connect=self.timeout.connect,
+            read=self.read_timeout * max(1, len(actions)),
+            write=self.timeout.write,
+            pool=self.timeout.pool,
+        )
+        for attempt in range(max_retries):
+            try:
+                response = self._send(
+                    "POST", "/actions", json={**(options or {}), "actions": actions}, timeout=timeout
+                )
+                return self._json(response)
+            except CONNECT_ERRORS as e:
+                if attempt < max_retries - 1:
+                    delay = self.retry_backoff * 2 ** attempt
+                    logger.warning(f"Actions attempt {attempt + 1} could not connect, retrying in {delay:.2f}s...")
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Failed to execute actions after {max_retries} attempts: {e}")
+                return {"error": str(e)}
+            except Exception as e:
+                logger.error(f"Failed to execute actions: {e}")
+                return {"error": str(e)}
     
-    def reset(self) -> Dict[str, Any]:
-        """Reset episode."""
+    def reset(
+        self,
+        options: Optional[Dict[str, Any]] = None,
+        spawn: Union[int, str, None] = None,
+    ) -> Dict[str, Any]:
+        """
+        Reset episode, optionally passing reset options to the bot. spawn
+        picks a validated spawn state by index (see get_spawns) or
+        "random"; the default is the world spawn.
+        """
         try:
-            response = self.client.post(f"{self.base_url}/reset")
-            return response.json()
+            response = self._send("POST", "/reset", json=_reset_options(options, spawn))
+            return self._json(response)
         except Exception as e:
             logger.error(f"Failed to reset: {e}")
             return {"error": str(e)}
     
+    def get_spawns(self) -> List[Dict[str, Any]]:
+        """Spawn states the bot can reset to."""
+        try:
+            response = self.client.get(f"{self.base_url}/spawns")
+            return response.json().get("spawns", [])
+        except Exception as e:
+            logger.error(f"Failed to get spawn states: {e}")
+            return []
+    
+    def add_spawn_state(self) -> Dict[str, Any]:
+        """Save the bot's current position as a spawn state: {"index": i}."""
+        try:
+            response = self.client.post(f"{self.base_url}/spawns")
+            return response.json()
+        except Exception as e:
+            logger.error(f"Failed to add spawn state: {e}")
+            return {"error": str(e)}
+    
     def get_status(self) -> Dict[str, Any]:
         """Get bot status."""
         try:
@@ -99,51 +270,357 @@ class BridgeClient:
         self.client.close()
 
 
+class BinaryBridgeClient(BridgeClient):
+    """
+    Client for the framed bridge protocol.
+    
+    Negotiates an encoding at connect time (MessagePack when both sides
+    have it, else JSON) and sends step/reset/observation requests as
+    length-prefixed frames over one persistent socket. Falls back to JSON
+    over HTTP when the bot does not offer framing or the socket fails.
+    Framed round-trips are recorded in the same latency histograms.
+    """
+    
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 3000,
+        encodings: Optional[List[str]] = None,
+        **http_kwargs: Any,
+    ):
+        super().__init__(host, port, **http_kwargs)
+        self.host = host
+        self.encodings = encodings or (["msgpack", "json"] if msgpack else ["json"])
+        self.encoding: Optional[str] = None
+        self.sock: Optional[socket.socket] = None
+        self._next_id = 0
+        self.negotiate()
+    
+    def negotiate(self) -> bool:
+        """Negotiate framed transport with the bot. Returns True on success."""
+        try:
+            response = self.client.post(
+                f"{self.base_url}/negotiate",
+                json={"encodings": self.encodings},
+            )
+            offer = response.json() if response.status_code == 200 else {}
+        except Exception as e:
+            logger.warning(f"Protocol negotiation failed, using HTTP: {e}")
+            return False
+        
+        if offer.get("transport") != "framed" or offer.get("encoding") not in self.encodings:
+            logger.info("Bot does not offer framed transport, using HTTP")
+            return False
+        
+        try:
+            sock = socket.create_connection((self.host, offer["port"]), timeout=self.read_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock = sock
+            
+            # Hello frame is always JSON
+            self.encoding = "json"
+            self._send_frame({"encoding": offer["encoding"]})
+            reply = self._recv_frame()
+            if reply.get("type") != "hello":
+                raise ConnectionError(reply.get("error", "Handshake rejected"))
+            self.encoding = offer["encoding"]
+        except Exception as e:
+            logger.warning(f"Framed connection failed, using HTTP: {e}")
+            self._drop_socket()
+            return False
+        
+        logger.info(f"Framed protocol connected ({self.encoding})")
+        return True
+    
+    def _encode(self, message: Dict[str, Any]) -> bytes:
+        if self.encoding == "msgpack":
+            return msgpack.packb(message, use_bin_type=True)  # type: ignore
+        return json.dumps(message).encode("utf-8")
+    
+    def _decode(self, payload: bytes) -> Dict[str, Any]:
+        start = time.perf_counter_ns()
+        if self.encoding == "msgpack":
+            message = msgpack.unpackb(payload, raw=False)  # type: ignore
+        else:
+            message = json.loads(payload)
+        self.last_decode_ns = time.perf_counter_ns() - start
+        return message
+    
+    def _send_frame(self, message: Dict[str, Any]):
+        """Send one frame; FrameNotSentError if it failed before any byte was sent."""
+        try:
+            payload = self._encode(message)
+        except (TypeError, ValueError) as e:
+            raise FrameNotSentError(f"Cannot encode frame: {e}") from e
+        view = memoryview(FRAME_HEADER.pack(len(payload)) + payload)
+        sent = 0
+        try:
+            while sent < len(view):
+                sent += self.sock.send(view[sent:])  # type: ignore
+        except OSError as e:
+            if sent == 0:
+                raise FrameNotSentError(str(e)) from e
+            raise
+    
+    def _recv_exact(self, size: int) -> bytes:
+        buf = bytearray(size)
+        view = memoryview(buf)
+        received = 0
+        while received < size:
+            n = self.sock.recv_into(view[received:])  # type: ignore
+            if n == 0:
+                raise ConnectionError("Socket closed by bot")
+            received += n
+        return bytes(buf)
+    
+    def _recv_frame(self) -> Dict[str, Any]:
+        (length,) = FRAME_HEADER.unpack(self._recv_exact(FRAME_HEADER.size))
+        return self._decode(self._recv_exact(length))
+    
+    def _request(self, message: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Send one request frame and return the data of its reply. timeout
+        replaces the socket's read_timeout for this request.
+        """
+        self._next_id += 1
+        message["id"] = self._next_id
+        self.last_decode_ns = 0
+        start = time.perf_counter_ns()
+        self._send_frame(message)
+        if timeout is None:
+            reply = self._recv_frame()
+        else:
+            self.sock.settimeout(timeout)  # type: ignore
+            try:
+                reply = self._recv_frame()
+            finally:
+                if self.sock is not None:
+                    self.sock.settimeout(self.read_timeout)
+        # Transport time only, as for HTTP where decoding follows the request
+        elapsed_ns = time.perf_counter_ns() - start - self.last_decode_ns
+        self.latency[f"/{message['type']}"].record_ns(elapsed_ns)
+        if reply.get("id") != message["id"]:
+            raise ConnectionError(f"Reply id {reply.get('id')} does not match request {message['id']}")
+        if reply.get("type") == "error":
+            raise RuntimeError(reply.get("error"))
+        return reply.get("data")
+    
+    def _drop_socket(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.encoding = None
+    
+    def _framed_call(
+        self,
+        message: Dict[str, Any],
+        fallback: Callable[[], Dict[str, Any]],
+        what: str,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send a request that changes the bot (step, reset) as a frame.
+        Only a frame that never left is resent over HTTP; once it may have
+        reached the bot, a failure is returned as {"error": ...} so the
+        request cannot run twice.
+        """
+        try:
+            return self._request(message, timeout)
+        except FrameNotSentError as e:
+            logger.warning(f"Framed {what} not sent, falling back to HTTP: {e}")
+            self._drop_socket()
+            return fallback()
+        except (OSError, ValueError) as e:
+            logger.error(f"Framed {what} failed after sending, not retrying: {e}")
+            self._drop_socket()
+            return {"error": str(e)}
+        except Exception as e:
+            logger.error(f"Failed to {what}: {e}")
+            return {"error": str(e)}
+    
+    def get_observation(self) -> Optional[Dict[str, Any]]:
+        """Get current observation from bot (read-only, so any failure falls back)."""
+        if self.sock is None:
+            return super().get_observation()
+        try:
+            return self._request({"type": "observation"})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Framed observation failed, falling back to HTTP: {e}")
+            self._drop_socket()
+            return super().get_observation()
+        except Exception as e:
+            logger.error(f"Failed to get observation: {e}")
+            return None
+    
+    def step(self, action: Dict[str, Any], max_retries: int = 3) -> Dict[str, Any]:
+        """Execute action and get result."""
+        if self.sock is None:
+            return super().step(action, max_retries)
+        return self._framed_call(
+            {"type": "action", "action": action},
+            lambda: super(BinaryBridgeClient, self).step(action, max_retries),
+            "execute action",
+        )
+    
+    def step_many(
+        self,
+        actions: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+    ) -> Dict[str, Any]:
+        """Execute a sequence of actions in one round-trip."""
+        if self.sock is None:
+            return super().step_many(actions, options, max_retries)
+        return self._framed_call(
+            {"type": "actions", "actions": actions, "options": options or {}},
+            lambda: super(BinaryBridgeClient, self).step_many(actions, options, max_retries),
+            "execute actions",
+            timeout=self.read_timeout * max(1, len(actions)),
+        )
+    
+    def reset(
+        self,
+        options: Optional[Dict[str, Any]] = None,
+        spawn: Union[int, str, None] = None,
+    ) -> Dict[str, Any]:
+        """Reset episode, optionally passing reset options and a spawn state."""
+        options = _reset_options(options, spawn)
+        if self.sock is None:
+            return super().reset(options)
+        return self._framed_call(
+            {"type": "reset", "options": options},
+            lambda: super(BinaryBridgeClient, self).reset(options),
+            "reset",
+        )
+    
+    def close(self):
+        """Close the socket and the HTTP client."""
+        self._drop_socket()
+        super().close()
+
+
 class AsyncBridgeClient:
-    """Async WebSocket client for real-time communication."""
+    """
+    Async WebSocket client for real-time communication.
+    
+    Every request carries an id that the bot echoes back, so any number of
+    requests can be in flight; a reader task routes each reply to its
+    waiting caller and drops unsolicited broadcasts. Round-trips are
+    recorded in per-endpoint latency histograms, as in BridgeClient.
+    """
     
     def __init__(self, host: str = "localhost", port: int = 3000):
         self.ws_url = f"ws://{host}:{port}"
         self.ws = None
+        self._next_id = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self.latency: Dict[str, LatencyHistogram] = endpoint_histograms()
         
     async def connect(self):
         """Connect to WebSocket server."""
         self.ws = await websockets.connect(self.ws_url)
+        self._reader = asyncio.create_task(self._read_replies())
         logger.info("WebSocket connected")
         
-    async def send_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
-        """Send action and wait for response."""
+    async def _read_replies(self):
+        """Resolve pending requests with the replies carrying their id."""
+        error: Exception = ConnectionError("WebSocket closed")
+        try:
+            async for message in self.ws:  # type: ignore
+                reply = json.loads(message)
+                future = self._pending.pop(reply.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except Exception as e:
+            error = e
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+    
+    async def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its reply."""
         if not self.ws:
             raise RuntimeError("WebSocket not connected")
             
-        await self.ws.send(json.dumps({
-            "type": "action",
-            "action": action
-        }))
+        self._next_id += 1
+        message["id"] = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message["id"]] = future
         
-        response = await self.ws.recv()
-        return json.loads(response)
+        start = time.perf_counter_ns()
+        try:
+            await self.ws.send(json.dumps(message))
+            reply = await future
+        finally:
+            self._pending.pop(message["id"], None)
+        self.latency[f"/{message['type']}"].record_ns(time.perf_counter_ns() - start)
+        return reply
     
-    async def reset(self) -> Dict[str, Any]:
-        """Reset episode."""
-        if not self.ws:
-            raise RuntimeError("WebSocket not connected")
-            
-        await self.ws.send(json.dumps({"type": "reset"}))
-        response = await self.ws.recv()
-        return json.loads(response)
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-endpoint request count and mean/p50/p95/p99/max latency in ms."""
+        return {endpoint: histogram.summary() for endpoint, histogram in self.latency.items()}
     
-    async def get_observation(self) -> Dict[str, Any]:
-        """Get current observation."""
-        if not self.ws:
-            raise RuntimeError("WebSocket not connected")
+    async def send_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        """Send action and wait for the step result."""
+        try:
+            reply = await self._request({"type": "action", "action": action})
+        except (OSError, websockets.WebSocketException) as e:
+            logger.error(f"Failed to execute action: {e}")
+            return {"error": str(e)}
+        if reply.get("type") == "error":
+            return {"error": reply.get("error")}
+        return reply.get("data") or {}
+    
+    async def send_actions(
+        self,
+        actions: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Send an action sequence and wait for its results (see BridgeClient.step_many)."""
+        try:
+            reply = await self._request({"type": "actions", "actions": actions, "options": options or {}})
+        except (OSError, websockets.WebSocketException) as e:
+            logger.error(f"Failed to execute actions: {e}")
+            return {"error": str(e)}
+        if reply.get("type") == "error":
+            return {"error": reply.get("error")}
+        return reply.get("data") or {}
+    
+    async def reset(
+        self,
+        options: Optional[Dict[str, Any]] = None,
+        spawn: Union[int, str, None] = None,
+    ) -> Dict[str, Any]:
+        """Reset episode, optionally passing reset options and a spawn state."""
+        try:
+            reply = await self._request({"type": "reset", "options": _reset_options(options, spawn)})
+        except (OSError, websockets.WebSocketException) as e:
+            logger.error(f"Failed to reset: {e}")
+            return {"error": str(e)}
+        if reply.get("type") == "error":
+            return {"error": reply.get("error")}
+        return reply.get("data") or {}
             
-        await self.ws.send(json.dumps({"type": "observation"}))
-        response = await self.ws.recv()
-        return json.loads(response)
+    async def get_observation(self) -> Optional[Dict[str, Any]]:
+        """Get current observation."""
+        try:
+            reply = await self._request({"type": "observation"})
+        except (OSError, websockets.WebSocketException) as e:
+            logger.error(f"Failed to get observation: {e}")
+            return None
+        return reply.get("data")
     
     async def close(self):
         """Close WebSocket connection."""
         if self.ws:
             await self.ws.close()
-            self.ws = None
\ No newline at end of file
+            self.ws = None
+        if self._reader:
+            await self._reader
+            self._reader = None
@@ -3,16 +3,21 @@ Terra Scout Gymnasium Environment
 Phase 6: Smart Diamond Hunting System
 """
 
-from typing import Any, Dict, Optional, Tuple, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 import random
+import time
 
 import gymnasium as gym
 import numpy as np
 from gymnasium import spaces
 
-from .client import BridgeClient
-from .observations import ObservationProcessor
+from .backends import BridgeBackend, make_backend
+from .latency import LatencyHistogram
+from .observations import BlockDeltaDecoder, ObservationProcessor
 from .rewards import RewardCalculator
+from .timing import DECODE, INFO, OBSERVATION, OVERLAP, REWARD, StepTimer
+from .voxel_map import VoxelMap
 
 
 class TerraScoutEnv(gym.Env):
@@ -58,18 +63,55 @@ class TerraScoutEnv(gym.Env):
         use_enhanced_obs: bool = True,
         use_enhanced_rewards: bool = True,
         smart_action_bias: bool = True,  # NEW: Enable smart action selection
+        block_format: str = "list",  # "list" (nearbyBlocks), "grid" (palette voxel grid) or "delta" (changes only)
+        protocol: str = "http",  # "http" (JSON) or "binary" (negotiated framed protocol)
+        client_kwargs: Optional[Dict[str, Any]] = None,  # Backend constructor kwargs (timeouts, pooling, sim seed)
+        backend: Union[str, BridgeBackend, None] = None,  # "http", "binary", "websocket", "sim" or an instance; default: protocol
+        info_timings: bool = False,  # Add per-phase step timings (ms) to info["timings"]
+        use_voxel_map: bool = False,  # Accumulate observed blocks in self.voxel_map
+        action_repeat: int = 1,  # Bot actions per env step, sent as one /actions request; rewards are summed
+        pipeline: bool = False,  # Bot runs each action after replying; obs/reward lag the action by one step
+        spawn_state: Union[int, str, None] = None,  # Bot spawn state to reset to (index or "random"); default world spawn
+        prefetch_reset: bool = False,  # Start the bot reset in the background as soon as a step ends the episode
     ):
         super().__init__()
         
-        self.client = BridgeClient(host, port)
+        if action_repeat < 1:
+            raise ValueError(f"action_repeat must be at least 1, got {action_repeat}")
+        if pipeline and action_repeat > 1:
+            raise ValueError("pipeline cannot be combined with action_repeat > 1")
+        if backend is None or isinstance(backend, str):
+            backend = make_backend(backend or protocol, host, port, block_format, **(client_kwargs or {}))
+        self.client = backend
         self.max_steps = max_steps
         self.render_mode = render_mode
         self.current_step = 0
         self.smart_action_bias = smart_action_bias
+        self.block_format = block_format
+        self.info_timings = info_timings
+        self.action_repeat = action_repeat
+        self.pipeline = pipeline
+        self.spawn_state = spawn_state
+        self.timer = StepTimer()
+        self.reset_latency = LatencyHistogram()
+        self.last_reset_ms: Optional[float] = None
+        self.last_reset_prefetched = False
+        
+        # Reset requests started when a step ends the episode, one at a time
+        self.prefetch_reset = prefetch_reset
+        self._reset_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"terra-scout-reset-{port}"
+        ) if prefetch_reset else None
+        self._prefetched_reset: Optional[Future] = None
+        # Pipelined steps seen and their summed action/wait/overlap ms
+        self.pipeline_steps = 0
+        self.pipeline_totals = np.zeros(3, dtype=np.float64)
         
         self.use_enhanced_obs = use_enhanced_obs
         self.use_enhanced_rewards = use_enhanced_rewards
         self.obs_processor = ObservationProcessor() if use_enhanced_obs else None
+        self.delta_decoder = BlockDeltaDecoder() if block_format == "delta" else None
+        self.voxel_map = VoxelMap() if use_voxel_map else None
         self.reward_calculator = RewardCalculator() if use_enhanced_rewards else None
         
         self.prev_raw_obs = None
@@ -84,6 +126,9 @@ class TerraScoutEnv(gym.Env):
         
         # Action mapping
         self.action_map = {i: {"type": name} for i, name in enumerate(self.ACTION_NAMES)}
+        if pipeline:
+            for action_dict in self.action_map.values():
+                action_dict["pipeline"] = True
     
     def _smart_action_override(self, action: int) -> int:
         """
@@ -111,14 +156,20 @@ class TerraScoutEnv(gym.Env):
         
         return action
     
+    def _track_state(self, raw_obs: Dict[str, Any]):
+        """Update state for smart action selection."""
+        pos = raw_obs.get("position", {})
+        self.current_y = pos.get("y", 64)
+        self.diamond_nearby = raw_obs.get("diamondNearby", False)
+        if self.voxel_map is not None:
+            self.voxel_map.observe(raw_obs)
+    
     def _process_observation(self, raw_obs: Dict[str, Any]) -> np.ndarray:
         if raw_obs is None:
             return np.zeros(35, dtype=np.float32)
         
-        # Update state for smart action selection
+        self._track_state(raw_obs)
         pos = raw_obs.get("position", {})
-        self.current_y = pos.get("y", 64)
-        self.diamond_nearby = raw_obs.get("diamondNearby", False)
         
         if self.use_enhanced_obs and self.obs_processor:
             return self.obs_processor.get_flat_observation(raw_obs)
@@ -133,6 +184,90 @@ class TerraScoutEnv(gym.Env):
             float(raw_obs.get("diamondNearby", False)),
         ] + [0.0] * 27, dtype=np.float32)
     
+    @staticmethod
+    def batch_observations(
+        envs: Sequence["TerraScoutEnv"],
+        raw_obs_list: Sequence[Optional[Dict[str, Any]]],
+        out: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Fill out[i] with the observation of envs[i] for raw_obs_list[i].
+        
+        Rows of envs using the enhanced processor are computed together with
+        one ObservationProcessor.process_batch call.
+        """
+        batched = []
+        for i, (env, raw_obs) in enumerate(zip(envs, raw_obs_list)):
+            if raw_obs is not None and env.obs_processor:
+                env._track_state(raw_obs)
+                batched.append(i)
+            else:
+                out[i] = env._process_observation(raw_obs)  # type: ignore
+        
+        if batched:
+            processor = envs[batched[0]].obs_processor
+            processors = [envs[i].obs_processor for i in batched]
+            rows = [raw_obs_list[i] for i in batched]
+            if len(batched) == len(envs):
+                processor.process_batch(rows, out=out, processors=processors)  # type: ignore
+            else:
+                out[batched] = processor.process_batch(rows, processors=processors)  # type: ignore
+        return out
+    
+    @staticmethod
+    def finish_step_batch(
+        envs: Sequence["TerraScoutEnv"],
+        prepared: Sequence[Tuple[int, bool, Dict[str, Any]]],
+        results: Sequence[Dict[str, Any]],
+        out: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """
+        Finish one step of several envs from their _begin_step() output and
+        bridge results. Observations are written to out; returns rewards,
+        terminated, truncated and infos.
+        """
+        n = len(envs)
+        rewards = np.zeros(n, dtype=np.float32)
+        terminated = np.zeros(n, dtype=bool)
+        truncated = np.zeros(n, dtype=bool)
+        infos: List[Dict[str, Any]] = []
+        raw_obs_list: List[Optional[Dict[str, Any]]] = []
+        
+        for i, (env, result, (action_int, was_overridden, _)) in enumerate(
+            zip(envs, results, prepared)
+        ):
+            _, rewards[i], terminated[i], truncated[i], info = env._finish_step(
+                result, action_int, was_overridden, process_obs=False
+            )
+            infos.append(info)
+            raw_obs_list.append(info.get("raw_observation"))
+        
+        # Batched observation time is shared evenly between the envs
+        start = time.perf_counter_ns()
+        TerraScoutEnv.batch_observations(envs, raw_obs_list, out)
+        share = (time.perf_counter_ns() - start) // max(n, 1)
+        for env, info in zip(envs, infos):
+            env.timer.add(OBSERVATION, share)
+            env._end_step_timing(info)
+        return rewards, terminated, truncated, infos
+    
+    @staticmethod
+    def finish_reset_batch(
+        envs: Sequence["TerraScoutEnv"],
+        results: Sequence[Dict[str, Any]],
+        out: np.ndarray,
+    ) -> List[Dict[str, Any]]:
+        """Finish the reset of several envs; observations are written to out."""
+        infos = []
+        raw_obs_list = []
+        for env, result in zip(envs, results):
+            _, info = env._finish_reset(result, process_obs=False)
+            infos.append(info)
+            raw_obs_list.append(info.get("raw_observation"))
+        
+        TerraScoutEnv.batch_observations(envs, raw_obs_list, out)
+        return infos
+    
     def _convert_action(self, action: Union[int, np.ndarray, np.integer]) -> int:
         if isinstance(action, np.ndarray):
             return int(action.item())
@@ -141,6 +276,65 @@ class TerraScoutEnv(gym.Env):
     def reset(self, seed: Optional[int] = None, options: Optional[Dict] = None): # type: ignore
         super().reset(seed=seed)
         
+        result = self._request_reset(options)
+        return self._finish_reset(result)
+    
+    def _request_reset(self, options: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Clear episode state and get the bot's reset result: the prefetched
+        one if a step started it, else from a reset request made now. The
+        time spent blocked here is recorded as the reset latency.
+        """
+        reset_options = self._begin_reset()
+        if options and "spawn" in options:
+            reset_options["spawn"] = options["spawn"]
+        
+        start = time.perf_counter_ns()
+        prefetched = self._take_prefetched_reset()
+        if prefetched is not None and reset_options.get("spawn") == self.spawn_state:
+            result = prefetched
+        else:
+            # Nothing prefetched, or it went to another spawn state
+            result = self.client.reset(reset_options)
+            prefetched = None
+        elapsed_ns = time.perf_counter_ns() - start
+        
+        self.reset_latency.record_ns(elapsed_ns)
+        self.last_reset_ms = elapsed_ns / 1e6
+        self.last_reset_prefetched = prefetched is not None
+        return result
+        
+    def _ends_episode(self, result: Dict[str, Any]) -> bool:
+        """Whether a bridge step result will finish the episode in _finish_step."""
+        steps = self.current_step + result.get("substeps", 1) - 1
+        if "results" in result:
+            if not result["results"]:
+                return False
+            steps = self.current_step + len(result["results"]) - 1
+            result = result["results"][-1]
+        if "error" in result:
+            return False
+        raw_obs = result.get("observation") or {}
+        return bool(result.get("done")) or steps >= self.max_steps or raw_obs.get("diamondsThisEpisode", 0) > 0
+    
+    def _start_prefetch_reset(self):
+        """Send the next episode's reset request in the background."""
+        self._prefetched_reset = self._reset_executor.submit(  # type: ignore
+            self.client.reset, self._reset_options()
+        )
+    
+    def _take_prefetched_reset(self) -> Optional[Dict[str, Any]]:
+        """Wait for a running prefetched reset and return its result."""
+        if self._prefetched_reset is None:
+            return None
+        future, self._prefetched_reset = self._prefetched_reset, None
+        try:
+            return future.result()
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def _begin_reset(self) -> Dict[str, Any]:
+        """Clear episode state. Returns the reset options for the bot."""
         self.current_step = 0
         self.prev_raw_obs = None
         self.current_y = 64
@@ -150,18 +344,83 @@ class TerraScoutEnv(gym.Env):
             self.obs_processor.reset()
         if self.reward_calculator:
             self.reward_calculator.reset()
+        if self.delta_decoder:
+            self.delta_decoder.reset()
+        if self.voxel_map is not None:
+            self.voxel_map.clear()
         
-        result = self.client.reset()
+        self.last_reset_ms = None
+        self.last_reset_prefetched = False
+        return self._reset_options()
+    
+    def _reset_options(self) -> Dict[str, Any]:
+        """Reset options for the bot."""
+        options: Dict[str, Any] = {"blockFormat": self.block_format}
+        if self.spawn_state is not None:
+            options["spawn"] = self.spawn_state
+        return options
         
+    def _finish_reset(self, result: Dict[str, Any], process_obs: bool = True):
+        """
+        Turn a bridge reset result into (obs, info). With process_obs=False
+        the observation is left to the caller (obs is None).
+        """
         if "error" in result:
             return np.zeros(35, dtype=np.float32), {"error": result["error"]}
         
-        raw_obs = result.get("observation")
+        raw_obs = self._decode_delta(result.get("observation"))
         self.prev_raw_obs = raw_obs
         
-        return self._process_observation(raw_obs), {"raw_observation": raw_obs}  # type: ignore
+        obs = self._process_observation(raw_obs) if process_obs else None  # type: ignore
+        info: Dict[str, Any] = {"raw_observation": raw_obs}
+        if self.last_reset_ms is not None:
+            info["reset_ms"] = self.last_reset_ms
+            info["reset_prefetched"] = self.last_reset_prefetched
+        if "info" in result:
+            # Bot side of the reset: spawn state used, confirmed, resetMs
+            info["reset"] = result["info"]
+        return obs, info
     
     def step(self, action):
+        action_int, was_overridden, action_dict = self._begin_step(action)
+        result = self._bridge_step(action_dict)
+        return self._finish_step(result, action_int, was_overridden)
+    
+    def _bridge_step(self, action_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send the action (action_repeat times) to the bot, timing the
+        round-trip. With prefetch_reset, a result that ends the episode
+        starts the next reset right away.
+        """
+        if self._prefetched_reset is not None:
+            # Stepped on without a reset: the bot is reset already; drop it
+            self._take_prefetched_reset()
+        start = time.perf_counter_ns()
+        if self.action_repeat > 1:
+            result = self.client.step_many(*self._repeat_request(action_dict))
+        else:
+            result = self.client.step(action_dict)
+        self.timer.add_bridge(time.perf_counter_ns() - start, self.client.last_decode_ns)
+        if self.prefetch_reset and self._ends_episode(result):
+            self._start_prefetch_reset()
+        return result
+    
+    def _repeat_request(self, action_dict: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Action sequence and options of one action_repeat step."""
+        # Never run past max_steps; only the first action asks for a keyframe
+        count = max(min(self.action_repeat, self.max_steps - self.current_step + 1), 1)
+        repeated = {key: value for key, value in action_dict.items() if key != "keyframe"}
+        options = {
+            # Stop in front of a diamond so the smart override can mine it
+            "stopOnDiamond": self.smart_action_bias,
+            # Intermediate observations are only needed to score or map them
+            "aggregate": self.reward_calculator is None and self.voxel_map is None,
+        }
+        return [action_dict] + [repeated] * (count - 1), options
+    
+    def _begin_step(self, action) -> Tuple[int, bool, Dict[str, Any]]:
+        """Count the step and apply the smart action override."""
+        self.timer.start()
         self.current_step += 1
         
         action_int = self._convert_action(action)
@@ -171,24 +430,65 @@ class TerraScoutEnv(gym.Env):
         action_int = self._smart_action_override(action_int)
         was_overridden = action_int != original_action
         
-        action_dict = self.action_map.get(action_int, {"type": "noop"})
+        action_dict = self.action_map.get(action_int, self.action_map[0])
+        if self.delta_decoder and self.delta_decoder.needs_keyframe:
+            action_dict = {**action_dict, "keyframe": True}
+        return action_int, was_overridden, action_dict
+    
+    def _decode_delta(self, raw_obs: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Rebuild a "delta" format observation from the local block copy."""
+        if self.delta_decoder is None or not raw_obs:
+            return raw_obs
         
-        result = self.client.step(action_dict)
+        start = time.perf_counter_ns()
+        decoded = self.delta_decoder.apply(raw_obs)
+        self.timer.add(DECODE, time.perf_counter_ns() - start)
+        if decoded is None:
+            # Missed a frame: fetch a full observation now, keyframe next step
+            decoded = self.client.get_observation()
+        return decoded
         
+    def _finish_step(
+        self,
+        result: Dict[str, Any],
+        action_int: int,
+        was_overridden: bool,
+        process_obs: bool = True,
+    ):
+        """
+        Turn a bridge step result into (obs, reward, terminated, truncated,
+        info). With process_obs=False the observation is left to the caller
+        (obs is None; info["raw_observation"] holds the raw one), which
+        also tracks its state (voxel map, smart action inputs).
+        """
+        if "results" in result:
+            return self._finish_substeps(result["results"], action_int, was_overridden, process_obs)
         if "error" in result:
             return np.zeros(35, dtype=np.float32), -1.0, True, False, {"error": result["error"]}
         
-        raw_obs = result.get("observation")
+        if "pipeline" in result:
+            self._record_pipeline(result["pipeline"])
         
+        # An aggregated action sequence advances by all its substeps
+        self.current_step += result.get("substeps", 1) - 1
+        raw_obs = self._decode_delta(result.get("observation"))
+        
+        start = time.perf_counter_ns()
         if self.use_enhanced_rewards and self.reward_calculator:
             reward, breakdown = self.reward_calculator.calculate(raw_obs, self.prev_raw_obs)  # type: ignore
         else:
             reward = result.get("reward", 0.0)
             breakdown = {}
+        self.timer.add(REWARD, time.perf_counter_ns() - start)
         
         self.prev_raw_obs = raw_obs
         
-        obs = self._process_observation(raw_obs) # type: ignore
+        if process_obs:
+            start = time.perf_counter_ns()
+            obs = self._process_observation(raw_obs) # type: ignore
+            self.timer.add(OBSERVATION, time.perf_counter_ns() - start)
+        else:
+            obs = None
         done = result.get("done", False)
         truncated = self.current_step >= self.max_steps
         
@@ -196,6 +496,7 @@ class TerraScoutEnv(gym.Env):
         if raw_obs and raw_obs.get("diamondsThisEpisode", 0) > 0:
             done = True
         
+        start = time.perf_counter_ns()
         info = {
             "raw_observation": raw_obs,
             "step_count": self.current_step,
@@ -204,19 +505,114 @@ class TerraScoutEnv(gym.Env):
             "reward_breakdown": breakdown,
             "strategy": raw_obs.get("currentStrategy", "unknown") if raw_obs else "unknown",
             "in_cave": raw_obs.get("inCave", False) if raw_obs else False,
+            "diamonds_found": raw_obs.get("diamondsThisEpisode", 0) if raw_obs else 0,
             "diamond_nearby": self.diamond_nearby,
             "current_y": self.current_y,
         }
         
         if self.reward_calculator:
             info["episode_stats"] = self.reward_calculator.get_stats()
+        if "substeps" in result:
+            info["substeps"] = result["substeps"]
+        self.timer.add(INFO, time.perf_counter_ns() - start)
         
+        if process_obs:
+            self._end_step_timing(info)
         return obs, reward, done, truncated, info
     
+    def _finish_substeps(
+        self,
+        results: List[Dict[str, Any]],
+        action_int: int,
+        was_overridden: bool,
+        process_obs: bool,
+    ):
+        """
+        Finish an action_repeat step from per-substep bridge results: each
+        substep is scored as a step of its own and rewards and breakdowns
+        are summed; observation, flags and info are the last substep's.
+        """
+        if not results:
+            return self._finish_step({"error": "Empty action sequence result"}, action_int, was_overridden)
+        
+        total = 0.0
+        breakdown: Dict[str, float] = {}
+        for i, result in enumerate(results):
+            if i:
+                self.current_step += 1
+            last = i == len(results) - 1
+            obs, reward, terminated, truncated, info = self._finish_step(
+                result, action_int, was_overridden, process_obs=process_obs and last
+            )
+            total += reward
+            for key, value in info.get("reward_breakdown", {}).items():
+                breakdown[key] = breakdown.get(key, 0.0) + value
+            if terminated or truncated:
+                break
+            if not last and info.get("raw_observation"):
+                # Intermediate substep: nobody processes its observation
+                self._track_state(info["raw_observation"])
+                if self.obs_processor:
+                    self.obs_processor.track(info["raw_observation"])
+        
+        if "error" not in info:
+            if process_obs and obs is None:
+                # Episode ended before the bot's sequence did
+                start = time.perf_counter_ns()
+                obs = self._process_observation(info["raw_observation"])
+                self.timer.add(OBSERVATION, time.perf_counter_ns() - start)
+                self._end_step_timing(info)
+            info["reward_breakdown"] = breakdown
+            info["substeps"] = i + 1
+        return obs, total, terminated, truncated, info
+    
+    def _record_pipeline(self, timing: Dict[str, float]):
+        """Account the bot-side timing of a pipelined step."""
+        action_ms = timing.get("actionMs", 0.0)
+        wait_ms = timing.get("waitMs", 0.0)
+        overlap_ms = max(action_ms - wait_ms, 0.0)
+        self.timer.add(OVERLAP, int(overlap_ms * 1e6))
+        self.pipeline_steps += 1
+        self.pipeline_totals += (action_ms, wait_ms, overlap_ms)
+    
+    def _end_step_timing(self, info: Dict[str, Any]):
+        """Commit the timings of the finished step, adding them to info if enabled."""
+        if "error" in info:
+            return
+        timings = self.timer.commit()
+        if self.info_timings:
+            info["timings"] = timings
+    
+    def get_timing_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-phase step time (mean/p50/p95/p99/max ms) over the recent steps."""
+        return self.timer.stats()
+    
+    def get_reset_stats(self) -> Dict[str, float]:
+        """Reset round-trip latency (count, mean/p50/p95/p99/max ms)."""
+        return self.reset_latency.summary()
+    
+    def get_pipeline_stats(self) -> Dict[str, float]:
+        """
+        Bot action time of pipelined steps so far: total ms it ran, ms the
+        next request waited for it, and ms (and fraction) hidden behind the
+        agent's own work.
+        """
+        action_ms, wait_ms, overlap_ms = self.pipeline_totals
+        return {
+            "steps": self.pipeline_steps,
+            "action_ms": float(action_ms),
+            "wait_ms": float(wait_ms),
+            "overlap_ms": float(overlap_ms),
+            "overlap_fraction": float(overlap_ms / action_ms) if action_ms else 0.0,
+        }
+    
     def render(self):
         pass
     
     def close(self):
+        if self._reset_executor is not None:
+            self._take_prefetched_reset()
+            self._reset_executor.shutdown(wait=True)
         self.client.close()
 
 
@@ -226,3 +622,6 @@ gym.register(id="TerraScout-v2", entry_point="agent.src.bridge.environment:Terra
              kwargs={"use_enhanced_obs": True, "use_enhanced_rewards": True})
 gym.register(id="TerraScout-v3", entry_point="agent.src.bridge.environment:TerraScoutEnv",
              kwargs={"use_enhanced_obs": True, "use_enhanced_rewards": True, "smart_action_bias": True})
+gym.register(id="TerraScoutSim-v3", entry_point="agent.src.bridge.environment:TerraScoutEnv",
+             kwargs={"use_enhanced_obs": True, "use_enhanced_rewards": True, "smart_action_bias": True,
+                     "backend": "sim", "block_format": "grid"})
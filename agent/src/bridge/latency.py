@@ -0,0 +1,110 @@
+"""
+Terra Scout Latency Histograms
+HDR-style log-linear histograms for bridge round-trip times
+"""
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+# 2**SUB_BUCKET_BITS linear sub-buckets per power of two: < 1% bucket error
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+# Bridge endpoints every client keeps a histogram for
+ENDPOINTS = ("/action", "/actions", "/reset", "/observation")
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory latency histogram with bounded relative error.
+    
+    Values are recorded in microseconds into log-linear buckets, as in
+    HdrHistogram: every power of two is split into 64-128 linear buckets,
+    so percentiles are within 1% of the true value whatever the range.
+    Recording is O(1) and the histogram never grows.
+    """
+    
+    def __init__(self, max_us: int = 3_600_000_000):
+        self.max_us = max_us
+        self.counts = np.zeros(self._index(max_us) + 1, dtype=np.int64)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.peak_us = 0
+    
+    @staticmethod
+    def _index(value_us: int) -> int:
+        shift = max(value_us.bit_length() - SUB_BUCKET_BITS, 0)
+        return shift * SUB_BUCKET_HALF + (value_us >> shift)
+    
+    @staticmethod
+    def _bucket_values(indices: np.ndarray) -> np.ndarray:
+        """Midpoint value (us) of each bucket index."""
+        shift = np.maximum(indices // SUB_BUCKET_HALF - 1, 0)
+        lower = (indices - shift * SUB_BUCKET_HALF) << shift
+        return lower + ((1 << shift) - 1) / 2
+    
+    def record(self, value_us: int):
+        """Record one latency in microseconds (clamped to max_us)."""
+        value_us = min(max(int(value_us), 0), self.max_us)
+        self.counts[self._index(value_us)] += 1
+        if self.count == 0 or value_us < self.min_us:
+            self.min_us = value_us
+        self.peak_us = max(self.peak_us, value_us)
+        self.count += 1
+        self.total_us += value_us
+    
+    def record_ns(self, elapsed_ns: int):
+        """Record one latency measured with time.perf_counter_ns()."""
+        self.record(elapsed_ns // 1000)
+    
+    def percentiles(self, percents: Iterable[float]) -> np.ndarray:
+        """Latencies (us) at the given percentiles, 0 when empty."""
+        percents = np.asarray(list(percents), dtype=np.float64)
+        if self.count == 0:
+            return np.zeros(len(percents))
+        
+        ranks = np.maximum(np.ceil(percents / 100.0 * self.count), 1)
+        indices = np.searchsorted(np.cumsum(self.counts), ranks)
+        values = self._bucket_values(indices)
+        return np.clip(values, self.min_us, self.peak_us)
+    
+    def percentile(self, percent: float) -> float:
+        """Latency (us) at one percentile."""
+        return float(self.percentiles([percent])[0])
+    
+    def merge(self, other: "LatencyHistogram"):
+        """Add the samples of another histogram with the same range."""
+        if other.count == 0:
+            return
+        self.counts += other.counts
+        self.min_us = other.min_us if self.count == 0 else min(self.min_us, other.min_us)
+        self.peak_us = max(self.peak_us, other.peak_us)
+        self.count += other.count
+        self.total_us += other.total_us
+    
+    def clear(self):
+        """Drop all samples."""
+        self.counts[:] = 0
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.peak_us = 0
+    
+    def summary(self) -> Dict[str, float]:
+        """Count plus mean/p50/p95/p99/max in milliseconds."""
+        p50, p95, p99 = self.percentiles([50, 95, 99]) / 1000.0
+        return {
+            "count": self.count,
+            "mean_ms": self.total_us / self.count / 1000.0 if self.count else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": self.peak_us / 1000.0,
+        }
+
+
+def endpoint_histograms() -> Dict[str, LatencyHistogram]:
+    """One empty histogram per bridge endpoint."""
+    return {endpoint: LatencyHistogram() for endpoint in ENDPOINTS}
@@ -3,9 +3,157 @@ Terra Scout Observation Processing
 Converts raw bot observations into RL-ready format
 """
 
-from typing import Any, Dict, List, Optional, Tuple
+import base64
+from itertools import chain, repeat
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import numpy as np
 
+from ..utils.logger import get_logger # type: ignore
+
+logger = get_logger(__name__)
+
+
+# Flat observation layout: (name, start, stop) for each feature group
+OBS_LAYOUT: Tuple[Tuple[str, int, int], ...] = (
+    ("position", 0, 3),
+    ("health", 3, 4),
+    ("food", 4, 5),
+    ("orientation", 5, 9),
+    ("y_level", 9, 14),
+    ("nearby_blocks", 14, 24),
+    ("inventory", 24, 32),
+    ("exploration", 32, 35),
+)
+OBS_SIZE = 35
+
+
+def decode_block_grid(raw_obs: Dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    Decode the palette-encoded block grid of an observation.
+    
+    The grid arrives as base64 text (JSON) or raw bytes (binary protocols)
+    of little-endian uint16 palette ids indexed [x][y][z]; the returned
+    array is a read-only view of the decoded buffer.
+    """
+    block_grid = raw_obs.get("blockGrid")
+    if block_grid is None:
+        return None
+    
+    data = block_grid["data"]
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    return np.frombuffer(data, dtype="<u2").reshape(block_grid.get("shape", (9, 9, 9)))
+
+
+def nearby_ore_blocks(raw_obs: Dict[str, Any]) -> List[Tuple[str, int, int, int]]:
+    """Get (name, x, y, z) for every ore block near the bot, in either block format."""
+    grid = decode_block_grid(raw_obs)
+    if grid is None:
+        # Name test first: most blocks are not ores
+        return [
+            (b["name"], p.get("x", 0), p.get("y", 0), p.get("z", 0))
+            for b in raw_obs.get("nearbyBlocks", [])
+            if "_ore" in b.get("name", "")
+            for p in (b.get("position", {}),)
+        ]
+    
+    palette = raw_obs.get("blockPalette", [])
+    ore_ids = [i for i, name in enumerate(palette) if "_ore" in name]
+    if not ore_ids:
+        return []
+    
+    flat = grid.ravel()
+    cells = np.flatnonzero(np.isin(flat, ore_ids))
+    xs, ys, zs = np.unravel_index(cells, grid.shape)
+    origin = raw_obs["blockGrid"].get("origin", {})
+    return list(zip(
+        [palette[i] for i in flat[cells].tolist()],
+        (xs + origin.get("x", 0)).tolist(),
+        (ys + origin.get("y", 0)).tolist(),
+        (zs + origin.get("z", 0)).tolist(),
+    ))
+
+
+class BlockDeltaDecoder:
+    """
+    Rebuilds full observations from "delta" block format frames.
+    
+    Keeps a local copy of the bot's neighbourhood (nearbyBlocks) and
+    visible ores, patches it with each frame's added, changed and removed
+    entries, and restores nearbyBlocks/visibleOres in the observation.
+    Frames are numbered; a delta whose base is not the last applied frame
+    means one was missed, so apply() returns None and needs_keyframe is set
+    until the bot sends a keyframe.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Forget the local copy (the next frame must be a keyframe)."""
+        self.seq: Optional[int] = None
+        self.blocks: Dict[Tuple[int, int, int], str] = {}
+        self.ores: Dict[Tuple[int, int, int], Tuple[str, float]] = {}
+        self.needs_keyframe = False
+    
+    def apply(self, raw_obs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Patch the local copy with a frame and return the full observation."""
+        delta = raw_obs.get("blockDelta")
+        if delta is None:
+            return raw_obs
+        
+        if delta.get("keyframe"):
+            self.blocks = {(x, y, z): name for x, y, z, name in delta.get("blocks", [])}
+            self.ores = {(x, y, z): (name, value) for x, y, z, name, value in delta.get("ores", [])}
+        elif self.seq is None or delta.get("base") != self.seq:
+            if not self.needs_keyframe:
+                logger.warning(f"Observation delta {delta.get('seq')} patches frame {delta.get('base')}, "
+                               f"have {self.seq}; requesting keyframe")
+            self.seq = None
+            self.needs_keyframe = True
+            return None
+        else:
+            blocks, ores = self.blocks, self.ores
+            for x, y, z in delta.get("removed", []):
+                blocks.pop((x, y, z), None)
+            for x, y, z, name in chain(delta.get("added", []), delta.get("changed", [])):
+                blocks[(x, y, z)] = name
+            for x, y, z in delta.get("oresRemoved", []):
+                ores.pop((x, y, z), None)
+            for x, y, z, name, value in delta.get("oresAdded", []):
+                ores[(x, y, z)] = (name, value)
+        
+        self.seq = delta.get("seq")
+        self.needs_keyframe = False
+        return self._expand(raw_obs, delta)
+    
+    def _expand(self, raw_obs: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+        obs = {key: value for key, value in raw_obs.items() if key != "blockDelta"}
+        obs["nearbyBlocks"] = [
+            {"name": name, "position": {"x": x, "y": y, "z": z}}
+            for (x, y, z), name in self.blocks.items()
+        ]
+        
+        # Ore distances are offsets from the bot's block, as the bot computes them
+        pos = raw_obs.get("position", {})
+        bx = math.floor(pos.get("x", 0))
+        by = math.floor(pos.get("y", 0))
+        bz = math.floor(pos.get("z", 0))
+        ores = [
+            {
+                "name": name,
+                "position": {"x": x, "y": y, "z": z},
+                "distance": math.sqrt((x - bx) ** 2 + (y - by) ** 2 + (z - bz) ** 2),
+                "value": value,
+            }
+            for (x, y, z), (name, value) in self.ores.items()
+        ]
+        ores.sort(key=lambda ore: ore["value"], reverse=True)
+        obs["visibleOres"] = ores
+        obs["positionDelta"] = delta.get("positionDelta", {"x": 0.0, "y": 0.0, "z": 0.0})
+        return obs
+
 
 class ObservationProcessor:
     """
@@ -34,11 +182,34 @@ class ObservationProcessor:
     # Dangerous blocks
     DANGEROUS_BLOCKS = {"lava", "fire", "cactus", "magma_block", "sweet_berry_bush"}
     
+    # Mineable stone blocks
+    STONE_BLOCKS = {"stone", "deepslate", "granite", "diorite", "andesite"}
+    
     # Diamond Y-level range (1.21+)
     DIAMOND_Y_MIN = -64
     DIAMOND_Y_MAX = 16
     DIAMOND_OPTIMAL_Y = -59
     
+    # Block codes used by the vectorized block features: one code per
+    # valuable ore, followed by the danger / stone / air / other classes
+    ORE_NAMES = list(VALUABLE_ORES)
+    CODE_DANGER = len(ORE_NAMES)
+    CODE_STONE = CODE_DANGER + 1
+    CODE_AIR = CODE_DANGER + 2
+    CODE_OTHER = CODE_DANGER + 3
+    NUM_CODES = CODE_DANGER + 4
+    
+    BLOCK_CODES: Dict[str, int] = {
+        **{name: i for i, name in enumerate(ORE_NAMES)},
+        **dict.fromkeys(DANGEROUS_BLOCKS, CODE_DANGER),
+        **dict.fromkeys(STONE_BLOCKS, CODE_STONE),
+        "air": CODE_AIR,
+        "cave_air": CODE_AIR,
+    }
+    DIAMOND_CODES = np.array(
+        ["diamond" in name for name in ORE_NAMES] + [False] * 4, dtype=bool
+    )
+    
     def __init__(self):
         self.visited_positions = set()
         self.lowest_y = 320  # Track lowest Y reached
@@ -58,157 +229,261 @@ class ObservationProcessor:
         
         Args:
             raw_obs: Raw observation from bot
-            
+        
         Returns:
             Processed observation dict with numpy arrays
         """
         if raw_obs is None:
             return self._empty_observation()
         
-        # Extract position
+        flat = self.get_flat_observation(raw_obs)
+        return {name: flat[start:stop] for name, start, stop in OBS_LAYOUT}
+    
+    def process_batch(
+        self,
+        raw_obs_list: Sequence[Optional[Dict[str, Any]]],
+        out: Optional[np.ndarray] = None,
+        processors: Optional[Sequence["ObservationProcessor"]] = None,
+    ) -> np.ndarray:
+        """
+        Process N raw observations into an (N, 35) float32 array.
+        
+        Block distances and category counts are computed with array
+        operations over the blocks of all observations together.
+        
+        Args:
+            raw_obs_list: Raw observations (None rows get the empty observation)
+            out: Optional preallocated (N, 35) float32 buffer to fill
+            processors: Per-row processors holding episode tracking state.
+                Defaults to this processor for every row, in which case the
+                rows are treated as consecutive steps of one episode.
+        
+        Returns:
+            The filled observation buffer
+        """
+        n = len(raw_obs_list)
+        if out is None:
+            out = np.empty((n, OBS_SIZE), dtype=np.float32)
+        elif out.shape != (n, OBS_SIZE):
+            raise ValueError(f"out must have shape ({n}, {OBS_SIZE}), got {out.shape}")
+        if processors is None:
+            processors = [self] * n
+        
+        positions = np.zeros((n, 3), dtype=np.float64)
+        for i, raw_obs in enumerate(raw_obs_list):
+            row = out[i]
+            if raw_obs is None:
+                self._write_empty(row)
+                continue
+            processors[i]._write_state_features(row, raw_obs)
+            positions[i] = row[0:3]
+        
+        self._write_block_features(out, raw_obs_list, positions, processors)
+        return out
+    
+    def track(self, raw_obs: Dict[str, Any]) -> bool:
+        """
+        Update the episode tracking (start position, lowest Y, visited
+        positions) with one observation. Observations that are not turned
+        into features, such as action_repeat substeps, go through here
+        only. Returns whether the position is new.
+        """
         pos = raw_obs.get("position", {"x": 0, "y": 64, "z": 0})
-        position = np.array([pos["x"], pos["y"], pos["z"]], dtype=np.float32)
+        x, y, z = pos["x"], pos["y"], pos["z"]
         
         # Track start position
         if self.start_position is None:
-            self.start_position = position.copy()
+            self.start_position = np.array((x, y, z), dtype=np.float32)
         
         # Track lowest Y
-        if pos["y"] < self.lowest_y:
-            self.lowest_y = pos["y"]
+        if y < self.lowest_y:
+            self.lowest_y = y
         
         # Track visited positions (discretized)
-        block_pos = (int(pos["x"]), int(pos["y"]), int(pos["z"]))
+        block_pos = (int(x), int(y), int(z))
         is_new_position = block_pos not in self.visited_positions
         self.visited_positions.add(block_pos)
+        return is_new_position
+    
+    def _write_state_features(self, row: np.ndarray, raw_obs: Dict[str, Any]):
+        """Write every non-block feature of one observation into a row."""
+        # Extract position
+        pos = raw_obs.get("position", {"x": 0, "y": 64, "z": 0})
+        x, y, z = pos["x"], pos["y"], pos["z"]
+        row[0:3] = (x, y, z)
+        is_new_position = self.track(raw_obs)
         
-        # Process nearby blocks
-        nearby_blocks = raw_obs.get("nearbyBlocks", [])
-        block_features = self._process_nearby_blocks(nearby_blocks, position)
-        
-        # Process inventory
-        inventory = raw_obs.get("inventory", {})
-        inventory_features = self._process_inventory(inventory)
-        
-        # Health and food
-        health = raw_obs.get("health", 20)
-        food = raw_obs.get("food", 20)
+        # Health and food (normalized)
+        row[3] = raw_obs.get("health", 20) / 20.0
+        row[4] = raw_obs.get("food", 20) / 20.0
         
         # Orientation
         yaw = raw_obs.get("yaw", 0)
         pitch = raw_obs.get("pitch", 0)
+        row[5:9] = (math.sin(yaw), math.cos(yaw), math.sin(pitch), math.cos(pitch))
         
-        # Y-level features
-        y_level_features = self._process_y_level(pos["y"])
-        
-        return {
-            # Core state
-            "position": position,
-            "health": np.array([health / 20.0], dtype=np.float32),  # Normalized
-            "food": np.array([food / 20.0], dtype=np.float32),  # Normalized
-            "orientation": np.array([
-                np.sin(yaw), np.cos(yaw),
-                np.sin(pitch), np.cos(pitch)
-            ], dtype=np.float32),
-            
-            # Y-level info (crucial for diamond finding)
-            "y_level": y_level_features,
-            
-            # Block features
-            "nearby_blocks": block_features,
-            
-            # Inventory
-            "inventory": inventory_features,
-            
-            # Exploration state
-            "exploration": np.array([
-                len(self.visited_positions) / 1000.0,  # Normalized visited count
-                float(is_new_position),  # Is this a new position
-                (self.start_position[1] - pos["y"]) / 100.0 if self.start_position is not None else 0,  # Depth from start
-            ], dtype=np.float32),
-        }
-    
-    def _process_y_level(self, y: float) -> np.ndarray:
-        """Process Y-level into features."""
-        return np.array([
-            y / 320.0,  # Normalized Y
-            float(y <= self.DIAMOND_Y_MAX),  # In diamond zone
-            float(y <= 0),  # Below sea level (deepslate zone)
-            float(self.DIAMOND_Y_MIN <= y <= self.DIAMOND_Y_MAX),  # In optimal range
-            max(0, (self.DIAMOND_Y_MAX - y) / 80.0),  # Progress into diamond zone
-        ], dtype=np.float32)
-    
-    def _process_nearby_blocks(
-        self, 
-        blocks: List[Dict], 
-        position: np.ndarray
-    ) -> np.ndarray:
-        """Process nearby blocks into feature vector."""
-        features = np.zeros(10, dtype=np.float32)
+        # Y-level info (crucial for diamond finding)
+        self._write_y_level(row[9:14], y)
+        
+        # Inventory
+        self._write_inventory(row[24:32], raw_obs.get("inventory", {}))
         
-        ore_count = 0
-        diamond_ore_count = 0
-        danger_count = 0
-        stone_count = 0
-        air_count = 0
+        # Exploration state
+        row[32] = len(self.visited_positions) / 1000.0  # Normalized visited count
+        row[33] = float(is_new_position)  # Is this a new position
+        row[34] = (self.start_position[1] - y) / 100.0  # Depth from start
+    
+    def _write_y_level(self, features: np.ndarray, y: float):
+        """Write Y-level features."""
+        features[0] = y / 320.0  # Normalized Y
+        features[1] = float(y <= self.DIAMOND_Y_MAX)  # In diamond zone
+        features[2] = float(y <= 0)  # Below sea level (deepslate zone)
+        features[3] = float(self.DIAMOND_Y_MIN <= y <= self.DIAMOND_Y_MAX)  # In optimal range
+        features[4] = max(0, (self.DIAMOND_Y_MAX - y) / 80.0)  # Progress into diamond zone
+    
+    def _write_block_features(
+        self,
+        out: np.ndarray,
+        raw_obs_list: Sequence[Optional[Dict[str, Any]]],
+        positions: np.ndarray,
+        processors: Sequence["ObservationProcessor"],
+    ):
+        """Compute nearby block features for all rows with array operations."""
+        n = len(raw_obs_list)
+        grid_rows = []
+        block_lists = []
+        for i, raw_obs in enumerate(raw_obs_list):
+            if raw_obs is not None and "blockGrid" in raw_obs:
+                grid_rows.append(i)
+                block_lists.append(())
+            else:
+                block_lists.append(raw_obs.get("nearbyBlocks", []) if raw_obs is not None else [])
         
-        closest_ore_dist = 100.0
-        closest_diamond_dist = 100.0
+        lengths = np.fromiter(map(len, block_lists), dtype=np.intp, count=n)
+        rows = np.repeat(np.arange(n), lengths)
+        blocks = list(chain.from_iterable(block_lists))
         
-        for block in blocks:
-            name = block.get("name", "")
-            block_pos = block.get("position", {})
-            
-            # Calculate distance
-            bx = block_pos.get("x", 0)
-            by = block_pos.get("y", 0)
-            bz = block_pos.get("z", 0)
-            dist = np.sqrt(
-                (bx - position[0])**2 + 
-                (by - position[1])**2 + 
-                (bz - position[2])**2
+        # Map every block name to its code in one pass
+        codes = np.fromiter(
+            map(self.BLOCK_CODES.get, (b.get("name", "") for b in blocks), repeat(self.CODE_OTHER)),
+            dtype=np.intp,
+            count=len(blocks),
+        )
+        
+        # Per-row counts of every block code
+        counts = np.bincount(
+            rows * self.NUM_CODES + codes, minlength=n * self.NUM_CODES
+        ).reshape(n, self.NUM_CODES)
+        
+        # Distances are only needed for ore blocks
+        ore_mask = codes < self.CODE_DANGER
+        ore_rows = rows[ore_mask]
+        ore_codes = codes[ore_mask]
+        ore_blocks = [blocks[j].get("position", {}) for j in np.flatnonzero(ore_mask).tolist()]
+        coords = np.fromiter(
+            chain.from_iterable((p.get("x", 0), p.get("y", 0), p.get("z", 0)) for p in ore_blocks),
+            dtype=np.float64,
+            count=3 * len(ore_blocks),
+        ).reshape(-1, 3)
+        
+        if grid_rows:
+            ore_rows, ore_codes, coords = self._add_grid_blocks(
+                raw_obs_list, grid_rows, counts, ore_rows, ore_codes, coords
             )
+        
+        self._finish_block_features(out, counts, ore_codes, ore_rows, coords, positions)
+        
+        # Track found ores
+        ore_counts = counts[:, :self.CODE_DANGER]
+        for i in np.flatnonzero(ore_counts.any(axis=1)):
+            ores_found = processors[i].ores_found
+            for code in np.flatnonzero(ore_counts[i]):
+                name = self.ORE_NAMES[code]
+                ores_found[name] = ores_found.get(name, 0) + int(ore_counts[i, code])
+    
+    def _add_grid_blocks(
+        self,
+        raw_obs_list: Sequence[Optional[Dict[str, Any]]],
+        grid_rows: Sequence[int],
+        counts: np.ndarray,
+        ore_rows: np.ndarray,
+        ore_codes: np.ndarray,
+        ore_coords: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Fill block code counts for grid-format rows and append their ores."""
+        rows_parts, codes_parts, coords_parts = [ore_rows], [ore_codes], [ore_coords]
+        
+        for i in grid_rows:
+            raw_obs = raw_obs_list[i]
+            grid = decode_block_grid(raw_obs)  # type: ignore
+            codes = self._palette_codes(raw_obs.get("blockPalette", ["air"]))[grid.ravel()]  # type: ignore
+            counts[i] = np.bincount(codes, minlength=self.NUM_CODES + 1)[:self.NUM_CODES]
             
-            # Count block types
-            if name in self.VALUABLE_ORES:
-                ore_count += 1
-                if dist < closest_ore_dist:
-                    closest_ore_dist = dist
-                    
-                if "diamond" in name:
-                    diamond_ore_count += 1
-                    if dist < closest_diamond_dist:
-                        closest_diamond_dist = dist
-                    
-                # Track found ores
-                self.ores_found[name] = self.ores_found.get(name, 0) + 1
-                    
-            elif name in self.DANGEROUS_BLOCKS:
-                danger_count += 1
-                
-            elif name in ("stone", "deepslate", "granite", "diorite", "andesite"):
-                stone_count += 1
-                
-            elif name == "air" or name == "cave_air":
-                air_count += 1
-        
-        features[0] = min(ore_count / 10.0, 1.0)  # Ore density
-        features[1] = min(diamond_ore_count / 5.0, 1.0)  # Diamond ore density
-        features[2] = min(danger_count / 5.0, 1.0)  # Danger density
-        features[3] = min(stone_count / 50.0, 1.0)  # Stone density (mineable)
-        features[4] = min(air_count / 50.0, 1.0)  # Air density (caves)
-        features[5] = 1.0 - min(closest_ore_dist / 10.0, 1.0)  # Ore proximity
-        features[6] = 1.0 - min(closest_diamond_dist / 10.0, 1.0)  # Diamond proximity
-        features[7] = float(diamond_ore_count > 0)  # Diamond visible
-        features[8] = float(ore_count > 0)  # Any ore visible
-        features[9] = float(danger_count > 0)  # Danger nearby
-        
-        return features
-    
-    def _process_inventory(self, inventory: Dict[str, int]) -> np.ndarray:
-        """Process inventory into feature vector."""
-        features = np.zeros(8, dtype=np.float32)
+            cells = np.flatnonzero(codes < self.CODE_DANGER)
+            origin = raw_obs["blockGrid"].get("origin", {})  # type: ignore
+            coords = np.column_stack(np.unravel_index(cells, grid.shape)).astype(np.float64)  # type: ignore
+            coords += (origin.get("x", 0), origin.get("y", 0), origin.get("z", 0))
+            
+            rows_parts.append(np.full(len(cells), i, dtype=np.intp))
+            codes_parts.append(codes[cells])
+            coords_parts.append(coords)
+        
+        return np.concatenate(rows_parts), np.concatenate(codes_parts), np.concatenate(coords_parts)
+    
+    def _palette_codes(self, palette: Sequence[str]) -> np.ndarray:
+        """
+        Map palette ids to block codes. Air maps to an extra code that is
+        dropped, matching the list format where the bot omits air blocks.
+        """
+        return np.fromiter(
+            (
+                self.NUM_CODES if name in ("air", "cave_air")
+                else self.BLOCK_CODES.get(name, self.CODE_OTHER)
+                for name in palette
+            ),
+            dtype=np.intp,
+            count=len(palette),
+        )
+    
+    def _finish_block_features(
+        self,
+        out: np.ndarray,
+        counts: np.ndarray,
+        ore_codes: np.ndarray,
+        ore_rows: np.ndarray,
+        ore_coords: np.ndarray,
+        positions: np.ndarray,
+    ):
+        """Turn per-row block code counts and ore positions into features."""
+        n = len(out)
+        ore_count = counts[:, :self.CODE_DANGER].sum(axis=1)
+        diamond_ore_count = counts[:, self.DIAMOND_CODES].sum(axis=1)
+        danger_count = counts[:, self.CODE_DANGER]
+        stone_count = counts[:, self.CODE_STONE]
+        air_count = counts[:, self.CODE_AIR]
+        
+        closest_ore_dist = np.full(n, 100.0)
+        closest_diamond_dist = np.full(n, 100.0)
+        if len(ore_rows):
+            dist = np.sqrt(((ore_coords - positions[ore_rows]) ** 2).sum(axis=1))
+            np.minimum.at(closest_ore_dist, ore_rows, dist)
+            is_diamond = self.DIAMOND_CODES[ore_codes]
+            np.minimum.at(closest_diamond_dist, ore_rows[is_diamond], dist[is_diamond])
         
+        features = out[:, 14:24]
+        features[:, 0] = np.minimum(ore_count / 10.0, 1.0)  # Ore density
+        features[:, 1] = np.minimum(diamond_ore_count / 5.0, 1.0)  # Diamond ore density
+        features[:, 2] = np.minimum(danger_count / 5.0, 1.0)  # Danger density
+        features[:, 3] = np.minimum(stone_count / 50.0, 1.0)  # Stone density (mineable)
+        features[:, 4] = np.minimum(air_count / 50.0, 1.0)  # Air density (caves)
+        features[:, 5] = 1.0 - np.minimum(closest_ore_dist / 10.0, 1.0)  # Ore proximity
+        features[:, 6] = 1.0 - np.minimum(closest_diamond_dist / 10.0, 1.0)  # Diamond proximity
+        features[:, 7] = diamond_ore_count > 0  # Diamond visible
+        features[:, 8] = ore_count > 0  # Any ore visible
+        features[:, 9] = danger_count > 0  # Danger nearby
+    
+    def _write_inventory(self, features: np.ndarray, inventory: Dict[str, int]):
+        """Write inventory features."""
         # Key items for diamond finding
         features[0] = min(inventory.get("diamond", 0) / 10.0, 1.0)
         features[1] = min(inventory.get("iron_ingot", 0) / 64.0, 1.0)
@@ -216,35 +491,22 @@ class ObservationProcessor:
         features[3] = min(inventory.get("cobblestone", 0) / 64.0, 1.0)
         features[4] = min(inventory.get("torch", 0) / 64.0, 1.0)
         features[5] = float(inventory.get("diamond", 0) > 0)  # Has diamond
-        features[6] = float(inventory.get("iron_pickaxe", 0) > 0 or 
+        features[6] = float(inventory.get("iron_pickaxe", 0) > 0 or
                           inventory.get("diamond_pickaxe", 0) > 0)  # Has good pickaxe
         features[7] = min(sum(inventory.values()) / 100.0, 1.0)  # Total items
-        
-        return features
+    
+    def _write_empty(self, row: np.ndarray):
+        """Write the empty observation into a row."""
+        row[:] = 0.0
+        row[3] = 1.0  # Health
+        row[4] = 1.0  # Food
     
     def _empty_observation(self) -> Dict[str, np.ndarray]:
         """Return empty observation."""
-        return {
-            "position": np.zeros(3, dtype=np.float32),
-            "health": np.array([1.0], dtype=np.float32),
-            "food": np.array([1.0], dtype=np.float32),
-            "orientation": np.zeros(4, dtype=np.float32),
-            "y_level": np.zeros(5, dtype=np.float32),
-            "nearby_blocks": np.zeros(10, dtype=np.float32),
-            "inventory": np.zeros(8, dtype=np.float32),
-            "exploration": np.zeros(3, dtype=np.float32),
-        }
+        flat = np.empty(OBS_SIZE, dtype=np.float32)
+        self._write_empty(flat)
+        return {name: flat[start:stop] for name, start, stop in OBS_LAYOUT}
     
     def get_flat_observation(self, raw_obs: Dict[str, Any]) -> np.ndarray:
         """Get flattened observation vector."""
-        obs = self.process(raw_obs)
-        return np.concatenate([
-            obs["position"],        # 3
-            obs["health"],          # 1
-            obs["food"],            # 1
-            obs["orientation"],     # 4
-            obs["y_level"],         # 5
-            obs["nearby_blocks"],   # 10
-            obs["inventory"],       # 8
-            obs["exploration"],     # 3
-        ])  # Total: 35
\ No newline at end of file
+        return self.process_batch([raw_obs])[0]  # Total: 35
@@ -4,13 +4,39 @@ Enhanced for survival and mining
 """
 
 from typing import Any, Dict, Optional, Set, Tuple
-import numpy as np
+import math
+
+from .observations import nearby_ore_blocks
+
+# Integer-packed block keys: 26 bits for x/z (world border is +-30M),
+# 12 bits for y (-2048..2047)
+XZ_BITS = 26
+Y_BITS = 12
+XZ_OFFSET = 1 << (XZ_BITS - 1)
+Y_OFFSET = 1 << (Y_BITS - 1)
+
+# Y range whose (x, z) columns count for horizontal exploration
+DIAMOND_DEPTH = (-64, -50)
+
+
+def pack_column(x: int, z: int) -> int:
+    """Pack an (x, z) block column into one int."""
+    return ((x + XZ_OFFSET) << XZ_BITS) | (z + XZ_OFFSET)
+
+
+def pack_position(x: int, y: int, z: int) -> int:
+    """Pack an (x, y, z) block position into one int."""
+    return ((y + Y_OFFSET) << (2 * XZ_BITS)) | pack_column(x, z)
 
 
 class RewardCalculator:
     """
     Calculates rewards for Terra Scout agent.
     Enhanced for survival and actual ore mining.
+    
+    Episode state is kept in incrementally updated sets (packed visited
+    positions, visited (x, z) columns at diamond depth, seen/mined ores),
+    so each step costs the same at step 1 and at step 18,000.
     """
     
     REWARDS = {
@@ -51,16 +77,23 @@ class RewardCalculator:
         "avoided_danger": 0.5,
     }
     
-    def __init__(self):
+    def __init__(self, rewards: Optional[Dict[str, float]] = None):
+        """rewards overrides entries of REWARDS for this calculator."""
+        if rewards:
+            unknown = set(rewards) - set(self.REWARDS)
+            if unknown:
+                raise ValueError(f"Unknown reward keys: {sorted(unknown)}")
+            self.REWARDS = {**self.REWARDS, **rewards}
         self.reset()
     
     def reset(self):
         """Reset for new episode."""
-        self.visited_positions: Set[Tuple[int, int, int]] = set()
+        self.visited_positions: Set[int] = set()  # pack_position keys
+        self.diamond_depth_columns: Set[int] = set()  # pack_column keys of visited positions at diamond depth
         self.lowest_y = 320
         self.entered_diamond_zone = False
-        self.seen_ores: Set[str] = set()
-        self.mined_ores: Set[str] = set()
+        self.seen_ores: Set[Tuple[str, int, int, int]] = set()
+        self.mined_ores: Set[Tuple[str, int, int, int]] = set()
         self.prev_health = 20
         self.prev_position = None
         self.prev_danger_nearby = False
@@ -87,7 +120,7 @@ class RewardCalculator:
         current_y = pos["y"]
         health = observation.get("health", 20)
         inventory = observation.get("inventory", {})
-        nearby_blocks = observation.get("nearbyBlocks", [])
+        ore_blocks = nearby_ore_blocks(observation)
         mined_ores_count = observation.get("minedOresCount", 0)
         danger_nearby = observation.get("dangerNearby", False)
         
@@ -111,11 +144,10 @@ class RewardCalculator:
         current_mined = len(self.mined_ores)
         if mined_ores_count > current_mined:
             # Check what was mined
-            for block in nearby_blocks:
-                ore_key = f"{block.get('name')}_{block.get('position', {})}"
-                if ore_key not in self.mined_ores and "_ore" in block.get("name", ""):
+            for ore_key in ore_blocks:
+                if ore_key not in self.mined_ores:
                     self.mined_ores.add(ore_key)
-                    name = block.get("name", "")
+                    name = ore_key[0]
                     if "diamond" in name:
                         reward += self.REWARDS["mined_diamond_ore"]
                         breakdown["mined_diamond"] = self.REWARDS["mined_diamond_ore"]
@@ -147,7 +179,8 @@ class RewardCalculator:
                 depth_bonus = self.REWARDS["new_depth_record"] * depth_gain * 2.0
             else:
                 depth_bonus = self.REWARDS["new_depth_record"] * depth_gain
-            reward += min(depth_bonus, 10.0)  # Cap at 10 per step
+            depth_bonus = min(depth_bonus, 10.0)  # Cap at 10 per step
+            reward += depth_bonus
             breakdown["new_depth"] = depth_bonus
             self.lowest_y = current_y
         
@@ -162,8 +195,7 @@ class RewardCalculator:
             breakdown["optimal_y"] = self.REWARDS["at_optimal_y"]
             
             # Bonus for horizontal exploration at diamond level
-            block_pos = (int(pos["x"]), int(pos["z"]))  # Ignore Y
-            if block_pos not in [(p[0], p[2]) for p in self.visited_positions if -64 <= p[1] <= -50]:
+            if pack_column(int(pos["x"]), int(pos["z"])) not in self.diamond_depth_columns:
                 reward += self.REWARDS["horizontal_exploration"]
                 breakdown["horizontal_explore"] = self.REWARDS["horizontal_exploration"]
                 self.horizontal_blocks_at_diamond += 1
@@ -175,21 +207,19 @@ class RewardCalculator:
         
         # === Ore visibility ===
         closest_diamond_dist = float('inf')
-        for block in nearby_blocks:
-            name = block.get("name", "")
-            ore_key = f"{name}_{block.get('position', {})}"
+        for ore_key in ore_blocks:
+            name, bx, by, bz = ore_key
             
             # Track closest diamond distance
-            if "diamond" in name and "_ore" in name:
-                block_pos = block.get("position", {})
-                dist = np.sqrt(
-                    (block_pos.get("x", 0) - pos["x"])**2 +
-                    (block_pos.get("y", 0) - pos["y"])**2 +
-                    (block_pos.get("z", 0) - pos["z"])**2
+            if "diamond" in name:
+                dist = math.sqrt(
+                    (bx - pos["x"])**2 +
+                    (by - pos["y"])**2 +
+                    (bz - pos["z"])**2
                 )
                 closest_diamond_dist = min(closest_diamond_dist, dist)
             
-            if "_ore" in name and ore_key not in self.seen_ores:
+            if ore_key not in self.seen_ores:
                 self.seen_ores.add(ore_key)
                 if "diamond" in name:
                     reward += self.REWARDS["diamond_ore_visible"]
@@ -201,13 +231,15 @@ class RewardCalculator:
         # === Approaching diamond bonus ===
         if closest_diamond_dist < float('inf') and closest_diamond_dist < self.prev_closest_diamond_dist:
             approach_bonus = self.REWARDS["approaching_diamond"] * (self.prev_closest_diamond_dist - closest_diamond_dist)
-            reward += min(approach_bonus, 30.0)  # Cap at 30
+            approach_bonus = min(approach_bonus, 30.0)  # Cap at 30 (first sighting is inf)
+            reward += approach_bonus
             breakdown["approaching_diamond"] = approach_bonus
         self.prev_closest_diamond_dist = closest_diamond_dist
         
         # === Exploration ===
-        block_pos = (int(pos["x"]), int(pos["y"]), int(pos["z"]))
-        if block_pos not in self.visited_positions:
+        ix, iy, iz = int(pos["x"]), int(pos["y"]), int(pos["z"])
+        block_key = pack_position(ix, iy, iz)
+        if block_key not in self.visited_positions:
             base_exploration = self.REWARDS["new_block_visited"]
             
             # 10X EXPLORATION BONUS at optimal diamond depth!
@@ -220,7 +252,9 @@ class RewardCalculator:
                 breakdown["exploration"] = exploration_reward
             
             reward += exploration_reward
-            self.visited_positions.add(block_pos)
+            self.visited_positions.add(block_key)
+            if DIAMOND_DEPTH[0] <= iy <= DIAMOND_DEPTH[1]:
+                self.diamond_depth_columns.add(pack_column(ix, iz))
         
         # === MASSIVE bonus for first time exploring at optimal depth ===
         if -59 <= current_y <= -50 and self.horizontal_blocks_at_diamond == 0:
@@ -229,7 +263,7 @@ class RewardCalculator:
         
         # === Stuck detection ===
         if self.prev_position is not None:
-            dist = np.sqrt(
+            dist = math.sqrt(
                 (pos["x"] - self.prev_position["x"])**2 +
                 (pos["y"] - self.prev_position["y"])**2 +
                 (pos["z"] - self.prev_position["z"])**2
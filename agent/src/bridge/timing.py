@@ -0,0 +1,78 @@
+"""
+Terra Scout Step Timing
+Per-phase step durations in a fixed-size ring buffer
+"""
+
+import time
+from typing import Dict
+
+import numpy as np
+
+# Phases of one env step; "total" is the wall time from _begin_step to the end.
+# "overlap" is not part of it: the bot time of a pipelined step that ran
+# while the agent was busy elsewhere
+PHASES = ("io", "decode", "observation", "reward", "info", "total", "overlap")
+IO, DECODE, OBSERVATION, REWARD, INFO, TOTAL, OVERLAP = range(len(PHASES))
+
+
+class StepTimer:
+    """
+    Records how long each phase of an env step takes.
+    
+    Durations are accumulated in nanoseconds (time.perf_counter_ns) into
+    the row of the current step, which commit() moves into a ring buffer
+    of the last `capacity` steps. Recording is a few integer additions,
+    so the timer is always on.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(PHASES)), dtype=np.int64)
+        self.count = 0
+        self._current = [0] * len(PHASES)
+        self._start_ns = time.perf_counter_ns()
+    
+    def start(self):
+        """Begin timing a new step."""
+        self._current = [0] * len(PHASES)
+        self._start_ns = time.perf_counter_ns()
+    
+    def add(self, phase: int, elapsed_ns: int):
+        """Add a duration to a phase of the current step."""
+        self._current[phase] += elapsed_ns
+    
+    def add_bridge(self, elapsed_ns: int, decode_ns: int):
+        """Split one bridge call into transport (io) and payload decode time."""
+        self._current[DECODE] += decode_ns
+        self._current[IO] += max(elapsed_ns - decode_ns, 0)
+    
+    def commit(self) -> Dict[str, float]:
+        """Store the current step in the ring buffer; returns its phases in ms."""
+        self._current[TOTAL] = time.perf_counter_ns() - self._start_ns
+        self.samples[self.count % self.capacity] = self._current
+        self.count += 1
+        return {phase: ns / 1e6 for phase, ns in zip(PHASES, self._current)}
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Mean/p50/p95/p99/max in ms of every phase over the buffered steps."""
+        samples = self.samples[:min(self.count, self.capacity)] / 1e6
+        if len(samples) == 0:
+            return {}
+        
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99], axis=0)
+        means = samples.mean(axis=0)
+        peaks = samples.max(axis=0)
+        return {
+            phase: {
+                "mean_ms": float(means[i]),
+                "p50_ms": float(p50[i]),
+                "p95_ms": float(p95[i]),
+                "p99_ms": float(p99[i]),
+                "max_ms": float(peaks[i]),
+            }
+            for i, phase in enumerate(PHASES)
+        }
+    
+    def clear(self):
+        """Drop all buffered steps."""
+        self.count = 0
@@ -0,0 +1,229 @@
+"""
+Terra Scout Voxel Map
+Sparse, chunk-indexed memory of every block the agent has observed
+"""
+
+from itertools import chain
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .observations import decode_block_grid
+
+SECTION_BITS = 4
+SECTION_SIZE = 1 << SECTION_BITS  # 16x16x16 blocks per section
+SECTION_MASK = SECTION_SIZE - 1
+
+# Half-width of the nearbyBlocks cube the bot scans (9x9x9)
+NEIGHBOURHOOD_RADIUS = 4
+
+# Unit offsets to the 6 face neighbours of a block
+FACE_OFFSETS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+
+class VoxelMap:
+    """
+    Accumulates observed blocks in 16x16x16 uint16 sections keyed by
+    section (chunk) coordinates.
+    
+    Block names are interned to ids; 0 means never observed and 1 is air.
+    Sections are only allocated once a block in them is observed, so
+    memory grows with the explored volume (8 KB per section). Point
+    lookups are one dict access plus an array index; range queries copy
+    the overlapping sections into a dense array and work on that.
+    """
+    
+    UNKNOWN = 0
+    AIR = 1
+    
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        """Forget everything (new episode)."""
+        self.names: List[str] = ["unknown", "air"]
+        self.ids: Dict[str, int] = {"air": self.AIR, "cave_air": self.AIR}
+        self.is_ore = np.zeros(2, dtype=bool)
+        self.sections: Dict[Tuple[int, int, int], np.ndarray] = {}
+    
+    @property
+    def memory_bytes(self) -> int:
+        return sum(section.nbytes for section in self.sections.values())
+    
+    def block_id(self, name: str) -> int:
+        """Id of a block name, interning new names."""
+        block_id = self.ids.get(name)
+        if block_id is None:
+            block_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = block_id
+            self.is_ore = np.append(self.is_ore, "_ore" in name)
+        return block_id
+    
+    # ===== Point lookup =====
+    
+    def get_id(self, x: int, y: int, z: int) -> int:
+        """Block id at a world position (UNKNOWN if never observed)."""
+        section = self.sections.get((x >> SECTION_BITS, y >> SECTION_BITS, z >> SECTION_BITS))
+        if section is None:
+            return self.UNKNOWN
+        return int(section[x & SECTION_MASK, y & SECTION_MASK, z & SECTION_MASK])
+    
+    def get(self, x: int, y: int, z: int) -> Optional[str]:
+        """Block name at a world position, None if never observed."""
+        block_id = self.get_id(x, y, z)
+        return self.names[block_id] if block_id != self.UNKNOWN else None
+    
+    # ===== Updates =====
+    
+    def observe(self, raw_obs: Dict[str, Any]) -> List[Tuple[str, int, int, int]]:
+        """
+        Store the block neighbourhood of an observation (list or grid
+        format). Returns (name, x, y, z) of ore blocks not known before.
+        """
+        grid = decode_block_grid(raw_obs)
+        if grid is not None:
+            palette = raw_obs.get("blockPalette", [])
+            lookup = np.array([self.block_id(name) for name in palette] or [self.AIR], dtype=np.uint16)
+            lookup[0] = self.AIR  # id 0 is air and unloaded blocks
+            origin = raw_obs["blockGrid"].get("origin", {})
+            return self.write(
+                (origin.get("x", 0), origin.get("y", 0), origin.get("z", 0)),
+                lookup[np.minimum(grid, len(lookup) - 1)],
+            )
+        
+        pos = raw_obs.get("position")
+        if not pos:
+            return []
+        
+        # The bot lists every non-air block of the cube, so the rest is air
+        size = 2 * NEIGHBOURHOOD_RADIUS + 1
+        origin = (
+            math.floor(pos.get("x", 0)) - NEIGHBOURHOOD_RADIUS,
+            math.floor(pos.get("y", 0)) - NEIGHBOURHOOD_RADIUS,
+            math.floor(pos.get("z", 0)) - NEIGHBOURHOOD_RADIUS,
+        )
+        cube = np.full((size, size, size), self.AIR, dtype=np.uint16)
+        blocks = raw_obs.get("nearbyBlocks", [])
+        if blocks:
+            positions = [b["position"] for b in blocks]
+            coords = np.fromiter(
+                chain.from_iterable((p["x"], p["y"], p["z"]) for p in positions),
+                dtype=np.int64, count=3 * len(blocks),
+            ).reshape(-1, 3) - origin
+            known = self.ids.get
+            ids = np.fromiter(
+                (known(b["name"]) or self.block_id(b["name"]) for b in blocks),
+                dtype=np.uint16, count=len(blocks),
+            )
+            inside = ((coords >= 0) & (coords < size)).all(axis=1)
+            cube[tuple(coords[inside].T)] = ids[inside]
+        return self.write(origin, cube)
+    
+    def write(self, origin: Sequence[int], cube: np.ndarray) -> List[Tuple[str, int, int, int]]:
+        """
+        Write a dense block of ids with its minimum corner at origin.
+        UNKNOWN cells leave the map unchanged. Returns newly seen ores.
+        """
+        ox, oy, oz = origin
+        sx, sy, sz = cube.shape
+        new_ores: List[Tuple[str, int, int, int]] = []
+        
+        for cx in range(ox >> SECTION_BITS, ((ox + sx - 1) >> SECTION_BITS) + 1):
+            x0, x1 = max(ox, cx << SECTION_BITS), min(ox + sx, (cx + 1) << SECTION_BITS)
+            for cy in range(oy >> SECTION_BITS, ((oy + sy - 1) >> SECTION_BITS) + 1):
+                y0, y1 = max(oy, cy << SECTION_BITS), min(oy + sy, (cy + 1) << SECTION_BITS)
+                for cz in range(oz >> SECTION_BITS, ((oz + sz - 1) >> SECTION_BITS) + 1):
+                    z0, z1 = max(oz, cz << SECTION_BITS), min(oz + sz, (cz + 1) << SECTION_BITS)
+                    
+                    section = self.sections.get((cx, cy, cz))
+                    if section is None:
+                        section = np.zeros((SECTION_SIZE,) * 3, dtype=np.uint16)
+                        self.sections[(cx, cy, cz)] = section
+                    
+                    target = section[
+                        x0 & SECTION_MASK:((x1 - 1) & SECTION_MASK) + 1,
+                        y0 & SECTION_MASK:((y1 - 1) & SECTION_MASK) + 1,
+                        z0 & SECTION_MASK:((z1 - 1) & SECTION_MASK) + 1,
+                    ]
+                    values = cube[x0 - ox:x1 - ox, y0 - oy:y1 - oy, z0 - oz:z1 - oz]
+                    values = np.where(values == self.UNKNOWN, target, values)
+                    
+                    found = self.is_ore[values] & (values != target)
+                    if found.any():
+                        for i, j, k in zip(*np.nonzero(found)):
+                            new_ores.append((self.names[values[i, j, k]], x0 + int(i), y0 + int(j), z0 + int(k)))
+                    target[...] = values
+        return new_ores
+    
+    # ===== Range queries =====
+    
+    def region(self, lo: Sequence[int], hi: Sequence[int]) -> np.ndarray:
+        """Dense ids of the box lo <= (x, y, z) < hi (UNKNOWN where unseen)."""
+        out = np.zeros([h - l for l, h in zip(lo, hi)], dtype=np.uint16)
+        (lx, ly, lz), (hx, hy, hz) = lo, hi
+        for cx in range(lx >> SECTION_BITS, ((hx - 1) >> SECTION_BITS) + 1):
+            x0, x1 = max(lx, cx << SECTION_BITS), min(hx, (cx + 1) << SECTION_BITS)
+            for cy in range(ly >> SECTION_BITS, ((hy - 1) >> SECTION_BITS) + 1):
+                y0, y1 = max(ly, cy << SECTION_BITS), min(hy, (cy + 1) << SECTION_BITS)
+                for cz in range(lz >> SECTION_BITS, ((hz - 1) >> SECTION_BITS) + 1):
+                    section = self.sections.get((cx, cy, cz))
+                    if section is None:
+                        continue
+                    z0, z1 = max(lz, cz << SECTION_BITS), min(hz, (cz + 1) << SECTION_BITS)
+                    out[x0 - lx:x1 - lx, y0 - ly:y1 - ly, z0 - lz:z1 - lz] = section[
+                        x0 & SECTION_MASK:((x1 - 1) & SECTION_MASK) + 1,
+                        y0 & SECTION_MASK:((y1 - 1) & SECTION_MASK) + 1,
+                        z0 & SECTION_MASK:((z1 - 1) & SECTION_MASK) + 1,
+                    ]
+        return out
+    
+    def _box(self, center: Sequence[float], radius: float) -> Tuple[List[int], List[int]]:
+        lo = [math.floor(c - radius) for c in center]
+        hi = [math.floor(c + radius) + 1 for c in center]
+        return lo, hi
+    
+    def ores_within(
+        self, center: Sequence[float], radius: float
+    ) -> List[Tuple[str, int, int, int]]:
+        """(name, x, y, z) of known ore blocks within radius, nearest first."""
+        lo, hi = self._box(center, radius)
+        ids = self.region(lo, hi)
+        cells = np.argwhere(self.is_ore[ids])
+        if len(cells) == 0:
+            return []
+        
+        coords = cells + lo
+        dist_sq = ((coords - np.asarray(center, dtype=np.float64)) ** 2).sum(axis=1)
+        order = np.argsort(dist_sq, kind="stable")
+        order = order[dist_sq[order] <= radius * radius]
+        return [
+            (self.names[ids[tuple(cells[i])]], *map(int, coords[i]))
+            for i in order
+        ]
+    
+    def _frontier_mask(self, center: Sequence[float], radius: float) -> Tuple[np.ndarray, List[int]]:
+        """Per-cell count of unknown face neighbours of known air in the box."""
+        lo, hi = self._box(center, radius)
+        ids = self.region([l - 1 for l in lo], [h + 1 for h in hi])
+        unknown = ids == self.UNKNOWN
+        faces = np.zeros([h - l for l, h in zip(lo, hi)], dtype=np.int8)
+        for dx, dy, dz in FACE_OFFSETS:
+            faces += unknown[
+                1 + dx:unknown.shape[0] - 1 + dx,
+                1 + dy:unknown.shape[1] - 1 + dy,
+                1 + dz:unknown.shape[2] - 1 + dz,
+            ]
+        faces *= ids[1:-1, 1:-1, 1:-1] == self.AIR
+        return faces, lo
+    
+    def unexplored_faces(self, center: Sequence[float], radius: float) -> int:
+        """Number of air/unknown block faces in the box of half-width radius."""
+        faces, _ = self._frontier_mask(center, radius)
+        return int(faces.sum(dtype=np.int64))
+    
+    def frontier(self, center: Sequence[float], radius: float) -> np.ndarray:
+        """(K, 3) world positions of known air blocks next to unobserved ones."""
+        faces, lo = self._frontier_mask(center, radius)
+        return np.argwhere(faces > 0) + lo
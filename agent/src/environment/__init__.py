@@ -1,3 +1,20 @@
 ﻿"""
 Terra Scout Environment Wrappers
 """
+
+from .recorder import TrajectoryReader, TrajectoryRecorder, TrajectoryWriter, VecTrajectoryRecorder
+from .replay import ReplayBackend, TerraScoutReplayEnv, make_replay_vec_env
+from .sim_vec_env import TerraScoutSimVecEnv
+from .vec_env import TerraScoutVecEnv
+
+__all__ = [
+    "TerraScoutVecEnv",
+    "TerraScoutSimVecEnv",
+    "TrajectoryRecorder",
+    "VecTrajectoryRecorder",
+    "TrajectoryWriter",
+    "TrajectoryReader",
+    "TerraScoutReplayEnv",
+    "ReplayBackend",
+    "make_replay_vec_env",
+]
@@ -0,0 +1,563 @@
+"""
+Terra Scout Trajectory Recorder
+Chunked, compressed, memory-mappable episode files
+"""
+
+import base64
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import queue
+import shutil
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import zlib
+
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnvWrapper
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, VecEnvStepReturn
+
+from ..bridge.environment import TerraScoutEnv
+from ..utils.logger import get_logger # type: ignore
+
+logger = get_logger(__name__)
+
+FORMAT = "terra-scout-trajectory"
+VERSION = 1
+MANIFEST = "manifest.json"
+
+# Fixed-size per-step columns: name -> dtype (obs is (steps, obs_dim))
+COLUMNS = {
+    "obs": np.float32,
+    "action": np.int16,         # policy action, -1 on reset rows
+    "taken_action": np.int16,   # action sent to the bot (after smart override)
+    "reward": np.float64,
+    "terminated": np.bool_,
+    "truncated": np.bool_,
+    "episode": np.int32,        # episode number within the run
+    "step": np.int32,           # step in episode, 0 on reset rows
+}
+
+# Variable-length side tables: <name>.bin (zlib records) + <name>_index.npy
+SIDE_TABLES = ("raw", "blocks")
+
+# Interned block dicts kept per open chunk (see TrajectoryChunk._decode_blocks)
+BLOCK_CACHE_SIZE = 1 << 18
+
+# Rows decoded together when streaming a chunk (TrajectoryChunk.raw_observations)
+DECODE_ROWS = 256
+
+ACTION_INDEX = {name: i for i, name in enumerate(TerraScoutEnv.ACTION_NAMES)}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        # In-process block grids: store them base64-encoded, as the bot sends them
+        return base64.b64encode(value.astype(value.dtype.newbyteorder("<"), copy=False).tobytes()).decode("ascii")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    """Write JSON atomically (temp file + rename)."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+class _ChunkBuffer:
+    """Rows of the chunk being written; side-table records are compressed as they arrive."""
+    
+    def __init__(self, index: int):
+        self.index = index
+        self.obs: List[np.ndarray] = []
+        self.action: List[int] = []
+        self.taken_action: List[int] = []
+        self.reward: List[float] = []
+        self.terminated: List[bool] = []
+        self.truncated: List[bool] = []
+        self.episode: List[int] = []
+        self.step: List[int] = []
+        self.breakdown: List[Dict[str, float]] = []
+        self.tables = {table: bytearray() for table in SIDE_TABLES}
+        self.index_rows = {table: [] for table in SIDE_TABLES}  # type: Dict[str, List[Tuple[int, int]]]
+        self.block_names: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self.action)
+
+
+class TrajectoryWriter:
+    """
+    Streams steps of one env into a run directory.
+    
+    Each step is handed to a background thread (through a bounded queue,
+    so memory stays flat), which compresses it and every chunk_size rows
+    writes one chunk directory: a .npy file per column (COLUMNS, plus the
+    (steps, K) reward breakdown with NaN for absent components) and two
+    zlib side tables, "raw" (the raw observation without nearbyBlocks, as
+    JSON) and "blocks" (nearbyBlocks as int32 [x, y, z, name id] rows).
+    Chunks and the manifest are written atomically, so a crashed run
+    leaves all finished chunks readable. Raw observations are referenced,
+    not copied, until encoded and must not be mutated afterwards.
+    """
+    
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        chunk_size: int = 4096,
+        compress_level: int = 1,
+        max_pending: int = 256,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.directory = Path(directory)
+        if (self.directory / MANIFEST).exists():
+            raise FileExistsError(f"{self.directory} already holds a recording")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        
+        self.chunk_size = chunk_size
+        self.compress_level = compress_level
+        self.manifest: Dict[str, Any] = {
+            "format": FORMAT,
+            "version": VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "action_names": TerraScoutEnv.ACTION_NAMES,
+            "obs_dim": 35,
+            "metadata": metadata or {},
+            "steps": 0,
+            "episodes": 0,
+            "chunks": [],
+        }
+        _write_json(self.directory / MANIFEST, self.manifest)
+        
+        self.episode = -1
+        self.episode_step = 0
+        self._buffer = _ChunkBuffer(0)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="terra-scout-recorder", daemon=True)
+        self._thread.start()
+    
+    def add_reset(self, obs: np.ndarray, raw_obs: Optional[Dict[str, Any]]):
+        """Record the first observation of a new episode."""
+        self.episode += 1
+        self.episode_step = 0
+        self._put((np.array(obs, dtype=np.float32), -1, -1, 0.0, False, False, {}, raw_obs, self.episode, 0))
+    
+    def add_step(
+        self,
+        obs: np.ndarray,
+        action: int,
+        reward: float,
+        terminated: bool,
+        truncated: bool,
+        info: Dict[str, Any],
+    ):
+        """Record one env step from its return values."""
+        self.episode_step += 1
+        taken = ACTION_INDEX.get(info.get("action_name"), -1)  # type: ignore
+        self._put((
+            np.array(obs, dtype=np.float32), action, taken, reward, terminated, truncated,
+            info.get("reward_breakdown") or {}, info.get("raw_observation"),
+            self.episode, self.episode_step,
+        ))
+    
+    def _put(self, row: Optional[tuple]):
+        if self._error is not None:
+            raise RuntimeError("Trajectory writer failed") from self._error
+        self._queue.put(row)
+    
+    def flush(self):
+        """Write the rows recorded so far as a (possibly short) chunk."""
+        self._put(())
+    
+    def close(self):
+        """Write the remaining rows and wait for the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("Trajectory writer failed") from self._error
+    
+    # ===== WRITER THREAD =====
+    
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if self._error is not None:
+                if row is None:
+                    return
+                continue
+            try:
+                if row:
+                    self._add(*row)
+                    if len(self._buffer) >= self.chunk_size:
+                        self._write_chunk()
+                else:
+                    self._write_chunk()
+            except BaseException as e:  # surfaced on the next add/close
+                logger.error(f"Writing trajectory chunk {self._buffer.index} failed: {e}")
+                self._error = e
+            if row is None:
+                return
+    
+    def _add(self, obs, action, taken, reward, terminated, truncated, breakdown, raw_obs, episode, step):
+        buffer = self._buffer
+        buffer.obs.append(obs)
+        buffer.action.append(int(action))
+        buffer.taken_action.append(taken)
+        buffer.reward.append(float(reward))
+        buffer.terminated.append(bool(terminated))
+        buffer.truncated.append(bool(truncated))
+        buffer.episode.append(episode)
+        buffer.step.append(step)
+        buffer.breakdown.append(breakdown)
+        
+        if raw_obs is None:
+            self._put_record("raw", None)
+            self._put_record("blocks", None)
+            return
+        blocks = raw_obs.get("nearbyBlocks")
+        if blocks is None:
+            self._put_record("blocks", None)
+        else:
+            raw_obs = {key: value for key, value in raw_obs.items() if key != "nearbyBlocks"}
+            names = buffer.block_names
+            intern = names.setdefault
+            flat: List[int] = []
+            for block in blocks:
+                p = block["position"]
+                flat += (p["x"], p["y"], p["z"], intern(block["name"], len(names)))
+            self._put_record("blocks", np.array(flat, dtype=np.int32).tobytes())
+        self._put_record("raw", json.dumps(raw_obs, default=_json_default).encode("utf-8"))
+    
+    def _put_record(self, table: str, payload: Optional[bytes]):
+        data = self._buffer.tables[table]
+        if payload is None:
+            self._buffer.index_rows[table].append((-1, -1))
+            return
+        record = zlib.compress(payload, self.compress_level)
+        self._buffer.index_rows[table].append((len(data), len(record)))
+        data += record
+    
+    def _write_chunk(self):
+        buffer = self._buffer
+        if not len(buffer):
+            return
+        name = f"chunk_{buffer.index:05d}"
+        tmp = self.directory / (name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir()
+        
+        np.save(tmp / "obs.npy", np.stack(buffer.obs))
+        for column, dtype in COLUMNS.items():
+            if column != "obs":
+                np.save(tmp / f"{column}.npy", np.asarray(getattr(buffer, column), dtype=dtype))
+        
+        keys = sorted({key for breakdown in buffer.breakdown for key in breakdown})
+        breakdown = np.full((len(buffer), len(keys)), np.nan, dtype=np.float64)
+        column_of = {key: i for i, key in enumerate(keys)}
+        for row, components in enumerate(buffer.breakdown):
+            for key, value in components.items():
+                breakdown[row, column_of[key]] = value
+        np.save(tmp / "breakdown.npy", breakdown)
+        
+        for table in SIDE_TABLES:
+            (tmp / f"{table}.bin").write_bytes(buffer.tables[table])
+            np.save(tmp / f"{table}_index.npy", np.asarray(buffer.index_rows[table], dtype=np.int64).reshape(-1, 2))
+        
+        meta = {
+            "steps": len(buffer),
+            "breakdown_keys": keys,
+            "block_names": list(buffer.block_names),
+            "first_episode": buffer.episode[0],
+            "last_episode": buffer.episode[-1],
+        }
+        _write_json(tmp / "meta.json", meta)
+        os.replace(tmp, self.directory / name)
+        
+        self.manifest["chunks"].append({"name": name, **meta})
+        self.manifest["steps"] += len(buffer)
+        self.manifest["episodes"] = buffer.episode[-1] + 1
+        _write_json(self.directory / MANIFEST, self.manifest)
+        self._buffer = _ChunkBuffer(buffer.index + 1)
+
+
+class TrajectoryChunk:
+    """
+    One recorded chunk. Columns are memory-mapped on first access;
+    side-table records are decompressed per row.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.breakdown_keys: List[str] = self.meta["breakdown_keys"]
+        self.block_names: List[str] = self.meta["block_names"]
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._block_cache: Dict[bytes, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return self.meta["steps"]
+    
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Memory-mapped column (COLUMNS, "breakdown", or a side-table "_index")."""
+        array = self._arrays.get(column)
+        if array is None:
+            array = self._arrays[column] = np.load(self.path / f"{column}.npy", mmap_mode="r")
+        return array
+    
+    def _record(self, table: str, row: int) -> Optional[bytes]:
+        offset, length = self[f"{table}_index"][row]
+        if length < 0:
+            return None
+        data = self._arrays.get(table)
+        if data is None:
+            data = self._arrays[table] = np.memmap(self.path / f"{table}.bin", dtype=np.uint8, mode="r")
+        return zlib.decompress(data[offset:offset + length])
+    
+    def raw_observation(self, row: int) -> Optional[Dict[str, Any]]:
+        """The raw observation of a row, as it was in info["raw_observation"]."""
+        payload = self._record("raw", row)
+        if payload is None:
+            return None
+        raw = json.loads(payload)
+        blocks = self._record("blocks", row)
+        if blocks is not None:
+            raw["nearbyBlocks"] = self._decode_blocks(blocks)
+        return raw
+    
+    def raw_observations(self, start: int, stop: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        raw_observation() of rows start..stop, decoded together: one JSON
+        parse for all raw records and one pass over all their blocks.
+        """
+        payloads = [self._record("raw", row) for row in range(start, stop)]
+        decoded = iter(json.loads(b"[" + b",".join(p for p in payloads if p is not None) + b"]"))
+        observations = [None if payload is None else next(decoded) for payload in payloads]
+        
+        records = [self._record("blocks", row) for row in range(start, stop)]
+        blocks = self._decode_blocks(b"".join(record for record in records if record is not None))
+        offset = 0
+        for raw, record in zip(observations, records):
+            if record is not None:
+                count = len(record) // 16
+                if raw is not None:
+                    raw["nearbyBlocks"] = blocks[offset:offset + count]
+                offset += count
+        return observations
+    
+    def _decode_blocks(self, payload: bytes) -> List[Dict[str, Any]]:
+        """
+        nearbyBlocks of a blocks record. Block dicts are interned per chunk
+        (keyed by their 16-byte record), so consecutive observations share
+        the dicts of unchanged blocks; they must be treated as read-only.
+        """
+        cache = self._block_cache
+        if len(cache) > BLOCK_CACHE_SIZE:
+            cache.clear()
+        quads = np.frombuffer(payload, dtype=np.int32).reshape(-1, 4)
+        keys = quads.view(np.dtype((np.void, 16))).ravel().tolist()
+        blocks = list(map(cache.get, keys))
+        if None in blocks:
+            names = self.block_names
+            missing = {keys[i]: i for i, block in enumerate(blocks) if block is None}
+            rows = np.fromiter(missing.values(), dtype=np.intp, count=len(missing))
+            for key, (x, y, z, n) in zip(missing, quads[rows].tolist()):
+                cache[key] = {"name": names[n], "position": {"x": x, "y": y, "z": z}}
+            blocks = list(map(cache.__getitem__, keys))
+        return blocks
+    
+    def reward_breakdown(self, row: int) -> Dict[str, float]:
+        """The reward breakdown of a row (absent components omitted)."""
+        values = self["breakdown"][row]
+        return {key: float(value) for key, value in zip(self.breakdown_keys, values) if not np.isnan(value)}
+
+
+class TrajectoryReader:
+    """
+    Reads a run directory written by TrajectoryWriter.
+    
+    Nothing is loaded up front: chunks are opened on demand and their
+    columns memory-mapped, so runs larger than RAM can be scanned.
+    """
+    
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / MANIFEST).read_text())
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError(f"{self.directory} is not a trajectory recording")
+        self.chunk_names: List[str] = [chunk["name"] for chunk in self.manifest["chunks"]]
+        self.action_names: List[str] = self.manifest["action_names"]
+        self.metadata: Dict[str, Any] = self.manifest.get("metadata", {})
+    
+    @staticmethod
+    def find(path: Union[str, Path]) -> List[Path]:
+        """Run directories at or below path (e.g. one per env of a VecEnv)."""
+        path = Path(path)
+        if (path / MANIFEST).exists():
+            return [path]
+        return sorted(manifest.parent for manifest in path.rglob(MANIFEST))
+    
+    @property
+    def num_steps(self) -> int:
+        return self.manifest["steps"]
+    
+    @property
+    def num_episodes(self) -> int:
+        return self.manifest["episodes"]
+    
+    def __len__(self) -> int:
+        return len(self.chunk_names)
+    
+    def chunk(self, index: int) -> TrajectoryChunk:
+        return TrajectoryChunk(self.directory / self.chunk_names[index])
+    
+    def chunks(self) -> Iterator[TrajectoryChunk]:
+        for index in range(len(self)):
+            yield self.chunk(index)
+    
+    def column(self, name: str) -> Iterator[np.ndarray]:
+        """One column, chunk by chunk."""
+        for chunk in self.chunks():
+            yield chunk[name]
+    
+    def episode_segments(self) -> List[Tuple[int, int, int, int]]:
+        """(episode, chunk, start, stop) row ranges, in recording order."""
+        segments = []
+        for index, chunk in enumerate(self.chunks()):
+            episodes = np.asarray(chunk["episode"])
+            bounds = np.flatnonzero(np.diff(episodes)) + 1
+            starts = np.concatenate([[0], bounds])
+            stops = np.concatenate([bounds, [len(episodes)]])
+            segments.extend(
+                (int(episodes[start]), index, int(start), int(stop)) for start, stop in zip(starts, stops)
+            )
+        return segments
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    Records everything a TerraScoutEnv sees to a run directory: raw
+    observations, processed observations, policy and executed actions,
+    rewards and reward breakdowns (see TrajectoryWriter for the format).
+    
+    Encoding and disk writes happen on a background thread; the step
+    itself only appends references to a buffer.
+    """
+    
+    def __init__(
+        self,
+        env: gym.Env,
+        directory: Union[str, Path],
+        chunk_size: int = 4096,
+        compress_level: int = 1,
+    ):
+        super().__init__(env)
+        self.writer = TrajectoryWriter(
+            directory, chunk_size, compress_level, metadata=recording_metadata(env.unwrapped)
+        )
+    
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        self.writer.add_reset(obs, info.get("raw_observation"))
+        return obs, info
+    
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        action = action.item() if isinstance(action, np.ndarray) else action
+        self.writer.add_step(obs, action, reward, terminated, truncated, info)
+        return obs, reward, terminated, truncated, info
+    
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            super().close()
+
+
+class VecTrajectoryRecorder(VecEnvWrapper):
+    """
+    Records every env of a TerraScoutVecEnv to <directory>/env_<i>, as
+    TrajectoryRecorder does for a single env. Auto-reset observations are
+    taken from the VecEnv's reset_infos.
+    """
+    
+    def __init__(
+        self,
+        venv: VecEnv,
+        directory: Union[str, Path],
+        chunk_size: int = 4096,
+        compress_level: int = 1,
+    ):
+        super().__init__(venv)
+        envs = getattr(venv, "envs", [None] * self.num_envs)
+        self.writers = [
+            TrajectoryWriter(
+                Path(directory) / f"env_{i:03d}", chunk_size, compress_level,
+                metadata=recording_metadata(env) if env is not None else None,
+            )
+            for i, env in enumerate(envs)
+        ]
+        self._actions: Optional[np.ndarray] = None
+    
+    def reset(self) -> np.ndarray:
+        obs = self.venv.reset()
+        for i, writer in enumerate(self.writers):
+            writer.add_reset(obs[i], self.venv.reset_infos[i].get("raw_observation"))
+        return obs
+    
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions).reshape(self.num_envs)
+        self.venv.step_async(actions)
+    
+    def step_wait(self) -> VecEnvStepReturn:
+        obs, rewards, dones, infos = self.venv.step_wait()
+        for i, writer in enumerate(self.writers):
+            info = infos[i]
+            truncated = info.get("TimeLimit.truncated", False)
+            final_obs = info["terminal_observation"] if dones[i] else obs[i]
+            writer.add_step(
+                final_obs, int(self._actions[i]), rewards[i], dones[i] and not truncated, truncated, info  # type: ignore
+            )
+            if dones[i]:
+                writer.add_reset(obs[i], self.venv.reset_infos[i].get("raw_observation"))
+        return obs, rewards, dones, infos
+    
+    def close(self) -> None:
+        try:
+            for writer in self.writers:
+                writer.close()
+        finally:
+            self.venv.close()
+
+
+def recording_metadata(env: Any) -> Dict[str, Any]:
+    """Settings of a TerraScoutEnv needed to interpret or replay its recording."""
+    keys = (
+        "block_format", "max_steps", "use_enhanced_obs", "use_enhanced_rewards", "smart_action_bias",
+        "action_repeat", "pipeline",
+    )
+    return {key: getattr(env, key) for key in keys if hasattr(env, key)}
+
+
+def check_replayable(metadata: Dict[str, Any], run: Any = "recording"):
+    """
+    Raise ValueError for recordings whose rows are not single bot steps.
+    
+    With action_repeat > 1 a row spans several substeps but stores only the
+    last raw observation, so its reward cannot be recomputed or replayed.
+    """
+    repeat = metadata.get("action_repeat", 1)
+    if repeat > 1:
+        raise ValueError(
+            f"{run} was recorded with action_repeat={repeat}; replay and reward "
+            f"recomputation need one bot step per row (record with action_repeat=1)"
+        )
@@ -0,0 +1,122 @@
+"""
+Terra Scout Batched Simulator VecEnv
+Stable-Baselines3 VecEnv over a BatchedSimulator
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvIndices, VecEnvStepReturn
+
+from ..bridge.environment import TerraScoutEnv
+from ..simulator.batched import STRATEGIES, BatchedSimulator
+
+
+class TerraScoutSimVecEnv(VecEnv):
+    """
+    SB3 VecEnv whose envs are the worlds of one BatchedSimulator.
+    
+    A step is one vectorized simulator call for all worlds: no bridge,
+    no per-env objects. Observations, rewards, episode ends and the smart
+    action bias match TerraScoutEnv (with its default enhanced
+    observations and rewards) on the simulated bot. Infos are empty
+    except for finished episodes, which carry episode_stats, strategy,
+    in_cave, diamonds_found and terminal_observation.
+    """
+    
+    def __init__(
+        self,
+        num_envs: int = 64,
+        seed: int = 0,
+        max_steps: int = 18000,
+        smart_action_bias: bool = True,
+        extent: int = 32,
+        rewards: Optional[Dict[str, Union[float, Sequence[float]]]] = None,
+    ):
+        self.sim = BatchedSimulator(num_envs, seed=seed, extent=extent, rewards=rewards)
+        self.max_steps = max_steps
+        self.smart_action_bias = smart_action_bias
+        self.rng = np.random.default_rng(seed)
+        self.render_mode = None
+        super().__init__(
+            num_envs,
+            spaces.Box(low=-np.inf, high=np.inf, shape=(35,), dtype=np.float32),
+            spaces.Discrete(len(TerraScoutEnv.ACTION_NAMES)),
+        )
+        
+        self._obs = np.zeros((num_envs, 35), dtype=np.float32)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+    
+    def reset(self) -> np.ndarray:
+        self._obs[:] = self.sim.reset()
+        self.current_step[:] = 0
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+    
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+    
+    def step_wait(self) -> VecEnvStepReturn:
+        actions = self._smart_action_override(self._actions)
+        self.current_step += 1
+        _, rewards, terminated = self.sim.step(actions, out=self._obs)
+        truncated = self.current_step >= self.max_steps
+        dones = terminated | truncated
+        
+        infos: List[Dict[str, Any]] = [{} for _ in range(self.num_envs)]
+        done = np.flatnonzero(dones)
+        if len(done):
+            for i in done:
+                infos[i] = {
+                    "episode_stats": self.sim.episode_stats(i),
+                    "strategy": STRATEGIES[self.sim.strategy[i]],
+                    "in_cave": bool(self.sim.in_cave[i]),
+                    "diamonds_found": int(self.sim.diamonds[i]),
+                    "TimeLimit.truncated": bool(truncated[i] and not terminated[i]),
+                    "terminal_observation": self._obs[i].copy(),
+                }
+            self._obs[done] = self.sim.reset(done)
+            self.current_step[done] = 0
+        
+        return self._obs.copy(), rewards.astype(np.float32), dones, infos
+    
+    def _smart_action_override(self, actions: np.ndarray) -> np.ndarray:
+        """TerraScoutEnv._smart_action_override for all envs at once."""
+        if not self.smart_action_bias:
+            return actions
+        
+        y = self.sim.position[:, 1]
+        roll = self.rng.random(self.num_envs)
+        mining = self.rng.choice(TerraScoutEnv.MINING_ACTIONS, size=self.num_envs)
+        
+        actions = np.where((-59 <= y) & (y <= -45) & (roll < 0.5), mining, actions)
+        actions = np.where((y > 0) & (roll < 0.3), 7, actions)  # descend
+        return np.where(self.sim.diamond_nearby, TerraScoutEnv.MINE_DIAMOND_ACTION, actions)
+    
+    def close(self) -> None:
+        pass
+    
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+    
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        setattr(self, attr_name, value)
+    
+    def env_method(
+        self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs
+    ) -> List[Any]:
+        return [
+            getattr(self, method_name)(*method_args, **method_kwargs)
+            for _ in self._get_indices(indices)
+        ]
+    
+    def env_is_wrapped(
+        self, wrapper_class: Type[gym.Wrapper], indices: VecEnvIndices = None
+    ) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
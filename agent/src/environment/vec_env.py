@@ -0,0 +1,111 @@
+"""
+Terra Scout Vector Environment
+Stable-Baselines3 VecEnv over several Mineflayer bots
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvIndices, VecEnvStepReturn
+
+from ..bridge.async_env import bot_addresses
+from ..bridge.environment import TerraScoutEnv
+
+
+class TerraScoutVecEnv(VecEnv):
+    """
+    SB3 VecEnv with one TerraScoutEnv per bot (host, port).
+    
+    Bridge round-trips of all bots run in parallel on a thread pool, so a
+    step costs about the latency of the slowest bot. Observations of all
+    bots are built with one batched ObservationProcessor call. Finished
+    envs are reset right away (auto-reset) and their final observation is
+    stored in info["terminal_observation"], as SB3 expects. With
+    prefetch_reset=True an env starts its reset as soon as its own bridge
+    step ends the episode, behind the steps of the slower bots.
+    """
+    
+    def __init__(
+        self,
+        hosts: Union[str, Sequence[str]] = "localhost",
+        ports: Sequence[int] = (3000,),
+        **env_kwargs: Any,
+    ):
+        self.addresses = bot_addresses(hosts, ports)
+        self.envs = [TerraScoutEnv(host, port, **env_kwargs) for host, port in self.addresses]
+        super().__init__(len(self.envs), self.envs[0].observation_space, self.envs[0].action_space)
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_envs, thread_name_prefix="terra-scout-bot"
+        )
+        self._obs = np.zeros((self.num_envs, 35), dtype=np.float32)
+        self._actions: Optional[np.ndarray] = None
+    
+    def reset(self) -> np.ndarray:
+        self.reset_infos = self._reset_envs(range(self.num_envs))
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+    
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = actions
+    
+    def step_wait(self) -> VecEnvStepReturn:
+        prepared = [env._begin_step(action) for env, action in zip(self.envs, self._actions)]  # type: ignore
+        results = list(self._executor.map(
+            lambda env, p: env._bridge_step(p[2]), self.envs, prepared
+        ))
+        
+        rewards, terminated, truncated, infos = TerraScoutEnv.finish_step_batch(
+            self.envs, prepared, results, self._obs
+        )
+        dones = terminated | truncated
+        
+        done = np.flatnonzero(dones)
+        if len(done):
+            for i in done:
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+            for i, reset_info in zip(done, self._reset_envs(done)):
+                self.reset_infos[i] = reset_info
+        
+        return self._obs.copy(), rewards, dones, infos
+    
+    def _reset_envs(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """Reset the given envs in parallel and write their first observations."""
+        indices = list(indices)
+        envs = [self.envs[i] for i in indices]
+        results = list(self._executor.map(lambda env: env._request_reset(), envs))
+        
+        obs = np.zeros((len(indices), 35), dtype=np.float32)
+        infos = TerraScoutEnv.finish_reset_batch(envs, results, obs)
+        self._obs[indices] = obs
+        return infos
+    
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for env in self.envs:
+            env.close()
+    
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        return [getattr(self.envs[i], attr_name) for i in self._get_indices(indices)]
+    
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        for i in self._get_indices(indices):
+            setattr(self.envs[i], attr_name, value)
+    
+    def env_method(
+        self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs
+    ) -> List[Any]:
+        return [
+            getattr(self.envs[i], method_name)(*method_args, **method_kwargs)
+            for i in self._get_indices(indices)
+        ]
+    
+    def env_is_wrapped(
+        self, wrapper_class: Type[gym.Wrapper], indices: VecEnvIndices = None
+    ) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,15 @@
+﻿"""
+Terra Scout Simulator
+Offline voxel-world stand-in for the Minecraft server and Mineflayer bot
+"""
+
+from .world import VoxelWorld, generate_region
+from .bot import SimulatedBot
+from .batched import BatchedSimulator
+
+__all__ = [
+    "VoxelWorld",
+    "generate_region",
+    "SimulatedBot",
+    "BatchedSimulator",
+]
@@ -0,0 +1,883 @@
+"""
+Terra Scout Batched Simulator
+N simulated worlds stepped together with array operations
+"""
+
+import math
+import random
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from shared.constants.minecraft import WORLD_MIN_Y
+from ..bridge.observations import OBS_SIZE, ObservationProcessor
+from ..bridge.rewards import RewardCalculator
+from .bot import (
+    BOX_RADIUS,
+    CAVE_RADIUS,
+    DANGER_RADIUS,
+    FACES,
+    ITEM_DROPS,
+    IS_AIR,
+    IS_DIAMOND,
+    IS_STONE,
+    LAVA_DAMAGE,
+    MINING_ANGLES,
+    NEARBY_RADIUS,
+    ORE_RADIUS,
+    ORE_VALUE,
+    REGEN_PER_STEP,
+    SAFE_FALL,
+)
+from .world import AIR, BEDROCK, BLOCKS, LAVA, generate_region, surface_height
+
+# Action ids, in TerraScoutEnv.ACTION_NAMES order
+(
+    NOOP, FORWARD, BACK, LEFT, RIGHT, JUMP, FORWARD_JUMP, DESCEND, STRIP_MINE,
+    BRANCH_MINE, TUNNEL_FORWARD, MINE_ORE, MINE_DIAMOND, EXPLORE_CAVE, FIND_CAVE,
+    SAFE_DIG_DOWN, LOOK_DOWN, LOOK_UP, LOOK_LEFT, LOOK_RIGHT, SWITCH_DIRECTION,
+) = range(21)
+NUM_ACTIONS = 21
+
+STRATEGIES = ["descend", "strip_mine", "explore_cave"]
+STRATEGY_DESCEND, STRATEGY_STRIP_MINE, STRATEGY_EXPLORE_CAVE = range(len(STRATEGIES))
+
+# Inventory columns
+ITEMS = list(dict.fromkeys(ITEM_DROPS + ["iron_pickaxe"]))
+ITEM_INDEX = {name: i for i, name in enumerate(ITEMS)}
+DROP_ITEM = np.array([ITEM_INDEX[name] for name in ITEM_DROPS], dtype=np.intp)
+
+# Per-block-id tables of the observation and reward features
+IS_ORE = np.array(["_ore" in name for name in BLOCKS])
+IS_VALUABLE = ORE_VALUE > 0
+IS_PASSABLE = IS_AIR | (np.arange(len(BLOCKS)) == LAVA)
+IS_LAVA_ID = np.arange(len(BLOCKS)) == LAVA
+_processor = ObservationProcessor
+BLOCK_CODE = np.array(
+    [
+        _processor.NUM_CODES if name in ("air", "cave_air")
+        else _processor.BLOCK_CODES.get(name, _processor.CODE_OTHER)
+        for name in BLOCKS
+    ],
+    dtype=np.intp,
+)
+
+# RewardCalculator mining reward of each ore block: key per block id
+MINED_KEYS = ["mined_diamond_ore", "mined_iron_ore", "mined_gold_ore", "mined_redstone_ore", "mined_other_ore"]
+MINED_KIND = np.array(
+    [
+        next((i for i, kind in enumerate(("diamond", "iron", "gold", "redstone")) if kind in name), 4)
+        for name in BLOCKS
+    ],
+    dtype=np.intp,
+)
+
+# Per-cell marks of the episode tracking sets
+OBS_VISITED = np.uint8(1)  # ObservationProcessor.visited_positions
+VISITED = np.uint8(2)  # RewardCalculator.visited_positions
+SEEN = np.uint8(4)  # RewardCalculator.seen_ores
+MINED = np.uint8(8)  # RewardCalculator.mined_ores
+
+WORLD_HEIGHT = 144  # WORLD_MIN_Y up to above the highest surface
+
+# Generated blocks beyond the walls, so that every scan from inside sees
+# the same blocks as in SimulatedBot's unbounded world
+MARGIN = CAVE_RADIUS + 1
+
+
+def _cube_offsets(radius: int) -> np.ndarray:
+    """(side, side, side, 3) offsets of the cube of half-width radius."""
+    r = np.arange(-radius, radius + 1)
+    return np.stack(np.meshgrid(r, r, r, indexing="ij"), axis=-1)
+
+
+def _flat(a: np.ndarray) -> np.ndarray:
+    """View of a per-row array as (rows, cells), also for zero rows."""
+    return a.reshape(a.shape[0], math.prod(a.shape[1:]))
+
+
+# Cells of the six face neighbours in a flattened 3x3x3 box
+FACE_CELLS = [(1 + dx) * 9 + (1 + dy) * 3 + (1 + dz) for dx, dy, dz in FACES]
+
+# Distance of every cube cell from the centre, by half-width
+CUBE_DIST = {r: np.sqrt((_cube_offsets(r) ** 2).sum(axis=-1)) for r in range(BOX_RADIUS + 1)}
+
+
+class BatchedSimulator:
+    """
+    N SimulatedBots whose state lives in stacked NumPy arrays.
+    
+    Each bot is walled into `extent` x `extent` columns around spawn; its
+    world is a dense block array of that area plus MARGIN generated
+    blocks on every side, so block scans from inside the walls match
+    SimulatedBot exactly. Positions, health, inventories and the episode
+    tracking of ObservationProcessor and RewardCalculator are (N, ...)
+    arrays. step() applies one action per world with one array pass per
+    action type and returns the (N, 35) observations and (N,) rewards
+    that TerraScoutEnv would compute from the same bots.
+    
+    Actions follow SimulatedBot, which walks on where these bots meet a
+    wall; each world draws its mining directions from a random.Random
+    seeded like SimulatedBot. Reward weights default to
+    RewardCalculator.REWARDS; any of them can be overridden with a scalar
+    or with one value per world, so a batch can sweep reward shapings.
+    """
+    
+    def __init__(
+        self,
+        num_worlds: int,
+        seed: int = 0,
+        extent: int = 32,
+        rewards: Optional[Dict[str, Union[float, Sequence[float]]]] = None,
+    ):
+        self.num_worlds = n = num_worlds
+        self.extent = extent
+        self.origin = np.array([-(extent // 2), WORLD_MIN_Y, -(extent // 2)], dtype=np.int64)
+        self.shape = (extent, WORLD_HEIGHT, extent)
+        self.seeds = seed + 1000 * np.arange(n, dtype=np.int64)
+        self.rngs = [random.Random(int(world_seed)) for world_seed in self.seeds]
+        
+        unknown = set(rewards or {}) - set(RewardCalculator.REWARDS)
+        if unknown:
+            raise ValueError(f"Unknown reward keys: {sorted(unknown)}")
+        self.rewards = {
+            key: np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy()
+            for key, value in {**RewardCalculator.REWARDS, **(rewards or {})}.items()
+        }
+        self._mined_rewards = np.stack([self.rewards[key] for key in MINED_KEYS], axis=1)
+        
+        # Blocks are stored with a generated margin of MARGIN (none above),
+        # so scan boxes never leave the arrays
+        self.block_origin = self.origin - (MARGIN, MARGIN, MARGIN)
+        self.block_shape = (extent + 2 * MARGIN, WORLD_HEIGHT + MARGIN, extent + 2 * MARGIN)
+        self.blocks = np.full((n,) + self.block_shape, BEDROCK, dtype=np.uint8)
+        # Cell marks also cover the nearbyBlocks cubes reaching past the walls
+        self.cell_origin = self.origin - (NEARBY_RADIUS, 0, NEARBY_RADIUS)
+        self.marks = np.zeros(
+            (n, extent + 2 * NEARBY_RADIUS, WORLD_HEIGHT, extent + 2 * NEARBY_RADIUS), dtype=np.uint8
+        )
+        self.columns = np.zeros((n, extent, extent), dtype=bool)  # RewardCalculator.diamond_depth_columns
+        self._flat_blocks = self.blocks.reshape(-1)
+        sx, sy, sz = self.block_shape
+        self._strides = np.array([sx * sy * sz, sy * sz, sz, 1], dtype=np.int64)
+        self._offsets: Dict[Tuple[int, int, int], np.ndarray] = {}
+        
+        # Bot state
+        self.episodes = np.zeros(n, dtype=np.int64)
+        self.position = np.zeros((n, 3))
+        self.yaw = np.zeros(n)
+        self.pitch = np.zeros(n)
+        self.health = np.full(n, 20.0)
+        self.inventory = np.zeros((n, len(ITEMS)), dtype=np.int64)
+        self.step_count = np.zeros(n, dtype=np.int64)
+        self.mined_ores = np.zeros(n, dtype=np.int64)
+        self.diamonds = np.zeros(n, dtype=np.int64)
+        self.running = np.zeros(n, dtype=bool)
+        self.mining_direction = np.zeros(n, dtype=np.int64)
+        self.strip_mine_length = np.zeros(n, dtype=np.int64)
+        self.branch_count = np.zeros(n, dtype=np.int64)
+        self.strategy = np.zeros(n, dtype=np.int64)
+        self.in_cave = np.zeros(n, dtype=bool)
+        
+        # ObservationProcessor state
+        self.start_y = np.zeros(n)
+        self.obs_visited = np.zeros(n, dtype=np.int64)
+        
+        # RewardCalculator state
+        self.visited = np.zeros(n, dtype=np.int64)
+        self.lowest_y = np.full(n, 320.0)
+        self.entered_diamond_zone = np.zeros(n, dtype=bool)
+        self.seen_ores = np.zeros(n, dtype=np.int64)
+        self.rewarded_mined = np.zeros(n, dtype=np.int64)
+        self.prev_health = np.full(n, 20.0)
+        self.prev_position = np.full((n, 3), np.nan)
+        self.prev_danger = np.zeros(n, dtype=bool)
+        self.stuck_counter = np.zeros(n, dtype=np.int64)
+        self.total_reward = np.zeros(n)
+        self.reward_steps = np.zeros(n, dtype=np.int64)
+        self.horizontal_at_diamond = np.zeros(n, dtype=np.int64)
+        self.prev_closest_diamond = np.full(n, np.inf)
+        
+        # Features of the last observation, for action biasing
+        self.diamond_nearby = np.zeros(n, dtype=bool)
+        
+        self._handlers = {
+            FORWARD: lambda rows: self._move(rows, "forward", 1),
+            BACK: lambda rows: self._move(rows, "back", 1),
+            LEFT: lambda rows: self._move(rows, "left", 1),
+            RIGHT: lambda rows: self._move(rows, "right", 1),
+            FORWARD_JUMP: lambda rows: self._move(rows, "forward", 1, climb=True),
+            DESCEND: self._descend,
+            STRIP_MINE: self._strip_mine,
+            BRANCH_MINE: self._branch_mine,
+            TUNNEL_FORWARD: self._tunnel_forward,
+            MINE_ORE: self._mine_nearest_ore,
+            MINE_DIAMOND: self._mine_diamond,
+            EXPLORE_CAVE: self._explore_cave,
+            FIND_CAVE: self._find_cave,
+            SAFE_DIG_DOWN: self._safe_dig_down,
+            LOOK_DOWN: lambda rows: self._look(rows, self.yaw[rows], self.pitch[rows] + 0.4),
+            LOOK_UP: lambda rows: self._look(rows, self.yaw[rows], self.pitch[rows] - 0.4),
+            LOOK_LEFT: lambda rows: self._look(rows, self.yaw[rows] - 0.5, self.pitch[rows]),
+            LOOK_RIGHT: lambda rows: self._look(rows, self.yaw[rows] + 0.5, self.pitch[rows]),
+            SWITCH_DIRECTION: self._switch_direction,
+        }
+    
+    # ===== BLOCK ACCESS =====
+    
+    def _gather(self, rows: np.ndarray, lo: np.ndarray, shape: Tuple[int, int, int]) -> np.ndarray:
+        """
+        Block ids (M, *shape) of one box per row with minimum corners lo
+        (M, 3). Outside the region is bedrock, above it air.
+        """
+        index = lo - self.block_origin
+        if not len(rows):
+            return np.zeros((0,) + tuple(shape), dtype=np.uint8)
+        if (index.min(axis=0) >= 0).all() and (index.max(axis=0) + shape <= self.block_shape).all():
+            base = rows * self._strides[0] + index @ self._strides[1:]
+            return self._flat_blocks.take(base[:, None, None, None] + self._box_offsets(shape))
+        
+        index = index[:, :, None] + np.arange(max(shape))
+        ix, iy, iz = (index[:, axis, :size] for axis, size in enumerate(shape))
+        inside_xz = ((ix >= 0) & (ix < self.block_shape[0]))[:, :, None, None] & ((iz >= 0) & (iz < self.block_shape[2]))[:, None, None, :]
+        below = (iy < 0)[:, None, :, None]
+        above = (iy >= self.block_shape[1])[:, None, :, None]
+        
+        flat = (
+            (rows * self._strides[0])[:, None, None, None]
+            + (np.clip(ix, 0, self.block_shape[0] - 1) * self._strides[1])[:, :, None, None]
+            + (np.clip(iy, 0, self.block_shape[1] - 1) * self._strides[2])[:, None, :, None]
+            + np.clip(iz, 0, self.block_shape[2] - 1)[:, None, None, :]
+        )
+        ids = self._flat_blocks.take(flat)
+        return np.where(inside_xz & ~below, np.where(above, AIR, ids), BEDROCK).astype(np.uint8)
+    
+    def _box_offsets(self, shape: Tuple[int, int, int]) -> np.ndarray:
+        """Flat block index offsets of a box from its minimum corner."""
+        offsets = self._offsets.get(shape)
+        if offsets is None:
+            ax, ay, az = (np.arange(size) for size in shape)
+            offsets = (
+                ax[:, None, None] * self._strides[1] + ay[None, :, None] * self._strides[2] + az[None, None, :]
+            )
+            self._offsets[shape] = offsets
+        return offsets
+    
+    def _get(self, rows: np.ndarray, p: np.ndarray) -> np.ndarray:
+        """Block id at one position (M, 3) per row."""
+        return self._gather(rows, p, (1, 1, 1)).reshape(-1)
+    
+    def _set(self, rows: np.ndarray, p: np.ndarray, block: np.ndarray):
+        i = p - self.block_origin
+        self.blocks[rows, i[:, 0], i[:, 1], i[:, 2]] = block
+    
+    def _cell_index(self, rows: np.ndarray, p: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Index of integer positions into the (N, ...) cell arrays."""
+        i = p - self.cell_origin
+        return rows, i[:, 0], i[:, 1], i[:, 2]
+    
+    def _neighbourhood(self, rows: np.ndarray) -> np.ndarray:
+        """Block ids within BOX_RADIUS of each row's bot."""
+        size = 2 * BOX_RADIUS + 1
+        return self._gather(rows, self._block_pos(rows) - BOX_RADIUS, (size, size, size))
+    
+    def _lava_adjacent(self, rows: np.ndarray, p: np.ndarray) -> np.ndarray:
+        """SimulatedBot.would_release_lava for one position per row."""
+        box = _flat(self._gather(rows, p - 1, (3, 3, 3)))
+        return (box[:, FACE_CELLS] == LAVA).any(axis=1)
+    
+    # ===== PHYSICS =====
+    
+    def _block_pos(self, rows: np.ndarray) -> np.ndarray:
+        return np.floor(self.position[rows]).astype(np.int64)
+    
+    def _heading(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return -np.sin(self.yaw[rows]), np.cos(self.yaw[rows])
+    
+    def _ahead(self, rows: np.ndarray, dy: int = 0) -> np.ndarray:
+        dx, dz = self._heading(rows)
+        p = self.position[rows]
+        return np.stack([
+            np.floor(p[:, 0] + dx), np.floor(p[:, 1]) + dy, np.floor(p[:, 2] + dz)
+        ], axis=1).astype(np.int64)
+    
+    def _settle(self, rows: np.ndarray):
+        """Fall to the ground, then apply fall and lava damage."""
+        b = self._block_pos(rows)
+        fallen = np.zeros(len(rows), dtype=np.int64)
+        falling = np.arange(len(rows))
+        while len(falling):
+            r, p = rows[falling], b[falling]
+            column = self._gather(r, p - (0, 1, 0), (1, 2, 1)).reshape(-1, 2)
+            falling = falling[(p[:, 1] > WORLD_MIN_Y) & IS_AIR[column[:, 0]] & (column[:, 1] != LAVA)]
+            b[falling, 1] -= 1
+            fallen[falling] += 1
+        
+        landed = fallen > 0
+        self.position[rows[landed], 1] = b[landed, 1]
+        self.health[rows] -= np.maximum(fallen - SAFE_FALL, 0) * landed
+        column = self._gather(rows, b, (1, 2, 1)).reshape(-1, 2)
+        self.health[rows] -= LAVA_DAMAGE * (column == LAVA).any(axis=1)
+        
+        dead = rows[self.health[rows] <= 0]
+        self.health[dead] = 0.0
+        self.running[dead] = False
+    
+    def _walk(self, rows: np.ndarray, dx: np.ndarray, dz: np.ndarray, blocks: int, climb: bool = False):
+        """Walk up to `blocks` blocks toward (dx, dz), stopping at walls and the region edge."""
+        (x0, _, z0), extent = self.origin, self.extent
+        can_climb = np.full(len(rows), climb)
+        for _ in range(blocks):
+            p = self.position[rows]
+            b = np.floor(p).astype(np.int64)
+            tx, tz = np.floor(p[:, 0] + dx).astype(np.int64), np.floor(p[:, 2] + dz).astype(np.int64)
+            target = np.stack([tx, b[:, 1], tz], axis=1)
+            passable = IS_PASSABLE[self._gather(rows, target, (1, 3, 1)).reshape(-1, 3)]
+            head_room = IS_PASSABLE[self._get(rows, b + (0, 2, 0))]
+            
+            turned = (tx != b[:, 0]) | (tz != b[:, 2])
+            turned &= (x0 <= tx) & (tx < x0 + extent) & (z0 <= tz) & (tz < z0 + extent)
+            walk = turned & passable[:, 0] & passable[:, 1]
+            up = turned & ~walk & can_climb & passable[:, 1] & passable[:, 2] & head_room
+            moved = walk | up
+            
+            self.position[rows[moved], 0] = tx[moved] + 0.5
+            self.position[rows[moved], 2] = tz[moved] + 0.5
+            self.position[rows[up], 1] += 1
+            can_climb &= ~up
+            
+            keep = np.flatnonzero(moved)
+            rows, dx, dz, can_climb = rows[keep], dx[keep], dz[keep], can_climb[keep]
+            self._settle(rows)
+            alive = self.running[rows]
+            rows, dx, dz, can_climb = rows[alive], dx[alive], dz[alive], can_climb[alive]
+            if not len(rows):
+                break
+    
+    def _move(self, rows: np.ndarray, direction: str, blocks: int, climb: bool = False):
+        fx, fz = self._heading(rows)
+        dx, dz = {
+            "forward": (fx, fz),
+            "back": (-fx, -fz),
+            "left": (fz, -fx),
+            "right": (-fz, fx),
+        }[direction]
+        self._walk(rows, dx, dz, blocks, climb)
+    
+    def _look(self, rows: np.ndarray, yaw: np.ndarray, pitch: np.ndarray):
+        self.yaw[rows] = yaw
+        self.pitch[rows] = np.clip(pitch, -math.pi / 2, math.pi / 2)
+    
+    def _look_at(self, rows: np.ndarray, target: np.ndarray):
+        d = target - self.position[rows] - (0, 1.62, 0)
+        self._look(rows, np.arctan2(-d[:, 0], d[:, 2]), np.arctan2(-d[:, 1], np.hypot(d[:, 0], d[:, 2])))
+    
+    def _dig(self, rows: np.ndarray, p: np.ndarray):
+        """Mine one block per row into the inventory. Opened lava flows into the hole."""
+        block = self._get(rows, p)
+        ok = ~IS_AIR[block] & (block != BEDROCK) & (block != LAVA)
+        rows, p, block = rows[ok], p[ok], block[ok]
+        np.add.at(self.inventory, (rows, DROP_ITEM[block]), 1)
+        self._set(rows, p, np.where(self._lava_adjacent(rows, p), LAVA, AIR))
+        
+        # A mined block turns to air, so every ore dug is a new one
+        ore = ORE_VALUE[block] > 0
+        self.mined_ores[rows[ore]] += 1
+        self.diamonds[rows[ore & IS_DIAMOND[block]]] += 1
+    
+    # ===== SCANS =====
+    
+    @staticmethod
+    def _cube(box: np.ndarray, radius: int) -> np.ndarray:
+        lo, hi = BOX_RADIUS - radius, BOX_RADIUS + radius + 1
+        return box[:, lo:hi, lo:hi, lo:hi]
+    
+    def _visible(self, box: np.ndarray, radius: int, table: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """
+        (row, cell, id) of every block of the radius cubes of neighbourhoods
+        that is in table (a per-id bool table) and touches air on some face,
+        with cells numbered in scan order.
+        """
+        row, i, j, k = np.nonzero(table[self._cube(box, radius)])
+        lo = BOX_RADIUS - radius
+        bi, bj, bk = i + lo, j + lo, k + lo
+        exposed = np.zeros(len(row), dtype=bool)
+        for dx, dy, dz in FACES:
+            exposed |= IS_AIR[box[row, bi + dx, bj + dy, bk + dz]]
+        side = 2 * radius + 1
+        cell = (i * side + j) * side + k
+        return row[exposed], cell[exposed], box[row, bi, bj, bk][exposed]
+    
+    @staticmethod
+    def _first_best(m: int, row: np.ndarray, cell: np.ndarray, score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(found, index into row) of each row's first highest scoring cell."""
+        order = np.lexsort((cell, -score, row))
+        first = order[np.r_[True, row[order][1:] != row[order][:-1]]] if len(order) else order
+        found = np.zeros(m, dtype=bool)
+        best = np.zeros(m, dtype=np.intp)
+        found[row[first]] = True
+        best[row[first]] = first
+        return found, best
+    
+    def _cell_position(self, rows: np.ndarray, radius: int, cell: np.ndarray) -> np.ndarray:
+        side = 2 * radius + 1
+        offset = np.stack(np.unravel_index(cell, (side,) * 3), axis=1) - radius
+        return self._block_pos(rows) + offset
+    
+    def _nearest_visible_ore(self, rows: np.ndarray, max_distance: int):
+        """SimulatedBot.find_nearest_visible_ore: (found, position, id) per row."""
+        row, cell, ids = self._visible(self._neighbourhood(rows), max_distance, IS_VALUABLE)
+        score = ORE_VALUE[ids] / (CUBE_DIST[max_distance].ravel()[cell] + 1)
+        found, best = self._first_best(len(rows), row, cell, score)
+        if not len(row):
+            return found, self._block_pos(rows), np.zeros(len(rows), dtype=np.uint8)
+        return found, self._cell_position(rows, max_distance, cell[best]), ids[best]
+    
+    def _best_visible_ore(self, box: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(found, id) of the first most valuable ore of get_visible_ores per row."""
+        row, cell, ids = self._visible(box, ORE_RADIUS, IS_VALUABLE)
+        found, best = self._first_best(len(box), row, cell, ORE_VALUE[ids])
+        if not len(row):
+            return found, np.zeros(len(box), dtype=np.uint8)
+        return found, ids[best]
+    
+    def _in_cave(self, box: np.ndarray) -> np.ndarray:
+        r = BOX_RADIUS
+        area = _flat(box[:, r - 3:r + 4, r - 2:r + 4, r - 3:r + 4])
+        return (IS_AIR[area].sum(axis=1) > 50) & (IS_STONE[area].sum(axis=1) > 30)
+    
+    def _find_cave_entrance(self, rows: np.ndarray, max_dist: int = CAVE_RADIUS):
+        """SimulatedBot.find_cave_entrance: (found, position) per row."""
+        lo = self._block_pos(rows) - (max_dist + 1)
+        side = 2 * max_dist + 3
+        box = self._gather(rows, lo, (side, max_dist + 5, side))
+        stone = IS_STONE[box].astype(np.int8)
+        inner = box[:, 1:-1, 1:-1, 1:-1]
+        count = np.zeros(inner.shape, dtype=np.int8)
+        sx, sy, sz = inner.shape[1:]
+        for dx, dy, dz in FACES:
+            count += stone[:, 1 + dx:1 + dx + sx, 1 + dy:1 + dy + sy, 1 + dz:1 + dz + sz]
+        candidates = _flat(IS_AIR[inner] & (count >= 3))
+        first = candidates.argmax(axis=1)
+        offset = np.stack(np.unravel_index(first, inner.shape[1:]), axis=1)
+        return candidates.any(axis=1), lo + 1 + offset
+    
+    # ===== ACTIONS =====
+    
+    def _tunnel_forward(self, rows: np.ndarray):
+        """Dig a 2-high passage with a lava check, then step into it."""
+        block1, block2 = self._ahead(rows), self._ahead(rows, 1)
+        safe = ~(self._lava_adjacent(rows, block1) | self._lava_adjacent(rows, block2))
+        rows, block1, block2 = rows[safe], block1[safe], block2[safe]
+        self._dig(rows, block1)
+        self._dig(rows, block2)
+        self._move(rows, "forward", 1)
+        self.strip_mine_length[rows] += 1
+    
+    def _strip_mine(self, rows: np.ndarray):
+        self.strategy[rows] = STRATEGY_STRIP_MINE
+        self._tunnel_forward(rows)
+        self.strip_mine_length[rows] += 1
+        
+        found, best = self._best_visible_ore(self._neighbourhood(rows))
+        diamond = found & IS_DIAMOND[best]
+        self._mine_diamond(rows[diamond])
+        self._mine_nearest_ore(rows[found & ~diamond & (ORE_VALUE[best] >= 10)])
+    
+    def _branch_mine(self, rows: np.ndarray):
+        self.strategy[rows] = STRATEGY_STRIP_MINE
+        self._tunnel_forward(rows)
+        self.branch_count[rows] += 1
+        
+        # Every 6 steps, look left and right for diamonds
+        rows = rows[self.branch_count[rows] % 6 == 0]
+        original_yaw = self.yaw[rows]
+        for side in (-math.pi / 2, math.pi / 2):
+            self._look(rows, original_yaw + side, np.zeros(len(rows)))
+            found, _, ids = self._nearest_visible_ore(rows, 3)
+            self._mine_diamond(rows[found & IS_DIAMOND[ids]])
+        self._look(rows, original_yaw, np.zeros(len(rows)))
+    
+    def _mine_nearest_ore(self, rows: np.ndarray):
+        found, target, _ = self._nearest_visible_ore(rows, 5)
+        rows, target = rows[found], target[found]
+        near = np.sqrt(((target - self.position[rows]) ** 2).sum(axis=1)) <= 4.5
+        near_rows, near_target = rows[near], target[near]
+        safe = ~self._lava_adjacent(near_rows, near_target)
+        self._look_at(near_rows[safe], near_target[safe])
+        self._dig(near_rows[safe], near_target[safe])
+        
+        self._look_at(rows[~near], target[~near])
+        self._move(rows[~near], "forward", 1)
+    
+    def _mine_diamond(self, rows: np.ndarray):
+        """Mine the closest exposed diamond ore, or walk toward it."""
+        row, cell, _ = self._visible(self._neighbourhood(rows), ORE_RADIUS, IS_DIAMOND)
+        found, best = self._first_best(len(rows), row, cell, -CUBE_DIST[ORE_RADIUS].ravel()[cell])
+        target = self._cell_position(rows, ORE_RADIUS, cell[best] if len(row) else best)
+        rows, target = rows[found], target[found]
+        near = np.sqrt(((target - self._block_pos(rows)) ** 2).sum(axis=1)) <= 4.5
+        
+        self._look_at(rows, target)
+        self._dig(rows[near], target[near])
+        self._move(rows[~near], "forward", 2)
+    
+    def _descend(self, rows: np.ndarray):
+        """Staircase down to diamond level, then strip mine."""
+        self.strategy[rows] = STRATEGY_DESCEND
+        y = self.position[rows, 1]
+        self._strip_mine(rows[y <= -50])
+        self._tunnel_forward(rows[(y > -50) & (y <= -40)])
+        
+        rows = rows[y > -40]
+        ahead, below = self._ahead(rows), self._ahead(rows, -1)
+        lava = self._lava_adjacent(rows, below)
+        self._switch_direction(rows[lava])
+        rows, ahead, below = rows[~lava], ahead[~lava], below[~lava]
+        
+        block = self._get(rows, ahead)
+        clear = (block != BEDROCK) & (block != LAVA)
+        rows, ahead, below = rows[clear], ahead[clear], below[clear]
+        self._dig(rows, ahead)
+        self._dig(rows, below)
+        # A 1.8 block tall player needs the block above the step clear too
+        self._dig(rows, self._ahead(rows, 1))
+        self._move(rows, "forward", 1)
+    
+    def _find_cave(self, rows: np.ndarray):
+        found, cave = self._find_cave_entrance(rows)
+        self._look_at(rows[found], cave[found])
+        self._move(rows[found], "forward", 2)
+        self._descend(rows[~found])
+    
+    def _explore_cave(self, rows: np.ndarray):
+        self.strategy[rows] = STRATEGY_EXPLORE_CAVE
+        box = self._neighbourhood(rows)
+        in_cave = self._in_cave(box)
+        self.in_cave[rows] = in_cave
+        self._find_cave(rows[~in_cave])
+        
+        found, _ = self._best_visible_ore(box)
+        self._mine_nearest_ore(rows[in_cave & found])
+        
+        rows = rows[in_cave & ~found]
+        self._move(rows, "forward", 1)
+        self._look(rows, self.yaw[rows] + 0.3, self.pitch[rows])
+    
+    def _safe_dig_down(self, rows: np.ndarray):
+        below = self._block_pos(rows) - (0, 1, 0)
+        block = self._get(rows, below)
+        ok = ~IS_AIR[block] & (block != BEDROCK)
+        rows, below = rows[ok], below[ok]
+        safe = ~self._lava_adjacent(rows, below)
+        self._dig(rows[safe], below[safe])
+        self._settle(rows[safe])
+    
+    def _switch_direction(self, rows: np.ndarray):
+        self.mining_direction[rows] = (self.mining_direction[rows] + 1) % 4
+        self._look(rows, np.asarray(MINING_ANGLES)[self.mining_direction[rows]], np.zeros(len(rows)))
+        self.strip_mine_length[rows] = 0
+    
+    # ===== OBSERVATIONS =====
+    
+    def _observe(self, rows: np.ndarray, out: np.ndarray) -> Dict[str, Any]:
+        """
+        Write the ObservationProcessor features of each row's observation
+        into out and return the block scans the rewards need.
+        """
+        m = len(rows)
+        b = self._block_pos(rows)
+        p = self.position[rows]
+        y = p[:, 1]
+        box = self._neighbourhood(rows)
+        nearby = self._cube(box, NEARBY_RADIUS)
+        
+        # The bot reports health 0 as 20 (`bot.health || 20`)
+        health = np.where(self.health[rows] == 0, 20.0, self.health[rows])
+        out[:, 0:3] = p
+        out[:, 3] = health / 20.0
+        out[:, 4] = 1.0  # Food never drops
+        out[:, 5] = np.sin(self.yaw[rows])
+        out[:, 6] = np.cos(self.yaw[rows])
+        out[:, 7] = np.sin(self.pitch[rows])
+        out[:, 8] = np.cos(self.pitch[rows])
+        
+        processor = ObservationProcessor
+        out[:, 9] = y / 320.0
+        out[:, 10] = y <= processor.DIAMOND_Y_MAX
+        out[:, 11] = y <= 0
+        out[:, 12] = (processor.DIAMOND_Y_MIN <= y) & (y <= processor.DIAMOND_Y_MAX)
+        out[:, 13] = np.maximum(0, (processor.DIAMOND_Y_MAX - y) / 80.0)
+        
+        # Block features over the nearbyBlocks cube (air is not listed)
+        codes = _flat(BLOCK_CODE[nearby])
+        counts = np.bincount(
+            (np.arange(m)[:, None] * (processor.NUM_CODES + 1) + codes).ravel(),
+            minlength=m * (processor.NUM_CODES + 1),
+        ).reshape(m, processor.NUM_CODES + 1)
+        ore_cells = IS_ORE[nearby]
+        ore_rows, *ore_offsets = np.nonzero(ore_cells)
+        ore_pos = b[ore_rows] - NEARBY_RADIUS + np.stack(ore_offsets, axis=1)
+        ore_ids = nearby[ore_cells]
+        dist = np.sqrt(((ore_pos - p[ore_rows]) ** 2).sum(axis=1))
+        valuable = BLOCK_CODE[ore_ids] < processor.CODE_DANGER
+        closest_ore = np.full(m, 100.0)
+        closest_diamond = np.full(m, 100.0)
+        np.minimum.at(closest_ore, ore_rows[valuable], dist[valuable])
+        is_diamond = valuable & IS_DIAMOND[ore_ids]
+        np.minimum.at(closest_diamond, ore_rows[is_diamond], dist[is_diamond])
+        
+        ore_count = counts[:, :processor.CODE_DANGER].sum(axis=1)
+        diamond_count = counts[:, :processor.CODE_DANGER][:, processor.DIAMOND_CODES[:processor.CODE_DANGER]].sum(axis=1)
+        danger_count = counts[:, processor.CODE_DANGER]
+        out[:, 14] = np.minimum(ore_count / 10.0, 1.0)
+        out[:, 15] = np.minimum(diamond_count / 5.0, 1.0)
+        out[:, 16] = np.minimum(danger_count / 5.0, 1.0)
+        out[:, 17] = np.minimum(counts[:, processor.CODE_STONE] / 50.0, 1.0)
+        out[:, 18] = np.minimum(counts[:, processor.CODE_AIR] / 50.0, 1.0)
+        out[:, 19] = 1.0 - np.minimum(closest_ore / 10.0, 1.0)
+        out[:, 20] = 1.0 - np.minimum(closest_diamond / 10.0, 1.0)
+        out[:, 21] = diamond_count > 0
+        out[:, 22] = ore_count > 0
+        out[:, 23] = danger_count > 0
+        
+        inventory = self.inventory[rows]
+        diamonds = inventory[:, ITEM_INDEX["diamond"]]
+        out[:, 24] = np.minimum(diamonds / 10.0, 1.0)
+        out[:, 25] = 0.0  # Ores drop raw iron, never ingots
+        out[:, 26] = np.minimum(inventory[:, ITEM_INDEX["coal"]] / 64.0, 1.0)
+        out[:, 27] = np.minimum(inventory[:, ITEM_INDEX["cobblestone"]] / 64.0, 1.0)
+        out[:, 28] = 0.0  # No torches
+        out[:, 29] = diamonds > 0
+        out[:, 30] = inventory[:, ITEM_INDEX["iron_pickaxe"]] > 0
+        out[:, 31] = np.minimum(inventory.sum(axis=1) / 100.0, 1.0)
+        
+        # Exploration state, keyed like int(x), int(y), int(z)
+        cells = self._cell_index(rows, np.trunc(p).astype(np.int64))
+        new = (self.marks[cells] & OBS_VISITED) == 0
+        self.marks[cells] |= OBS_VISITED
+        self.obs_visited[rows] += new
+        out[:, 32] = self.obs_visited[rows] / 1000.0
+        out[:, 33] = new
+        out[:, 34] = (self.start_y[rows] - y) / 100.0
+        
+        # scanForDanger: lava within DANGER_RADIUS or a drop below
+        lava_dist = np.where(IS_LAVA_ID[self._cube(box, DANGER_RADIUS)], CUBE_DIST[DANGER_RADIUS], 100.0)
+        column = IS_AIR[box[:, BOX_RADIUS, BOX_RADIUS - 5:BOX_RADIUS, BOX_RADIUS][:, ::-1]]
+        ground = np.argmin(column, axis=1) + 5 * column.all(axis=1)
+        ground_block = box[np.arange(m), BOX_RADIUS, BOX_RADIUS - 1 - np.minimum(ground, 4), BOX_RADIUS]
+        fall_risk = (ground >= 4) | ((ground < 5) & (ground_block == LAVA))
+        
+        visible, best = self._best_visible_ore(box)
+        self.diamond_nearby[rows] = visible & IS_DIAMOND[best]
+        return {
+            "danger": (_flat(lava_dist).min(axis=1) < 4) | fall_risk,
+            "health": health,
+            "ore_rows": ore_rows,
+            "ore_pos": ore_pos,
+            "ore_ids": ore_ids,
+            "ore_dist": dist,
+        }
+    
+    # ===== REWARDS =====
+    
+    def _reward(self, rows: np.ndarray, scan: Dict[str, Any]) -> np.ndarray:
+        """RewardCalculator.calculate for each row's new observation."""
+        m = len(rows)
+        w = {key: value[rows] for key, value in self.rewards.items()}
+        self.reward_steps[rows] += 1
+        reward = np.zeros(m)
+        p = self.position[rows]
+        y = p[:, 1]
+        health = scan["health"]
+        
+        # Terminal: diamond in inventory, or death; no other terms or tracking
+        found = self.inventory[rows, ITEM_INDEX["diamond"]] > 0
+        dead = ~found & (health <= 0)
+        reward[found] = w["diamond_found"][found]
+        reward[dead] = w["death"][dead]
+        active = ~(found | dead)
+        reward[active] += w["step_penalty"][active]
+        
+        # Mining: every nearby ore not yet counted, once the bot mined more
+        ore_rows, ore_ids = scan["ore_rows"], scan["ore_ids"]
+        ore_cells = self._cell_index(rows[ore_rows], scan["ore_pos"])
+        ore_active = active[ore_rows]
+        mining = (self.mined_ores[rows] > self.rewarded_mined[rows])[ore_rows] & ore_active
+        newly_mined = mining & ((self.marks[ore_cells] & MINED) == 0)
+        self.marks[tuple(c[newly_mined] for c in ore_cells)] |= MINED
+        self.rewarded_mined[rows] += np.bincount(ore_rows[newly_mined], minlength=m)
+        mined_reward = self._mined_rewards[rows[ore_rows], MINED_KIND[ore_ids]]
+        reward += np.bincount(ore_rows[newly_mined], weights=mined_reward[newly_mined], minlength=m)
+        
+        # Y-level
+        enter = active & (y <= 16) & ~self.entered_diamond_zone[rows]
+        reward[enter] += w["enter_diamond_zone"][enter]
+        self.entered_diamond_zone[rows[enter]] = True
+        
+        deeper = active & (y < self.lowest_y[rows])
+        depth_gain = self.lowest_y[rows] - y
+        depth_bonus = w["new_depth_record"] * depth_gain * np.where(y < 0, 2.0, 1.0)
+        reward[deeper] += np.minimum(depth_bonus[deeper], 10.0)
+        self.lowest_y[rows[deeper]] = y[deeper]
+        
+        optimal = active & (-59 <= y) & (y <= -50)
+        reward[optimal] += 2.0 * w["at_optimal_y"][optimal]
+        
+        ix, iz = np.trunc(p[:, 0]).astype(np.int64), np.trunc(p[:, 2]).astype(np.int64)
+        column = (rows, ix - self.origin[0], iz - self.origin[2])
+        diamond_level = active & (-64 <= y) & (y <= -50)
+        reward[diamond_level] += w["at_optimal_y"][diamond_level]
+        new_column = diamond_level & ~self.columns[column]
+        reward[new_column] += w["horizontal_exploration"][new_column]
+        self.horizontal_at_diamond[rows] += new_column
+        
+        surface = active & (y > 62)
+        reward[surface] += w["surface_penalty"][surface]
+        
+        # Ore visibility
+        ore_dist = scan["ore_dist"]
+        diamond_ores = ore_active & IS_DIAMOND[ore_ids]
+        closest = np.full(m, np.inf)
+        np.minimum.at(closest, ore_rows[diamond_ores], ore_dist[diamond_ores])
+        unseen = ore_active & ((self.marks[ore_cells] & SEEN) == 0)
+        self.marks[tuple(c[unseen] for c in ore_cells)] |= SEEN
+        self.seen_ores[rows] += np.bincount(ore_rows[unseen], minlength=m)
+        seen_reward = np.where(
+            IS_DIAMOND[ore_ids], w["diamond_ore_visible"][ore_rows], w["other_ore_visible"][ore_rows]
+        )
+        reward += np.bincount(ore_rows[unseen], weights=seen_reward[unseen], minlength=m)
+        
+        prev = self.prev_closest_diamond[rows]
+        approach = active & (closest < np.inf) & (closest < prev)
+        with np.errstate(invalid="ignore"):
+            approach_bonus = np.minimum(w["approaching_diamond"] * (prev - closest), 30.0)
+        reward[approach] += approach_bonus[approach]
+        self.prev_closest_diamond[rows[active]] = closest[active]
+        
+        # Exploration
+        iy = y.astype(np.int64)
+        cells = self._cell_index(rows, np.stack([ix, iy, iz], axis=1))
+        new = active & ((self.marks[cells] & VISITED) == 0)
+        deep = (-59 <= y) & (y <= -45)
+        reward[new] += np.where(deep, 10.0, 1.0)[new] * w["new_block_visited"][new]
+        self.horizontal_at_diamond[rows] += new & deep
+        self.marks[tuple(c[new] for c in cells)] |= VISITED
+        self.visited[rows] += new
+        at_depth = new & (-64 <= iy) & (iy <= -50)
+        self.columns[tuple(c[at_depth] for c in column)] = True
+        
+        first = optimal & (self.horizontal_at_diamond[rows] == 0)
+        reward[first] += 50.0
+        
+        # Stuck detection
+        prev_position = self.prev_position[rows]
+        has_prev = active & ~np.isnan(prev_position[:, 0])
+        still = np.sqrt(((p - prev_position) ** 2).sum(axis=1)) < 0.1
+        stuck = self.stuck_counter[rows]
+        stuck = np.where(has_prev, np.where(still, stuck + 1, 0), stuck)
+        self.stuck_counter[rows] = stuck
+        penalized = has_prev & still & (stuck > 15)
+        reward[penalized] += w["stuck_penalty"][penalized]
+        self.prev_position[rows[active]] = p[active]
+        
+        # Survival
+        prev_health = self.prev_health[rows]
+        damaged = active & (health < prev_health)
+        reward[damaged] += (w["damage_taken"] * (prev_health - health))[damaged]
+        self.prev_health[rows[active]] = health[active]
+        
+        low = active & (health < 5)
+        reward[low] += w["low_health"][low]
+        
+        danger = scan["danger"]
+        near = active & danger
+        reward[near] += w["danger_proximity"][near]
+        avoided = active & self.prev_danger[rows] & ~danger
+        reward[avoided] += w["avoided_danger"][avoided]
+        self.prev_danger[rows[active]] = danger[active]
+        
+        self.total_reward[rows[active]] += reward[active]
+        return reward
+    
+    # ===== EPISODE =====
+    
+    def reset(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Start new episodes in the given worlds (default: all), each with a
+        fresh world. Returns their (M, 35) first observations.
+        """
+        rows = np.arange(self.num_worlds) if indices is None else np.asarray(indices, dtype=np.intp)
+        for i in rows:
+            self.episodes[i] += 1
+            seed = int(self.seeds[i] + self.episodes[i])
+            self.blocks[i] = generate_region(seed, self.block_origin, self.block_shape)
+            surface = int(surface_height(seed, np.array([0]), np.array([0]))[0, 0])
+            self.position[i] = (0.5, surface + 1.0, 0.5)
+        
+        self.marks[rows] = 0
+        self.columns[rows] = False
+        self.yaw[rows] = 0.0
+        self.pitch[rows] = 0.0
+        self.health[rows] = 20.0
+        self.inventory[rows] = 0
+        self.inventory[rows, ITEM_INDEX["iron_pickaxe"]] = 1
+        self.running[rows] = True
+        self.mining_direction[rows] = [self.rngs[i].randrange(4) for i in rows]
+        self.strategy[rows] = STRATEGY_DESCEND
+        self.in_cave[rows] = False
+        for state in (
+            self.step_count, self.mined_ores, self.diamonds, self.strip_mine_length, self.branch_count,
+            self.obs_visited, self.visited, self.seen_ores, self.rewarded_mined, self.stuck_counter,
+            self.total_reward, self.reward_steps, self.horizontal_at_diamond,
+        ):
+            state[rows] = 0
+        self.start_y[rows] = self.position[rows, 1]
+        self.lowest_y[rows] = 320.0
+        self.entered_diamond_zone[rows] = False
+        self.prev_health[rows] = 20.0
+        self.prev_position[rows] = np.nan
+        self.prev_danger[rows] = False
+        self.prev_closest_diamond[rows] = np.inf
+        
+        obs = np.empty((len(rows), OBS_SIZE), dtype=np.float32)
+        self._observe(rows, obs)
+        return obs
+    
+    def step(
+        self, actions: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Apply one action id per world. Returns (obs (N, 35), rewards (N,),
+        terminated (N,)); terminated worlds keep their state until reset.
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_worlds)
+        if out is None:
+            out = np.empty((self.num_worlds, OBS_SIZE), dtype=np.float32)
+        
+        self.step_count += 1
+        for action, handler in self._handlers.items():
+            rows = np.flatnonzero(actions == action)
+            if len(rows):
+                handler(rows)
+        self.health[self.running] = np.minimum(20.0, self.health[self.running] + REGEN_PER_STEP)
+        
+        rows = np.arange(self.num_worlds)
+        scan = self._observe(rows, out)
+        rewards = self._reward(rows, scan)
+        self.running &= self.diamonds == 0
+        terminated = ~self.running | (self.health <= 0)
+        return out, rewards, terminated
+    
+    def episode_stats(self, i: int) -> Dict[str, Any]:
+        """RewardCalculator.get_stats of one world."""
+        return {
+            "total_reward": float(self.total_reward[i]),
+            "steps": int(self.reward_steps[i]),
+            "lowest_y": float(self.lowest_y[i]),
+            "blocks_visited": int(self.visited[i]),
+            "ores_seen": int(self.seen_ores[i]),
+            "ores_mined": int(self.rewarded_mined[i]),
+            "entered_diamond_zone": bool(self.entered_diamond_zone[i]),
+            "horizontal_at_diamond": int(self.horizontal_at_diamond[i]),
+        }
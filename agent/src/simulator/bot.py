@@ -0,0 +1,964 @@
+"""
+Terra Scout Simulated Bot
+Python stand-in for the Mineflayer bot (bot/src/bot.js) in a VoxelWorld
+"""
+
+import base64
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger # type: ignore
+from .world import AIR, BEDROCK, BLOCKS, CAVE_AIR, LAVA, VoxelWorld
+
+logger = get_logger(__name__)
+
+# Same values as TerraScoutBot.oreValues
+ORE_VALUES: Dict[str, int] = {
+    "diamond_ore": 100,
+    "deepslate_diamond_ore": 100,
+    "emerald_ore": 50,
+    "deepslate_emerald_ore": 50,
+    "gold_ore": 20,
+    "deepslate_gold_ore": 20,
+    "lapis_ore": 15,
+    "deepslate_lapis_ore": 15,
+    "redstone_ore": 10,
+    "deepslate_redstone_ore": 10,
+    "iron_ore": 5,
+    "deepslate_iron_ore": 5,
+    "copper_ore": 3,
+    "deepslate_copper_ore": 3,
+    "coal_ore": 1,
+    "deepslate_coal_ore": 1,
+}
+
+# Item each block drops when mined with an iron pickaxe
+DROPS: Dict[str, str] = {
+    "stone": "cobblestone",
+    "deepslate": "cobbled_deepslate",
+    "grass_block": "dirt",
+    "coal_ore": "coal",
+    "iron_ore": "raw_iron",
+    "gold_ore": "raw_gold",
+    "redstone_ore": "redstone",
+    "lapis_ore": "lapis_lazuli",
+    "diamond_ore": "diamond",
+    "emerald_ore": "emerald",
+}
+
+# Per-block-id lookup tables
+ORE_VALUE = np.array([ORE_VALUES.get(name, 0) for name in BLOCKS], dtype=np.int64)
+IS_AIR = np.isin(np.arange(len(BLOCKS)), [AIR, CAVE_AIR])
+IS_DIAMOND = np.array(["diamond" in name for name in BLOCKS])
+IS_STONE = np.array(["stone" in name or "deepslate" in name for name in BLOCKS])
+IS_LAVA = np.arange(len(BLOCKS)) == LAVA
+ITEM_DROPS = [
+    DROPS.get(name.replace("deepslate_", "", 1) if name.endswith("_ore") else name, name)
+    for name in BLOCKS
+]
+
+FACES = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+MINING_ANGLES = (0.0, math.pi / 2, math.pi, -math.pi / 2)
+
+# Walking speed (blocks/s): an action holding a control for t ms moves
+# round(t * speed) blocks, at least one
+WALK_SPEED = 4.317
+SPRINT_SPEED = 5.612
+
+NEARBY_RADIUS = 4  # nearbyBlocks / blockGrid cube
+ORE_RADIUS = 6  # getVisibleOres / mine_diamond scan
+DANGER_RADIUS = 4  # scanForDanger
+CAVE_RADIUS = 12  # find_cave entrance scan
+BOX_RADIUS = ORE_RADIUS + 1  # cached neighbourhood, covers the exposure checks
+
+# Spawn states reset can pick (reset option "spawn"): surface columns, as
+# every episode is a fresh world; state 0 is the world spawn
+SPAWN_COLUMNS = ((0, 0), (24, 0), (0, 24), (-24, 0), (0, -24))
+
+LAVA_DAMAGE = 4.0
+SAFE_FALL = 3
+REGEN_PER_STEP = 0.0625  # natural regeneration with a full hunger bar
+
+
+class SimulatedBot:
+    """
+    The TerraScoutBot state machine, episode logic, observation schema and
+    rewards, running against a procedural VoxelWorld instead of a Minecraft
+    server.
+    
+    Every macro action follows its bot.js counterpart block for block;
+    movement is discretised to whole blocks (a control held for t ms moves
+    the bot round(t * walk speed) blocks) and physics is reduced to
+    gravity, fall damage, lava damage and natural regeneration. Each reset
+    generates a fresh world (seed + episode number unless the reset
+    options name a seed) and spawns the bot on the surface of a spawn
+    state column, (0, 0) unless the options pick another.
+    """
+    
+    # Send blockGrid data as the uint16 id array instead of base64 text
+    # (in-process use, where nothing is serialized)
+    raw_grid = False
+    
+    def __init__(self, seed: int = 0, block_format: str = "list"):
+        self.seed = seed
+        self.block_format = block_format
+        self.is_connected = True
+        self.episode = 0
+        self.rng = random.Random(seed)
+        
+        self.world = VoxelWorld(seed)
+        self.position = [0.5, float(self.world.surface(0, 0) + 1), 0.5]
+        self.yaw = 0.0
+        self.pitch = 0.0
+        self.health = 20.0
+        self.food = 20.0
+        self.inventory: Dict[str, int] = {"iron_pickaxe": 1}
+        
+        self.step_count = 0
+        self.total_reward = 0.0
+        self.visited_blocks: Set[Tuple[int, int, int]] = set()
+        self.mined_ores: Set[Tuple[int, int, int]] = set()
+        self.stuck_counter = 0
+        self.last_position: Optional[List[float]] = None
+        self.episode_running = False
+        self.diamonds_this_episode = 0
+        self.mining_direction = 0
+        self.strip_mine_length = 0
+        self.branch_count = 0
+        self.current_strategy = "descend"
+        self.in_cave = False
+        self.cave_entrance_pos: Optional[Tuple[int, int, int]] = None
+        
+        self.spawn_states: List[Dict[str, float]] = [
+            {"x": x, "z": z, "yaw": 0.0} for x, z in SPAWN_COLUMNS
+        ]
+        self.last_reset: Optional[Dict[str, Any]] = None
+        
+        self.reset_palette()
+        self.delta_seq = 0
+        self.delta_frame: Optional[Dict[str, Any]] = None
+        self._box_key: Optional[Tuple[int, ...]] = None
+        self._box = np.zeros((1, 1, 1), dtype=np.uint8)
+        self._derived: Dict[str, Any] = {}
+        
+        # Pipelined stepping: action replied to but not yet executed, and
+        # the duration / finish time / result of the last one executed
+        self.pending_action: Optional[Dict[str, Any]] = None
+        self.pending_ms = 0.0
+        self.pending_done_at = 0.0
+        self.pending_result: Dict[str, Any] = {"success": True}
+    
+    # ===== BLOCK UTILITIES =====
+    
+    @property
+    def block_pos(self) -> Tuple[int, int, int]:
+        x, y, z = self.position
+        return math.floor(x), math.floor(y), math.floor(z)
+    
+    def neighbourhood(self) -> np.ndarray:
+        """Block ids within BOX_RADIUS of the bot, cached until it moves or digs."""
+        bx, by, bz = self.block_pos
+        key = (bx, by, bz, self.world.version)
+        if key != self._box_key:
+            r = BOX_RADIUS
+            self._box = self.world.box((bx - r, by - r, bz - r), (bx + r + 1, by + r + 1, bz + r + 1))
+            self._box_key = key
+            self._derived = {}
+        return self._box
+    
+    def _cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        """A value derived from the neighbourhood, computed once per neighbourhood."""
+        self.neighbourhood()
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+    
+    def _cube(self, radius: int) -> np.ndarray:
+        """Block ids of the cube of half-width radius around the bot."""
+        lo, hi = BOX_RADIUS - radius, BOX_RADIUS + radius + 1
+        return self.neighbourhood()[lo:hi, lo:hi, lo:hi]
+    
+    def _exposed(self, radius: int) -> np.ndarray:
+        """Which blocks of the radius cube touch air on some face."""
+        air = IS_AIR[self.neighbourhood()]
+        lo, hi = BOX_RADIUS - radius, BOX_RADIUS + radius + 1
+        exposed = np.zeros((hi - lo,) * 3, dtype=bool)
+        for dx, dy, dz in FACES:
+            exposed |= air[lo + dx:hi + dx, lo + dy:hi + dy, lo + dz:hi + dz]
+        return exposed
+    
+    def would_release_lava(self, x: int, y: int, z: int) -> bool:
+        return any(self.world.get(x + dx, y + dy, z + dz) == LAVA for dx, dy, dz in FACES)
+    
+    def scan_for_danger(self, radius: int = 3) -> Dict[str, Any]:
+        lava = np.argwhere(IS_LAVA[self._cube(radius)]) - radius
+        closest_lava = 100
+        danger_type = None
+        if len(lava):
+            dist = np.sqrt((lava ** 2).sum(axis=1))
+            closest_lava = float(dist.min())
+            danger_type = "lava"
+        
+        fall_risk = self.check_for_fall()
+        return {
+            "dangerNearby": closest_lava < 4 or fall_risk,
+            "lavaDistance": closest_lava,
+            "fallRisk": fall_risk,
+            "dangerType": danger_type,
+        }
+    
+    def check_for_fall(self) -> bool:
+        column = self.neighbourhood()[BOX_RADIUS, BOX_RADIUS - 5:BOX_RADIUS, BOX_RADIUS][::-1]
+        air_below = 0
+        for block in column:
+            if IS_AIR[block]:
+                air_below += 1
+            elif block == LAVA:
+                return True
+            else:
+                break
+        return air_below >= 4
+    
+    def is_in_cave(self) -> bool:
+        return self._cached("in_cave", self._scan_in_cave)
+    
+    def _scan_in_cave(self) -> bool:
+        r = BOX_RADIUS
+        box = self.neighbourhood()[r - 3:r + 4, r - 2:r + 4, r - 3:r + 4]
+        return int(IS_AIR[box].sum()) > 50 and int(IS_STONE[box].sum()) > 30
+    
+    def find_cave_entrance(self, max_dist: int = 10) -> Optional[Tuple[int, int, int]]:
+        """First air block (x, y, z scan order) with 3+ stone neighbours."""
+        bx, by, bz = self.block_pos
+        lo = (bx - max_dist - 1, by - max_dist - 1, bz - max_dist - 1)
+        box = self.world.box(lo, (bx + max_dist + 2, by + 4, bz + max_dist + 2))
+        stone = IS_STONE[box]
+        inner = (slice(1, -1),) * 3
+        count = np.zeros(stone[inner].shape, dtype=np.int8)
+        for dx, dy, dz in FACES:
+            count += stone[1 + dx:stone.shape[0] - 1 + dx, 1 + dy:stone.shape[1] - 1 + dy, 1 + dz:stone.shape[2] - 1 + dz]
+        found = np.flatnonzero((IS_AIR[box[inner]] & (count >= 3)).ravel())
+        if len(found) == 0:
+            return None
+        i, j, k = np.unravel_index(found[0], count.shape)
+        return lo[0] + 1 + int(i), lo[1] + 1 + int(j), lo[2] + 1 + int(k)
+    
+    def find_nearest_visible_ore(self, max_distance: int = 6) -> Optional[Tuple[str, Tuple[int, int, int]]]:
+        """Exposed ore with the best value / (distance + 1)."""
+        cube = self._cube(max_distance)
+        candidates = (ORE_VALUE[cube] > 0) & self._exposed(max_distance)
+        if not candidates.any():
+            return None
+        offsets = np.argwhere(candidates)
+        dist = np.sqrt(((offsets - max_distance) ** 2).sum(axis=1))
+        best = offsets[int(np.argmax(ORE_VALUE[cube[candidates]] / (dist + 1)))]
+        bx, by, bz = self.block_pos
+        name = BLOCKS[cube[tuple(best)]]
+        return name, (bx + int(best[0]) - max_distance, by + int(best[1]) - max_distance, bz + int(best[2]) - max_distance)
+    
+    def get_visible_ores(self) -> List[Dict[str, Any]]:
+        return self._cached("visible_ores", self._scan_visible_ores)
+    
+    def _scan_visible_ores(self) -> List[Dict[str, Any]]:
+        cube = self._cube(ORE_RADIUS)
+        candidates = (ORE_VALUE[cube] > 0) & self._exposed(ORE_RADIUS)
+        if not candidates.any():
+            return []
+        offsets = np.argwhere(candidates) - ORE_RADIUS
+        ids = cube[candidates]
+        values = ORE_VALUE[ids]
+        dist = np.sqrt((offsets ** 2).sum(axis=1))
+        x, y, z = self.position
+        ores = [
+            {
+                "name": BLOCKS[ids[i]],
+                "position": {"x": x + int(offsets[i, 0]), "y": y + int(offsets[i, 1]), "z": z + int(offsets[i, 2])},
+                "distance": float(dist[i]),
+                "value": int(values[i]),
+            }
+            for i in np.argsort(-values, kind="stable")
+        ]
+        return ores
+    
+    # ===== OBSERVATIONS =====
+    
+    def get_observation(self) -> Optional[Dict[str, Any]]:
+        if not self.is_connected:
+            return None
+        
+        x, y, z = self.position
+        visible_ores = self.get_visible_ores()
+        in_cave = self.is_in_cave()
+        danger_info = self.scan_for_danger(DANGER_RADIUS)
+        
+        return {
+            "position": {"x": x, "y": y, "z": z},
+            "health": self.health or 20,
+            "food": self.food or 20,
+            "yaw": self.yaw,
+            "pitch": self.pitch,
+            "onGround": not IS_AIR[self.neighbourhood()[BOX_RADIUS, BOX_RADIUS - 1, BOX_RADIUS]],
+            "inventory": dict(self.inventory),
+            "visibleOres": visible_ores,
+            **self.get_block_observation(),
+            "stepCount": self.step_count,
+            "visitedCount": len(self.visited_blocks),
+            "diamondsThisEpisode": self.diamonds_this_episode,
+            "minedOresCount": len(self.mined_ores),
+            "isStuck": self.stuck_counter > 10,
+            
+            # Cave and mining info
+            "inCave": in_cave,
+            "currentStrategy": self.current_strategy,
+            "miningDirection": self.mining_direction,
+            "stripMineLength": self.strip_mine_length,
+            
+            # Danger detection
+            **danger_info,
+            "diamondNearby": any("diamond" in ore["name"] for ore in visible_ores),
+            
+            # Y-level info
+            "atDiamondLevel": -64 <= y <= -50,
+            "atOptimalY": -59 <= y <= -54,
+        }
+    
+    def get_nearby_blocks(self) -> List[Dict[str, Any]]:
+        return self._cached("nearby_blocks", self._scan_nearby_blocks)
+    
+    def _scan_nearby_blocks(self) -> List[Dict[str, Any]]:
+        cube = self._cube(NEARBY_RADIUS)
+        solid = np.argwhere(~IS_AIR[cube])
+        ids = cube[~IS_AIR[cube]]
+        bx, by, bz = self.block_pos
+        origin = (bx - NEARBY_RADIUS, by - NEARBY_RADIUS, bz - NEARBY_RADIUS)
+        coords = (solid + origin).tolist()
+        return [
+            {"name": BLOCKS[block], "position": {"x": cx, "y": cy, "z": cz}}
+            for block, (cx, cy, cz) in zip(ids.tolist(), coords)
+        ]
+    
+    def get_block_observation(self) -> Dict[str, Any]:
+        if self.block_format == "grid":
+            return {"blockGrid": self.get_block_grid(), "blockPalette": list(self.block_palette)}
+        return {"nearbyBlocks": self.get_nearby_blocks()}
+    
+    def reset_palette(self):
+        self.block_palette = ["air"]
+        self.palette_ids = np.full(len(BLOCKS), -1, dtype=np.int64)
+        self.palette_ids[AIR] = 0
+    
+    def get_block_grid(self) -> Dict[str, Any]:
+        """Dense 9x9x9 grid of palette ids, as TerraScoutBot.getBlockGrid."""
+        cube = self._cube(NEARBY_RADIUS)
+        for block in np.unique(cube):
+            if self.palette_ids[block] < 0:
+                self.palette_ids[block] = len(self.block_palette)
+                self.block_palette.append(BLOCKS[block])
+        
+        data = self.palette_ids[cube].astype("<u2")
+        bx, by, bz = self.block_pos
+        size = 2 * NEARBY_RADIUS + 1
+        return {
+            "shape": [size, size, size],
+            "origin": {"x": bx - NEARBY_RADIUS, "y": by - NEARBY_RADIUS, "z": bz - NEARBY_RADIUS},
+            "data": data if self.raw_grid else base64.b64encode(data.tobytes()).decode("ascii"),
+        }
+    
+    def encode_observation(self, observation: Optional[Dict[str, Any]], keyframe: bool = False):
+        """Delta block format, as TerraScoutBot.encodeObservation."""
+        if not observation or self.block_format != "delta":
+            return observation
+        
+        rest = dict(observation)
+        nearby_blocks = rest.pop("nearbyBlocks")
+        visible_ores = rest.pop("visibleOres")
+        blocks = {}
+        for b in nearby_blocks:
+            p = b["position"]
+            blocks[(p["x"], p["y"], p["z"])] = [p["x"], p["y"], p["z"], b["name"]]
+        ores = {}
+        for o in visible_ores:
+            p = o["position"]
+            key = (math.floor(p["x"]), math.floor(p["y"]), math.floor(p["z"]))
+            ores[key] = [*key, o["name"], o["value"]]
+        
+        prev = self.delta_frame
+        self.delta_seq += 1
+        delta: Dict[str, Any] = {"seq": self.delta_seq, "keyframe": bool(keyframe or not prev)}
+        
+        if delta["keyframe"]:
+            delta["blocks"] = list(blocks.values())
+            delta["ores"] = list(ores.values())
+        else:
+            delta["base"] = prev["seq"]
+            delta["positionDelta"] = {
+                axis: rest["position"][axis] - prev["position"][axis] for axis in ("x", "y", "z")
+            }
+            delta["added"] = [b for key, b in blocks.items() if key not in prev["blocks"]]
+            delta["changed"] = [
+                b for key, b in blocks.items() if key in prev["blocks"] and prev["blocks"][key][3] != b[3]
+            ]
+            delta["removed"] = [list(key) for key in prev["blocks"] if key not in blocks]
+            delta["oresAdded"] = [
+                o for key, o in ores.items() if key not in prev["ores"] or prev["ores"][key][3] != o[3]
+            ]
+            delta["oresRemoved"] = [list(key) for key in prev["ores"] if key not in ores]
+        
+        self.delta_frame = {"seq": delta["seq"], "position": rest["position"], "blocks": blocks, "ores": ores}
+        rest["blockDelta"] = delta
+        return rest
+    
+    # ===== PHYSICS =====
+    
+    def _passable(self, x: int, y: int, z: int) -> bool:
+        block = self.world.get(x, y, z)
+        return bool(IS_AIR[block]) or block == LAVA
+    
+    def _settle(self):
+        """Fall to the ground, then apply fall and lava damage."""
+        bx, by, bz = self.block_pos
+        fallen = 0
+        while by > -64 and IS_AIR[self.world.get(bx, by - 1, bz)] and self.world.get(bx, by, bz) != LAVA:
+            by -= 1
+            fallen += 1
+        if fallen:
+            self.position[1] = float(by)
+            if fallen > SAFE_FALL:
+                self.health -= fallen - SAFE_FALL
+        if self.world.get(bx, by, bz) == LAVA or self.world.get(bx, by + 1, bz) == LAVA:
+            self.health -= LAVA_DAMAGE
+        if self.health <= 0:
+            self.health = 0.0
+            self.episode_running = False
+    
+    def _heading(self) -> Tuple[float, float]:
+        return -math.sin(self.yaw), math.cos(self.yaw)
+    
+    def _walk(self, dx: float, dz: float, ms: int, speed: float = WALK_SPEED, climb: bool = False):
+        """Hold a movement control for ms milliseconds toward (dx, dz)."""
+        for _ in range(max(1, round(ms * speed / 1000.0))):
+            x, y, z = self.position
+            bx, by, bz = self.block_pos
+            tx, tz = math.floor(x + dx), math.floor(z + dz)
+            if (tx, tz) == (bx, bz):
+                break
+            if self._passable(tx, by, tz) and self._passable(tx, by + 1, tz):
+                self.position = [tx + 0.5, float(by), tz + 0.5]
+            elif climb and self._passable(tx, by + 1, tz) and self._passable(tx, by + 2, tz) and self._passable(bx, by + 2, bz):
+                self.position = [tx + 0.5, float(by + 1), tz + 0.5]
+                climb = False
+            else:
+                break
+            self._settle()
+            if not self.episode_running:
+                break
+    
+    def _move(self, direction: str, ms: int, speed: float = WALK_SPEED, climb: bool = False):
+        fx, fz = self._heading()
+        dx, dz = {
+            "forward": (fx, fz),
+            "back": (-fx, -fz),
+            "left": (fz, -fx),
+            "right": (-fz, fx),
+        }[direction]
+        self._walk(dx, dz, ms, speed, climb)
+    
+    def _look(self, yaw: float, pitch: float):
+        self.yaw = yaw
+        self.pitch = max(-math.pi / 2, min(math.pi / 2, pitch))
+    
+    def _look_at(self, target: Tuple[float, float, float]):
+        x, y, z = self.position
+        dx, dy, dz = target[0] - x, target[1] - (y + 1.62), target[2] - z
+        self._look(math.atan2(-dx, dz), math.atan2(-dy, math.hypot(dx, dz)))
+    
+    def _ahead(self, dy: int = 0) -> Tuple[int, int, int]:
+        x, y, z = self.position
+        dx, dz = self._heading()
+        return math.floor(x + dx), math.floor(y) + dy, math.floor(z + dz)
+    
+    def _dig(self, x: int, y: int, z: int) -> bool:
+        """Mine a block into the inventory. Opened lava flows into the hole."""
+        block = self.world.get(x, y, z)
+        if IS_AIR[block] or block in (BEDROCK, LAVA):
+            return False
+        drop = ITEM_DROPS[block]
+        self.inventory[drop] = self.inventory.get(drop, 0) + 1
+        self.world.set(x, y, z, LAVA if self.would_release_lava(x, y, z) else AIR)
+        self.check_mined_ore(BLOCKS[block], (x, y, z))
+        return True
+    
+    # ===== ACTIONS =====
+    
+    def execute_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.is_connected:
+            return {"success": False, "error": "Not connected"}
+        
+        self.step_count += 1
+        
+        # Track position
+        self.visited_blocks.add(self.block_pos)
+        if self.last_position:
+            self.stuck_counter = self.stuck_counter + 1 if math.dist(self.position, self.last_position) < 0.1 else 0
+        self.last_position = list(self.position)
+        
+        handler = self.ACTIONS.get(action.get("type"))
+        if handler is None:
+            return {"success": False, "error": f"Unknown: {action.get('type')}"}
+        handler(self)
+        
+        if self.episode_running:
+            self.health = min(20.0, self.health + REGEN_PER_STEP)
+        return {"success": True}
+    
+    def action_move(self, direction: str, duration: int):
+        self._move(direction, duration * 100)
+    
+    def action_jump(self):
+        pass
+    
+    def action_forward_jump(self):
+        self._move("forward", 250, climb=True)
+    
+    def action_sprint_forward(self):
+        self._move("forward", 400, SPRINT_SPEED)
+    
+    def action_look(self, yaw: float, pitch: float):
+        self._look(self.yaw + yaw, self.pitch + pitch)
+    
+    def action_dig_forward(self):
+        block = self._ahead()
+        name = self.world.get(*block)
+        if not IS_AIR[name] and name != BEDROCK:
+            if self.would_release_lava(*block):
+                return
+            self._dig(*block)
+    
+    def action_dig_down(self):
+        bx, by, bz = self.block_pos
+        if self._dig(bx, by - 1, bz):
+            self._settle()
+    
+    def action_safe_dig_down(self):
+        bx, by, bz = self.block_pos
+        block = self.world.get(bx, by - 1, bz)
+        if IS_AIR[block] or block == BEDROCK:
+            return
+        if self.would_release_lava(bx, by - 1, bz):
+            return
+        self._dig(bx, by - 1, bz)
+        self._settle()
+    
+    def action_tunnel_forward(self):
+        """Dig a 2-high passage with a lava check, then step into it."""
+        block1, block2 = self._ahead(), self._ahead(1)
+        if self.would_release_lava(*block1) or self.would_release_lava(*block2):
+            return
+        self._dig(*block1)
+        self._dig(*block2)
+        self._move("forward", 200)
+        self.strip_mine_length += 1
+    
+    def action_strip_mine(self):
+        self.current_strategy = "strip_mine"
+        self.action_tunnel_forward()
+        self.strip_mine_length += 1
+        
+        visible_ores = self.get_visible_ores()
+        if visible_ores:
+            best_ore = visible_ores[0]
+            if "diamond" in best_ore["name"]:
+                self.action_mine_diamond()
+            elif best_ore["value"] >= 10:
+                self.action_mine_nearest_ore()
+    
+    def action_branch_mine(self):
+        self.current_strategy = "strip_mine"
+        self.action_tunnel_forward()
+        self.branch_count += 1
+        
+        # Every 6 steps, look left and right for diamonds
+        if self.branch_count % 6 == 0:
+            original_yaw = self.yaw
+            for side in (-math.pi / 2, math.pi / 2):
+                self._look(original_yaw + side, 0)
+                ore = self.find_nearest_visible_ore(3)
+                if ore and "diamond" in ore[0]:
+                    self.action_mine_diamond()
+            self._look(original_yaw, 0)
+    
+    def action_mine_nearest_ore(self):
+        ore = self.find_nearest_visible_ore(5)
+        if ore is None:
+            return
+        _, target = ore
+        if math.dist(target, self.position) <= 4.5:
+            if self.would_release_lava(*target):
+                return
+            self._look_at(target)
+            self._dig(*target)
+        else:
+            self._look_at(target)
+            self._move("forward", 300)
+    
+    def action_mine_diamond(self):
+        """Mine the closest exposed diamond ore, or walk toward it."""
+        cube = self._cube(ORE_RADIUS)
+        candidates = IS_DIAMOND[cube] & self._exposed(ORE_RADIUS)
+        if not candidates.any():
+            return
+        offsets = np.argwhere(candidates) - ORE_RADIUS
+        dist = np.sqrt((offsets ** 2).sum(axis=1))
+        closest = int(np.argmin(dist))
+        bx, by, bz = self.block_pos
+        target = (bx + int(offsets[closest, 0]), by + int(offsets[closest, 1]), bz + int(offsets[closest, 2]))
+        
+        self._look_at(target)
+        if dist[closest] <= 4.5:
+            self._dig(*target)
+        else:
+            self._move("forward", 400)
+    
+    def action_descend(self):
+        """Staircase down to diamond level, then strip mine."""
+        self.current_strategy = "descend"
+        y = self.position[1]
+        if y <= -50:
+            self.current_strategy = "strip_mine"
+            self.action_strip_mine()
+            return
+        if y <= -40:
+            self.action_tunnel_forward()
+            return
+        
+        ahead, below = self._ahead(), self._ahead(-1)
+        if self.would_release_lava(*below):
+            self.action_switch_direction()
+            return
+        if self.world.get(*ahead) in (BEDROCK, LAVA):
+            return
+        self._dig(*ahead)
+        self._dig(*below)
+        # A 1.8 block tall player needs the block above the step clear too
+        self._dig(*self._ahead(1))
+        self._move("forward", 300)
+    
+    def action_find_cave(self):
+        cave = self.find_cave_entrance(CAVE_RADIUS)
+        if cave:
+            self.cave_entrance_pos = cave
+            self._look_at(cave)
+            self._move("forward", 500)
+        else:
+            self.action_descend()
+    
+    def action_explore_cave(self):
+        self.current_strategy = "explore_cave"
+        self.in_cave = self.is_in_cave()
+        if not self.in_cave:
+            self.action_find_cave()
+            return
+        
+        if self.get_visible_ores():
+            self.action_mine_nearest_ore()
+            return
+        
+        bx, by, bz = self.block_pos
+        if IS_AIR[self.world.get(bx, by - 1, bz)]:
+            self.action_move("forward", 1)
+        else:
+            self.action_move("forward", 2)
+        self.action_look(0.3, 0)
+    
+    def action_switch_direction(self):
+        self.mining_direction = (self.mining_direction + 1) % 4
+        self._look(MINING_ANGLES[self.mining_direction], 0)
+        self.strip_mine_length = 0
+    
+    def action_noop(self):
+        pass
+    
+    def check_mined_ore(self, name: str, position: Tuple[int, int, int]):
+        if name in ORE_VALUES and position not in self.mined_ores:
+            self.mined_ores.add(position)
+            logger.debug(f"Mined {name} at {position}")
+            if "diamond" in name:
+                self.diamonds_this_episode += 1
+    
+    ACTIONS = {
+        "forward": lambda bot: bot.action_move("forward", 2),
+        "back": lambda bot: bot.action_move("back", 2),
+        "left": lambda bot: bot.action_move("left", 2),
+        "right": lambda bot: bot.action_move("right", 2),
+        "jump": action_jump,
+        "forward_jump": action_forward_jump,
+        "sprint_forward": action_sprint_forward,
+        "look_down": lambda bot: bot.action_look(0, 0.4),
+        "look_up": lambda bot: bot.action_look(0, -0.4),
+        "look_left": lambda bot: bot.action_look(-0.5, 0),
+        "look_right": lambda bot: bot.action_look(0.5, 0),
+        "dig_forward": action_dig_forward,
+        "dig_down": action_dig_down,
+        "safe_dig_down": action_safe_dig_down,
+        "tunnel_forward": action_tunnel_forward,
+        "strip_mine": action_strip_mine,
+        "branch_mine": action_branch_mine,
+        "mine_ore": action_mine_nearest_ore,
+        "mine_diamond": action_mine_diamond,
+        "explore_cave": action_explore_cave,
+        "descend": action_descend,
+        "find_cave": action_find_cave,
+        "switch_direction": action_switch_direction,
+        "noop": action_noop,
+    }
+    
+    # ===== REWARDS =====
+    
+    def calculate_reward(self) -> float:
+        if not self.is_connected:
+            return 0
+        
+        reward = -0.001
+        
+        # Diamond mined this episode!
+        if self.diamonds_this_episode > 0:
+            reward += 1000
+            self.episode_running = False
+            return reward
+        
+        y = self.position[1]
+        
+        # Y-level rewards
+        if -64 <= y <= -50:
+            reward += 0.05
+            if -59 <= y <= -54:
+                reward += 0.1
+        elif y < 16:
+            reward += (0.01 * (16 - y)) / 80
+        
+        # Cave exploration bonus
+        if self.is_in_cave() and y <= 0:
+            reward += 0.02
+        
+        # Visible ore rewards
+        for ore in self.get_visible_ores():
+            if "diamond" in ore["name"]:
+                reward += 10
+            elif ore["value"] >= 10:
+                reward += 1
+        
+        # Exploration
+        if self.block_pos not in self.visited_blocks:
+            reward += 0.02
+        
+        # Strip mining at correct level
+        if self.current_strategy == "strip_mine" and -60 <= y <= -50:
+            reward += 0.01
+        
+        # Penalties
+        if self.stuck_counter > 20:
+            reward -= 0.2
+        if self.health <= 0:
+            reward -= 100
+            self.episode_running = False
+        if self.health < 20:
+            reward -= (20 - self.health) * 0.05
+        
+        self.total_reward += reward
+        return reward
+    
+    # ===== EPISODE =====
+    
+    def validate_spawn_state(self, x: int, y: int, z: int) -> bool:
+        """Free feet and head, solid ground and no lava within 2 blocks."""
+        if not (self._passable(x, y, z) and self._passable(x, y + 1, z)):
+            return False
+        if IS_AIR[self.world.get(x, y - 1, z)]:
+            return False
+        return not IS_LAVA[self.world.box((x - 2, y - 2, z - 2), (x + 3, y + 3, z + 3))].any()
+    
+    def add_spawn_state(self) -> int:
+        """bot.addSpawnState: save the current column; returns its index."""
+        x, y, z = self.block_pos
+        if not self.validate_spawn_state(x, y, z):
+            raise ValueError("Current position is not a safe spawn state")
+        self.spawn_states.append({"x": x, "z": z, "yaw": self.yaw})
+        return len(self.spawn_states) - 1
+    
+    def pick_spawn_state(self, spawn: Any) -> int:
+        """Index of the spawn state to reset to: an index, "random" or 0."""
+        if spawn == "random":
+            return self.rng.randrange(len(self.spawn_states))
+        if isinstance(spawn, int) and 0 <= spawn < len(self.spawn_states):
+            return spawn
+        return 0
+    
+    def reset(self, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        options = options or {}
+        if options.get("blockFormat"):
+            self.block_format = options["blockFormat"]
+        self.pending_action = None
+        self.pending_ms = 0.0
+        self.pending_result = {"success": True}
+        self.reset_palette()
+        self.delta_frame = None
+        
+        self.step_count = 0
+        self.total_reward = 0.0
+        self.visited_blocks.clear()
+        self.mined_ores.clear()
+        self.stuck_counter = 0
+        self.last_position = None
+        self.episode_running = True
+        self.diamonds_this_episode = 0
+        self.mining_direction = self.rng.randrange(4)
+        self.strip_mine_length = 0
+        self.branch_count = 0
+        self.current_strategy = "descend"
+        self.in_cave = False
+        self.cave_entrance_pos = None
+        
+        # New world, fresh player at the chosen spawn state
+        start = time.perf_counter()
+        self.episode += 1
+        self.world = VoxelWorld(options.get("seed", self.seed + self.episode))
+        spawn = self.pick_spawn_state(options.get("spawn"))
+        state = self.spawn_states[spawn]
+        y = self.world.surface(state["x"], state["z"]) + 1
+        if spawn and not self.validate_spawn_state(state["x"], y, state["z"]):
+            spawn, state = 0, self.spawn_states[0]
+            y = self.world.surface(state["x"], state["z"]) + 1
+        self.position = [state["x"] + 0.5, float(y), state["z"] + 0.5]
+        self.yaw = state["yaw"]
+        self.pitch = 0.0
+        self.health = 20.0
+        self.food = 20.0
+        self.inventory = {"iron_pickaxe": 1}
+        self._box_key = None
+        self.last_reset = {
+            "spawn": spawn,
+            "confirmed": True,
+            "resetMs": (time.perf_counter() - start) * 1000,
+        }
+        
+        return self.encode_observation(self.get_observation(), True)
+    
+    def step(self, action: Dict[str, Any], encode: bool = True) -> Dict[str, Any]:
+        if action.get("pipeline"):
+            return self.step_pipelined(action)
+        self.run_pending()
+        result = self.execute_action(action)
+        observation = self.get_observation()
+        if encode:
+            observation = self.encode_observation(observation, action.get("keyframe", False))
+        reward = self.calculate_reward()
+        done = not self.episode_running or self.health <= 0
+        
+        return {
+            "observation": observation,
+            "reward": reward,
+            "done": done,
+            "info": {
+                "stepCount": self.step_count,
+                "totalReward": self.total_reward,
+                "success": result["success"],
+                "minedOres": len(self.mined_ores),
+                "diamondsThisEpisode": self.diamonds_this_episode,
+                "strategy": self.current_strategy,
+                "inCave": self.in_cave,
+            },
+        }
+    
+    def run_pending(self):
+        """Execute the action a pipelined step left pending, timing it."""
+        if self.pending_action is None:
+            return
+        action, self.pending_action = self.pending_action, None
+        start = time.perf_counter()
+        self.pending_result = self.execute_action(action)
+        self.pending_done_at = time.perf_counter()
+        self.pending_ms = (self.pending_done_at - start) * 1000
+    
+    def step_pipelined(self, action: Dict[str, Any], arrived: Optional[float] = None) -> Dict[str, Any]:
+        """
+        bot.stepPipelined: reply with the state the previous action left
+        and leave this one pending. SimulatorServer runs it right after
+        replying; otherwise it runs at the start of the next call, so the
+        pipeline stats show no overlap. arrived is when the request came
+        in (perf_counter), for the time spent waiting on the previous action.
+        """
+        arrived = time.perf_counter() if arrived is None else arrived
+        self.run_pending()
+        action_ms, self.pending_ms = self.pending_ms, 0.0
+        wait_ms = max(self.pending_done_at - arrived, 0.0) * 1000 if action_ms else 0.0
+        result, self.pending_result = self.pending_result, {"success": True}
+        
+        observation = self.encode_observation(self.get_observation(), action.get("keyframe", False))
+        reward = self.calculate_reward()
+        done = not self.episode_running or self.health <= 0
+        if not done:
+            self.pending_action = action
+        
+        return {
+            "observation": observation,
+            "reward": reward,
+            "done": done,
+            "info": {
+                "stepCount": self.step_count,
+                "totalReward": self.total_reward,
+                "success": result["success"],
+                "minedOres": len(self.mined_ores),
+                "diamondsThisEpisode": self.diamonds_this_episode,
+                "strategy": self.current_strategy,
+                "inCave": self.in_cave,
+            },
+            "pipeline": {"actionMs": action_ms, "waitMs": wait_ms},
+        }
+    
+    def step_many(self, actions: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        bot.stepMany: run actions back-to-back until the episode ends, a
+        diamond is mined or (stopOnDiamond) one is in view. Returns
+        {"results": [...]} or, with aggregate, one combined step result.
+        """
+        if not actions:
+            raise ValueError("No actions to execute")
+        options = options or {}
+        self.run_pending()
+        results = []
+        diamonds_before = self.diamonds_this_episode
+        for action in actions:
+            result = self.step(action, encode=not options.get("aggregate"))
+            results.append(result)
+            observation = result["observation"] or {}
+            if (
+                result["done"]
+                or self.diamonds_this_episode > diamonds_before
+                or (options.get("stopOnDiamond") and observation.get("diamondNearby"))
+            ):
+                break
+        
+        if not options.get("aggregate"):
+            return {"results": results}
+        
+        # Only the final frame is encoded, so "delta" frames stay in sequence
+        last = results[-1]
+        return {
+            **last,
+            "observation": self.encode_observation(last["observation"], any(a.get("keyframe") for a in actions)),
+            "reward": sum(r["reward"] for r in results),
+            "substeps": len(results),
+        }
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "connected": self.is_connected,
+            "episodeRunning": self.episode_running,
+            "stepCount": self.step_count,
+            "totalReward": self.total_reward,
+            "visitedBlocks": len(self.visited_blocks),
+        }
@@ -0,0 +1,163 @@
+"""
+Terra Scout Simulator Server
+HTTP bridge API (bot/src/server.js routes) backed by a SimulatedBot
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.logger import get_logger # type: ignore
+from .bot import SimulatedBot
+
+logger = get_logger(__name__)
+
+
+class SimulatorRequestHandler(BaseHTTPRequestHandler):
+    """Routes of bot/src/server.js, answered by the server's SimulatedBot."""
+    
+    protocol_version = "HTTP/1.1"  # keep-alive, like express
+    disable_nagle_algorithm = True
+    wbufsize = -1  # headers and body leave in one write
+    server: "SimulatorServer"
+    
+    def log_message(self, format: str, *args: Any):
+        pass
+    
+    def _reply(self, body: Dict[str, Any], status: int = 200):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+    
+    def do_GET(self):
+        bot = self.server.bot
+        with self.server.lock:
+            if self.path == "/health":
+                self._reply({"status": "ok", "connected": bot.is_connected})
+            elif self.path == "/observation":
+                obs = bot.get_observation()
+                if obs:
+                    self._reply(obs)
+                else:
+                    self._reply({"error": "Bot not connected"}, 503)
+            elif self.path == "/status":
+                self._reply(bot.status())
+            elif self.path == "/spawns":
+                self._reply({"spawns": bot.spawn_states})
+            else:
+                self._reply({"error": f"Cannot GET {self.path}"}, 404)
+    
+    def do_POST(self):
+        bot = self.server.bot
+        arrived = time.perf_counter()
+        try:
+            body = self._body()
+        except ValueError as e:
+            self._reply({"error": str(e)}, 400)
+            return
+        
+        with self.server.lock:
+            try:
+                if self.path == "/action" and body.get("pipeline"):
+                    # Run the action after replying, while the agent thinks
+                    self._reply(bot.step_pipelined(body, arrived))
+                    self.wfile.flush()
+                    bot.run_pending()
+                elif self.path == "/action":
+                    self._reply(bot.step(body))
+                elif self.path == "/actions":
+                    self._reply(bot.step_many(body.pop("actions", []), body))
+                elif self.path == "/reset":
+                    observation = bot.reset(body)
+                    self._reply({"observation": observation, "info": bot.last_reset})
+                elif self.path == "/spawns":
+                    try:
+                        self._reply({"index": bot.add_spawn_state()})
+                    except ValueError as e:
+                        self._reply({"error": str(e)}, 400)
+                elif self.path == "/connect":
+                    bot.is_connected = True
+                    self._reply({"success": True, "message": "Connected to simulator"})
+                elif self.path == "/disconnect":
+                    bot.is_connected = False
+                    self._reply({"success": True, "message": "Disconnected"})
+                elif self.path == "/negotiate":
+                    # Only the plain HTTP/JSON transport is simulated
+                    self._reply({"transport": "http", "encoding": "json"})
+                else:
+                    self._reply({"error": f"Cannot POST {self.path}"}, 404)
+            except Exception as e:
+                logger.exception(f"{self.path} failed")
+                self._reply({"error": str(e)}, 500)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """HTTP server for one simulated bot; requests are handled one at a time."""
+    
+    daemon_threads = True
+    
+    def __init__(self, host: str = "localhost", port: int = 3000, seed: int = 0, block_format: str = "list"):
+        super().__init__((host, port), SimulatorRequestHandler)
+        self.bot = SimulatedBot(seed=seed, block_format=block_format)
+        self.lock = threading.Lock()
+
+
+def serve(
+    host: str = "localhost",
+    ports: Tuple[int, ...] = (3000,),
+    seed: int = 0,
+    block_format: str = "list",
+) -> List[SimulatorServer]:
+    """Start one simulator per port on background threads."""
+    servers = []
+    for i, port in enumerate(ports):
+        server = SimulatorServer(host, port, seed=seed + 1000 * i, block_format=block_format)
+        threading.Thread(target=server.serve_forever, name=f"simulator-{port}", daemon=True).start()
+        servers.append(server)
+        logger.info(f"Simulated bot listening on http://{host}:{port}")
+    return servers
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline Terra Scout bridge simulator")
+    parser.add_argument("--host", type=str, default="localhost", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=3000, help="First bot API port")
+    parser.add_argument("--num-bots", type=int, default=1, help="Simulated bots on consecutive ports")
+    parser.add_argument("--seed", type=int, default=0, help="World seed")
+    parser.add_argument("--block-format", choices=["list", "grid", "delta"], default="list",
+                        help="Default block format (reset options override it)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    servers = serve(
+        args.host,
+        tuple(range(args.port, args.port + args.num_bots)),
+        seed=args.seed,
+        block_format=args.block_format,
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
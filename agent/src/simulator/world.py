@@ -0,0 +1,245 @@
+"""
+Terra Scout Simulator World
+Procedural voxel world with 1.18+ style layers, ores, caves and lava
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from shared.constants.minecraft import (
+    BEDROCK_LAYER,
+    DIAMOND_OPTIMAL_Y,
+    ORE_RANGES,
+    WORLD_MAX_Y,
+    WORLD_MIN_Y,
+)
+
+SECTION_BITS = 4
+SECTION_SIZE = 1 << SECTION_BITS  # 16x16x16 blocks per section
+SECTION_MASK = SECTION_SIZE - 1
+
+# Block table: a block id is its index
+BASE_BLOCKS = [
+    "air",
+    "cave_air",
+    "stone",
+    "deepslate",
+    "bedrock",
+    "lava",
+    "dirt",
+    "grass_block",
+]
+ORE_BLOCKS = [
+    name
+    for ore in ORE_RANGES
+    for name in (f"{ore}_ore", f"deepslate_{ore}_ore")
+]
+BLOCKS: List[str] = BASE_BLOCKS + ORE_BLOCKS
+BLOCK_IDS: Dict[str, int] = {name: i for i, name in enumerate(BLOCKS)}
+
+AIR, CAVE_AIR, STONE, DEEPSLATE, BEDROCK, LAVA, DIRT, GRASS_BLOCK = range(len(BASE_BLOCKS))
+
+# Terrain shape
+SURFACE_Y = 64
+SURFACE_AMPLITUDE = 6
+DIRT_DEPTH = 3
+DEEPSLATE_Y = 0  # stone turns into deepslate over DEEPSLATE_Y..+8
+LAVA_LEVEL = -55  # cave air at or below this is lava, as in 1.18 lava lakes
+
+# Caves: two octaves of value noise above a threshold
+CAVE_SCALES = ((16, 0.65), (7, 0.35))
+CAVE_THRESHOLD = 0.66
+CAVE_MIN_DEPTH = 6  # no caves within this many blocks of the surface
+
+# Ores: (fraction of host blocks at the peak, peak Y); the chance falls off
+# linearly toward the ends of ORE_RANGES. Ores come in 2x2x2 clusters.
+ORE_SETTINGS: Dict[str, Tuple[float, int]] = {
+    "coal": (0.012, 96),
+    "iron": (0.009, 16),
+    "gold": (0.003, -16),
+    "redstone": (0.006, -59),
+    "lapis": (0.002, 0),
+    "diamond": (0.003, DIAMOND_OPTIMAL_Y),
+    "emerald": (0.0005, 232),
+}
+
+_MASK64 = (1 << 64) - 1
+_PRIMES = (
+    np.uint64(0x9E3779B185EBCA87),
+    np.uint64(0xC2B2AE3D27D4EB4F),
+    np.uint64(0x165667B19E3779F9),
+)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """64-bit finalizer (splitmix64)."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def uniform(seed: int, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """
+    Deterministic uniform [0, 1) value per integer coordinate. Coordinates
+    are int64 arrays that broadcast against each other.
+    """
+    key = np.uint64((seed * 0xD6E8FEB86659FD93) & _MASK64)
+    h = (
+        (np.asarray(x, dtype=np.int64).view(np.uint64) * _PRIMES[0])
+        ^ (np.asarray(y, dtype=np.int64).view(np.uint64) * _PRIMES[1])
+        ^ (np.asarray(z, dtype=np.int64).view(np.uint64) * _PRIMES[2])
+        ^ key
+    )
+    return (_mix(h) >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def value_noise(seed: int, x: np.ndarray, y: np.ndarray, z: np.ndarray, scale: int) -> np.ndarray:
+    """
+    Smooth [0, 1) value noise with lattice spacing `scale` blocks over the
+    grid spanned by the 1-D coordinate arrays x, y and z. Lattice values
+    are hashed once per lattice point and interpolated one axis at a time.
+    """
+    axes = [np.asarray(c, dtype=np.int64) for c in (x, y, z)]
+    cells = [np.floor_divide(c, scale) for c in axes]
+    values = uniform(
+        seed,
+        *np.ix_(*[np.arange(cell.min(), cell.max() + 2, dtype=np.int64) for cell in cells])
+    )
+    for axis, (c, cell) in enumerate(zip(axes, cells)):
+        f = (c - cell * scale) / scale
+        f = (f * f * (3.0 - 2.0 * f)).reshape([-1 if i == axis else 1 for i in range(3)])
+        index = cell - cell.min()
+        low = np.take(values, index, axis=axis)
+        values = low + f * (np.take(values, index + 1, axis=axis) - low)
+    return values
+
+
+def _axes(origin: Sequence[int], shape: Sequence[int]) -> List[np.ndarray]:
+    """1-D int64 x, y, z coordinates of a box."""
+    return [np.arange(o, o + n, dtype=np.int64) for o, n in zip(origin, shape)]
+
+
+def surface_height(seed: int, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Y of the topmost (grass) block of every (x, z) column, shape (len(x), len(z))."""
+    noise = value_noise(seed ^ 0x5EED, x, np.zeros(1, dtype=np.int64), z, 32)[:, 0, :]
+    return SURFACE_Y + np.rint(SURFACE_AMPLITUDE * (2.0 * noise - 1.0)).astype(np.int64)
+
+
+def generate_region(seed: int, origin: Sequence[int], shape: Sequence[int]) -> np.ndarray:
+    """
+    Block ids (uint8, indexed [x][y][z]) of the box with its minimum corner
+    at origin. A pure function of the seed and coordinates, so any region
+    can be generated independently and regions always agree.
+    """
+    xs, ys, zs = _axes(origin, shape)
+    x, y, z = xs[:, None, None], ys[None, :, None], zs[None, None, :]
+    height = surface_height(seed, xs, zs)[:, None, :]
+    
+    blocks = np.full(tuple(shape), STONE, dtype=np.uint8)
+    if ys[0] > height.max():
+        blocks[...] = AIR
+        return blocks
+    
+    cell = uniform(seed, x, y, z)
+    blocks[y < DEEPSLATE_Y + 8 * cell] = DEEPSLATE
+    
+    # Ores replace stone/deepslate in 2x2x2 clusters, rarest last so they
+    # win overlaps; half the blocks of a cluster are ore
+    half = cell < 0.5
+    halves = [c >> 1 for c in (xs, ys, zs)]
+    clusters = np.ix_(*[np.arange(h[0], h[-1] + 1) for h in halves])
+    cluster_index = np.ix_(*[h - h[0] for h in halves])
+    for ore in sorted(ORE_RANGES, key=lambda name: -ORE_SETTINGS[name][0]):
+        low, high = ORE_RANGES[ore]
+        if ys[-1] < low or ys[0] > high:
+            continue
+        frequency, peak = ORE_SETTINGS[ore]
+        reach = max(peak - low, high - peak, 1)
+        chance = 2.0 * frequency * np.clip(1.0 - np.abs(y - peak) / reach, 0.0, 1.0) * ((y >= low) & (y <= high))
+        ore_id = BLOCK_IDS[f"{ore}_ore"]
+        placed = half & (uniform(seed ^ (ore_id * 0x1000193), *clusters)[cluster_index] < chance)
+        blocks[placed] = ore_id + (blocks[placed] == DEEPSLATE)
+    
+    # Caves, flooded with lava near the bottom of the world
+    noise = sum(weight * value_noise(seed ^ scale, xs, ys, zs, scale) for scale, weight in CAVE_SCALES)
+    cave = (noise > CAVE_THRESHOLD) & (y < height - CAVE_MIN_DEPTH) & (y > WORLD_MIN_Y + 1)
+    blocks[cave] = CAVE_AIR
+    blocks[cave & (y <= LAVA_LEVEL)] = LAVA
+    
+    # Soil and sky
+    blocks[(y >= height - DIRT_DEPTH) & (y < height)] = DIRT
+    blocks[y == height] = GRASS_BLOCK
+    blocks[(y > height) | (y >= WORLD_MAX_Y)] = AIR
+    
+    # Bedrock floor, ragged over the bottom 5 layers
+    if ys[0] < BEDROCK_LAYER + 5:
+        ragged = uniform(seed ^ 0xBED, x, y, z) < (BEDROCK_LAYER + 5 - y) / 5.0
+        blocks[(y <= BEDROCK_LAYER) | ((y < BEDROCK_LAYER + 5) & ragged)] = BEDROCK
+    return blocks
+
+
+class VoxelWorld:
+    """
+    One procedurally generated world that can be dug.
+    
+    Blocks live in 16x16x16 uint8 sections keyed by section coordinates,
+    generated the first time they are touched and edited in place
+    afterwards. `version` increases with every edit so callers can cache
+    views of the neighbourhood.
+    """
+    
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.sections: Dict[Tuple[int, int, int], np.ndarray] = {}
+        self.version = 0
+    
+    def section(self, cx: int, cy: int, cz: int) -> np.ndarray:
+        """The section at section coordinates, generating it if needed."""
+        key = (cx, cy, cz)
+        section = self.sections.get(key)
+        if section is None:
+            section = generate_region(
+                self.seed,
+                (cx << SECTION_BITS, cy << SECTION_BITS, cz << SECTION_BITS),
+                (SECTION_SIZE,) * 3,
+            )
+            self.sections[key] = section
+        return section
+    
+    def get(self, x: int, y: int, z: int) -> int:
+        """Block id at a world position."""
+        section = self.section(x >> SECTION_BITS, y >> SECTION_BITS, z >> SECTION_BITS)
+        return int(section[x & SECTION_MASK, y & SECTION_MASK, z & SECTION_MASK])
+    
+    def set(self, x: int, y: int, z: int, block: int):
+        """Replace the block at a world position."""
+        section = self.section(x >> SECTION_BITS, y >> SECTION_BITS, z >> SECTION_BITS)
+        section[x & SECTION_MASK, y & SECTION_MASK, z & SECTION_MASK] = block
+        self.version += 1
+    
+    def name(self, x: int, y: int, z: int) -> str:
+        return BLOCKS[self.get(x, y, z)]
+    
+    def box(self, lo: Sequence[int], hi: Sequence[int]) -> np.ndarray:
+        """Dense copy of the block ids of lo <= (x, y, z) < hi."""
+        out = np.empty([h - l for l, h in zip(lo, hi)], dtype=np.uint8)
+        (lx, ly, lz), (hx, hy, hz) = lo, hi
+        for cx in range(lx >> SECTION_BITS, ((hx - 1) >> SECTION_BITS) + 1):
+            x0, x1 = max(lx, cx << SECTION_BITS), min(hx, (cx + 1) << SECTION_BITS)
+            for cy in range(ly >> SECTION_BITS, ((hy - 1) >> SECTION_BITS) + 1):
+                y0, y1 = max(ly, cy << SECTION_BITS), min(hy, (cy + 1) << SECTION_BITS)
+                for cz in range(lz >> SECTION_BITS, ((hz - 1) >> SECTION_BITS) + 1):
+                    z0, z1 = max(lz, cz << SECTION_BITS), min(hz, (cz + 1) << SECTION_BITS)
+                    out[x0 - lx:x1 - lx, y0 - ly:y1 - ly, z0 - lz:z1 - lz] = self.section(cx, cy, cz)[
+                        x0 & SECTION_MASK:((x1 - 1) & SECTION_MASK) + 1,
+                        y0 & SECTION_MASK:((y1 - 1) & SECTION_MASK) + 1,
+                        z0 & SECTION_MASK:((z1 - 1) & SECTION_MASK) + 1,
+                    ]
+        return out
+    
+    def surface(self, x: int, z: int) -> int:
+        """Y of the topmost solid block of a column."""
+        return int(surface_height(self.seed, np.array([x]), np.array([z]))[0, 0])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Terra Scout Reward Benchmark
+Per-step RewardCalculator cost early vs late in a long episode
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agent.src.bridge.rewards import RewardCalculator
+
+BLOCK_NAMES = ["stone", "deepslate", "tuff", "gravel", "diamond_ore", "iron_ore", "coal_ore", "lava"]
+
+
+def make_neighbourhood(rng: random.Random, x: int, y: int, z: int) -> list:
+    """A 9x9x9 nearbyBlocks list (about 80% solid) around a block."""
+    blocks = []
+    for dx in range(-4, 5):
+        for dy in range(-4, 5):
+            for dz in range(-4, 5):
+                if rng.random() < 0.8:
+                    name = rng.choice(BLOCK_NAMES) if rng.random() < 0.1 else "deepslate"
+                    blocks.append({"name": name, "position": {"x": x + dx, "y": y + dy, "z": z + dz}})
+    return blocks
+
+
+def diamond_depth_walk(steps: int, seed: int = 0):
+    """
+    Observations of a bot strip mining at Y=-55: every step enters a new
+    (x, z) column, the worst case for per-episode exploration state.
+    """
+    rng = random.Random(seed)
+    pool = [make_neighbourhood(rng, 0, -55, 0) for _ in range(32)]
+    for step in range(steps):
+        x = step % 500
+        z = step // 500
+        yield {
+            "position": {"x": x + 0.5, "y": -55.0, "z": z + 0.5},
+            "health": 20,
+            "inventory": {"iron_pickaxe": 1},
+            "nearbyBlocks": pool[step % len(pool)],
+            "minedOresCount": step // 100,
+            "dangerNearby": step % 7 == 0,
+        }
+
+
+def run(steps: int, window: int, seed: int) -> dict:
+    """Time every step of one episode; returns per-step cost stats in us."""
+    calculator = RewardCalculator()
+    times = np.zeros(steps, dtype=np.int64)
+    prev = None
+    for i, obs in enumerate(diamond_depth_walk(steps, seed)):
+        start = time.perf_counter_ns()
+        calculator.calculate(obs, prev)
+        times[i] = time.perf_counter_ns() - start
+        prev = obs
+    
+    early = np.median(times[:window]) / 1000.0
+    late = np.median(times[-window:]) / 1000.0
+    return {
+        "steps": steps,
+        "early_us": float(early),
+        "late_us": float(late),
+        "ratio": float(late / early),
+        "mean_us": float(times.mean() / 1000.0),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark RewardCalculator per-step cost")
+    parser.add_argument("--steps", type=int, default=18000, help="Episode length")
+    parser.add_argument("--window", type=int, default=200, help="Steps timed at each end")
+    parser.add_argument("--max-ratio", type=float, default=2.0, help="Fail if late/early cost exceeds this")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    result = run(args.steps, args.window, args.seed)
+    
+    print(f"RewardCalculator over {result['steps']} steps at diamond depth")
+    print(f"  Steps 1-{args.window}: {result['early_us']:.1f} us/step (median)")
+    print(f"  Last {args.window} steps: {result['late_us']:.1f} us/step (median)")
+    print(f"  Ratio: {result['ratio']:.2f}x (max {args.max_ratio:.1f}x)")
+    
+    if result["ratio"] > args.max_ratio:
+        print("  FAIL: per-step cost grows with episode length")
+        return 1
+    print("  OK: per-step cost is flat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
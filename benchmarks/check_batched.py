@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Terra Scout Batched Simulator Check
+Lockstep comparison of BatchedSimulator with TerraScoutEnv on simulated bots
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from agent.src.bridge.environment import TerraScoutEnv
+from agent.src.simulator.batched import NUM_ACTIONS, BatchedSimulator
+
+
+def run(num_worlds: int, steps: int, seed: int, extent: int, atol: float) -> Dict[str, Any]:
+    """
+    Step num_worlds batched worlds and one TerraScoutEnv per world (its
+    SimulatedBot seeded like the world) with the same random actions,
+    comparing observations, rewards and terminations. A world restarts on
+    both sides when an episode ends, when the two differ, or when the
+    SimulatedBot walks past the batched walls (the worlds differ there
+    by design; that step is not compared).
+    """
+    sim = BatchedSimulator(num_worlds, seed=seed, extent=extent)
+    envs = [
+        TerraScoutEnv(backend="sim", client_kwargs={"seed": int(world_seed)}, smart_action_bias=False,
+                      max_steps=steps + 1)
+        for world_seed in sim.seeds
+    ]
+    lo = sim.origin[[0, 2]]
+    hi = lo + extent
+    rng = np.random.default_rng(seed)
+    stats: Dict[str, Any] = {"steps": 0, "mismatches": [], "episodes": 0, "left_region": 0}
+    
+    def restart(i: int):
+        obs = sim.reset([i])[0]
+        env_obs, _ = envs[i].reset()
+        if not np.allclose(obs, env_obs, atol=atol):
+            diff = np.flatnonzero(~np.isclose(obs, env_obs, atol=atol))
+            stats["mismatches"].append({"world": i, "step": "reset", "obs": diff.tolist()})
+    
+    for i in range(num_worlds):
+        restart(i)
+    
+    for step in range(steps):
+        actions = rng.integers(NUM_ACTIONS, size=num_worlds)
+        obs, rewards, terminated = sim.step(actions)
+        for i, env in enumerate(envs):
+            env_obs, reward, env_terminated, _, _ = env.step(int(actions[i]))
+            x, _, z = np.floor(env.client.bot.position)
+            if not ((lo <= (x, z)) & ((x, z) < hi)).all():
+                stats["left_region"] += 1
+                restart(i)
+                continue
+            
+            stats["steps"] += 1
+            diff = np.flatnonzero(~np.isclose(obs[i], env_obs, atol=atol))
+            if len(diff) or abs(rewards[i] - reward) > atol or bool(terminated[i]) != env_terminated:
+                stats["mismatches"].append({
+                    "world": i,
+                    "step": step,
+                    "action": TerraScoutEnv.ACTION_NAMES[actions[i]],
+                    "obs": diff.tolist(),
+                    "reward": (float(rewards[i]), float(reward)),
+                    "terminated": (bool(terminated[i]), env_terminated),
+                })
+                restart(i)
+            elif env_terminated:
+                stats["episodes"] += 1
+                restart(i)
+    
+    for env in envs:
+        env.close()
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check BatchedSimulator against TerraScoutEnv on simulated bots")
+    parser.add_argument("--worlds", type=int, default=8, help="Worlds stepped in lockstep")
+    parser.add_argument("--steps", type=int, default=1000, help="Steps per world")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    parser.add_argument("--extent", type=int, default=32, help="Batched world width")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Tolerance of observations and rewards")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    result = run(args.worlds, args.steps, args.seed, args.extent, args.atol)
+    
+    print(f"BatchedSimulator vs TerraScoutEnv(backend=\"sim\"), {args.worlds} worlds x {args.steps} steps")
+    print(f"  Steps compared: {result['steps']}")
+    print(f"  Episodes ended: {result['episodes']}")
+    print(f"  Restarts at the walls: {result['left_region']}")
+    
+    if result["mismatches"]:
+        print(f"  FAIL: {len(result['mismatches'])} mismatches")
+        for mismatch in result["mismatches"][:10]:
+            print(f"    {mismatch}")
+        return 1
+    print("  OK: every compared step matches")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
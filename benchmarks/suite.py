@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Terra Scout Benchmark Suite
+Micro and end-to-end benchmarks with JSON baselines and regression report
+"""
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import numpy as np
+
+from agent.src.bridge.client import BinaryBridgeClient, BridgeClient, msgpack
+from agent.src.bridge.environment import TerraScoutEnv
+from agent.src.bridge.observations import ObservationProcessor
+from agent.src.bridge.rewards import RewardCalculator
+from agent.src.environment import TerraScoutSimVecEnv
+from agent.src.simulator import SimulatedBot
+from agent.src.simulator.server import SimulatorServer
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+# Scripted actions of the recorded episodes: mostly staircase down, some mining
+RECORD_ACTIONS = ["descend"] * 6 + ["strip_mine", "mine_ore", "tunnel_forward", "look_right"]
+
+
+def record_steps(steps: int, block_format: str = "list", seed: int = 0) -> List[Dict[str, Any]]:
+    """Step results of a simulated bot, as the bridge sends them."""
+    bot = SimulatedBot(seed=seed, block_format=block_format)
+    results = [{"observation": bot.reset()}]
+    rng = np.random.default_rng(seed)
+    while len(results) < steps:
+        result = bot.step({"type": RECORD_ACTIONS[rng.integers(len(RECORD_ACTIONS))]})
+        results.append(result)
+        if result["done"]:
+            results.append({"observation": bot.reset()})
+    return results[:steps]
+
+
+def measure(fn: Callable[[int], Any], ops: int, warmup: int = 10) -> Dict[str, float]:
+    """Time fn(i) for i in range(ops); per-op stats in microseconds."""
+    for i in range(min(warmup, ops)):
+        fn(i)
+    times = np.empty(ops, dtype=np.int64)
+    for i in range(ops):
+        start = time.perf_counter_ns()
+        fn(i)
+        times[i] = time.perf_counter_ns() - start
+    return summarize(times)
+
+
+def summarize(times_ns: np.ndarray, per_call: int = 1) -> Dict[str, float]:
+    us = times_ns / 1000.0 / per_call
+    return {
+        "ops": int(len(us) * per_call),
+        "mean_us": float(us.mean()),
+        "p50_us": float(np.percentile(us, 50)),
+        "p95_us": float(np.percentile(us, 95)),
+        "ops_per_s": float(1e6 / us.mean()),
+    }
+
+
+# ===== BENCHMARKS =====
+
+def bench_observation_process(ops: int, block_format: str) -> Dict[str, float]:
+    observations = [r["observation"] for r in record_steps(200, block_format)]
+    processor = ObservationProcessor()
+    return measure(lambda i: processor.process(observations[i % len(observations)]), ops)
+
+
+def bench_observation_batch(ops: int, batch: int = 16) -> Dict[str, float]:
+    """ObservationProcessor.process_batch, per observation."""
+    observations = [r["observation"] for r in record_steps(batch * 8)]
+    processor = ObservationProcessor()
+    out = np.empty((batch, 35), dtype=np.float32)
+    times = np.empty(max(ops // batch, 5), dtype=np.int64)
+    for i in range(len(times)):
+        rows = observations[(i % 8) * batch:(i % 8 + 1) * batch]
+        start = time.perf_counter_ns()
+        processor.process_batch(rows, out=out)
+        times[i] = time.perf_counter_ns() - start
+    return {**summarize(times, per_call=batch), "batch": batch}
+
+
+def bench_reward_calculate(ops: int) -> Dict[str, float]:
+    observations = [r["observation"] for r in record_steps(500)]
+    calculator = RewardCalculator()
+    
+    def step(i: int):
+        calculator.calculate(observations[i % len(observations)], observations[i % len(observations) - 1])
+    
+    return measure(step, ops)
+
+
+def bench_client_decode_json(ops: int) -> Dict[str, float]:
+    """BridgeClient response decoding of /action replies."""
+    payloads = [json.dumps(r).encode("utf-8") for r in record_steps(100)]
+    client = BridgeClient.__new__(BridgeClient)
+    client.last_decode_ns = 0
+    responses = [httpx.Response(200, content=p, headers={"Content-Type": "application/json"}) for p in payloads]
+    stats = measure(lambda i: client._json(responses[i % len(responses)]), ops)
+    return {**stats, "payload_bytes": float(np.mean([len(p) for p in payloads]))}
+
+
+def bench_client_codec(ops: int, encoding: str, direction: str) -> Dict[str, float]:
+    """BinaryBridgeClient frame encoding or decoding of step messages."""
+    client = BinaryBridgeClient.__new__(BinaryBridgeClient)
+    client.encoding = encoding
+    client.last_decode_ns = 0
+    messages = record_steps(100)
+    if direction == "encode":
+        return measure(lambda i: client._encode(messages[i % len(messages)]), ops)
+    payloads = [client._encode(m) for m in messages]
+    stats = measure(lambda i: client._decode(payloads[i % len(payloads)]), ops)
+    return {**stats, "payload_bytes": float(np.mean([len(p) for p in payloads]))}
+
+
+def _env_steps(env: TerraScoutEnv, ops: int) -> Dict[str, float]:
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, env.action_space.n, size=ops)  # type: ignore
+    env.reset()
+    
+    def step(i: int):
+        _, _, terminated, truncated, _ = env.step(int(actions[i]))
+        if terminated or truncated:
+            env.reset()
+    
+    try:
+        return measure(step, ops)
+    finally:
+        env.close()
+
+
+def bench_env_step_http(ops: int) -> Dict[str, float]:
+    """TerraScoutEnv.step over HTTP against a local simulator server."""
+    server = SimulatorServer("localhost", 0, seed=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        env = TerraScoutEnv(port=server.server_address[1], max_steps=500)
+        return _env_steps(env, ops)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def bench_env_step_sim(ops: int) -> Dict[str, float]:
+    """TerraScoutEnv.step with the in-process simulator backend."""
+    return _env_steps(TerraScoutEnv(backend="sim", block_format="grid", max_steps=500), ops)
+
+
+def bench_batched_sim_step(ops: int, num_envs: int = 64) -> Dict[str, float]:
+    """TerraScoutSimVecEnv step, per env step."""
+    env = TerraScoutSimVecEnv(num_envs, seed=0, max_steps=500)
+    env.reset()
+    rng = np.random.default_rng(0)
+    steps = max(ops // num_envs, 5)
+    actions = rng.integers(0, 21, size=(steps, num_envs))
+    times = np.empty(steps, dtype=np.int64)
+    for i in range(steps):
+        start = time.perf_counter_ns()
+        env.step(actions[i])
+        times[i] = time.perf_counter_ns() - start
+    return {**summarize(times, per_call=num_envs), "num_envs": num_envs}
+
+
+# name -> (run(ops), default ops)
+BENCHMARKS: Dict[str, Any] = {
+    "observation_process_list": (lambda ops: bench_observation_process(ops, "list"), 2000),
+    "observation_process_grid": (lambda ops: bench_observation_process(ops, "grid"), 2000),
+    "observation_process_batch": (bench_observation_batch, 2000),
+    "reward_calculate": (bench_reward_calculate, 2000),
+    "client_decode_json": (bench_client_decode_json, 2000),
+    "client_encode_json": (lambda ops: bench_client_codec(ops, "json", "encode"), 2000),
+    "client_decode_frame_json": (lambda ops: bench_client_codec(ops, "json", "decode"), 2000),
+    "env_step_http": (bench_env_step_http, 500),
+    "env_step_sim": (bench_env_step_sim, 1000),
+    "batched_sim_step": (bench_batched_sim_step, 6400),
+}
+if msgpack is not None:
+    BENCHMARKS["client_encode_msgpack"] = (lambda ops: bench_client_codec(ops, "msgpack", "encode"), 2000)
+    BENCHMARKS["client_decode_msgpack"] = (lambda ops: bench_client_codec(ops, "msgpack", "decode"), 2000)
+
+
+# ===== BASELINES =====
+
+def load_baselines(directory: Path) -> List[Dict[str, Any]]:
+    """Stored baselines, newest first."""
+    baselines = []
+    for path in sorted(directory.glob("bench_*.json"), reverse=True):
+        baseline = json.loads(path.read_text())
+        baseline["path"] = path.name
+        baselines.append(baseline)
+    return baselines
+
+
+def compare(current: Dict[str, Any], baselines: List[Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Per-benchmark p50 change against the newest baseline that has it.
+    
+    A benchmark slower by more than threshold is a regression.
+    """
+    rows = []
+    for name, stats in current["results"].items():
+        baseline = next((b for b in baselines if name in b.get("results", {})), None)
+        if baseline is None:
+            rows.append({"name": name, "current_us": stats["p50_us"], "status": "new"})
+            continue
+        old = baseline["results"][name]
+        change = stats["p50_us"] / old["p50_us"] - 1.0
+        status = "regression" if change > threshold else "improved" if change < -threshold else "ok"
+        rows.append({
+            "name": name,
+            "baseline": baseline["path"],
+            "baseline_us": old["p50_us"],
+            "current_us": stats["p50_us"],
+            "change": change,
+            "status": status,
+        })
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    print()
+    print("Compared with previous baselines (p50 per op)")
+    print(f"  {'benchmark':<28} {'baseline':>12} {'current':>12} {'change':>8}  status")
+    for row in rows:
+        baseline = f"{row['baseline_us']:.2f}us" if "baseline_us" in row else "-"
+        change = f"{row['change']:+.1%}" if "change" in row else "-"
+        source = f"  ({row['baseline']})" if "baseline" in row else ""
+        print(f"  {row['name']:<28} {baseline:>12} {row['current_us']:>10.2f}us {change:>8}  {row['status']}{source}")
+
+
+def run(names: List[str], scale: float) -> Dict[str, Any]:
+    results = {}
+    for name in names:
+        bench, ops = BENCHMARKS[name]
+        start = time.perf_counter()
+        results[name] = bench(max(int(ops * scale), 1))
+        print(f"  {name:<28} p50 {results[name]['p50_us']:>10.2f} us  "
+              f"({results[name]['ops_per_s']:,.0f} ops/s, {time.perf_counter() - start:.1f}s)")
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the Terra Scout benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None, help="Benchmarks to run")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the number of timed ops")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative p50 slowdown counted as regression")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline JSON (default: latest in --dir)")
+    parser.add_argument("--dir", type=str, default=str(BASELINE_DIR), help="Baseline directory")
+    parser.add_argument("--no-save", action="store_true", help="Do not store this run as a new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with 1 on any regression")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    directory = Path(args.dir)
+    
+    print("Terra Scout benchmarks")
+    current = run(args.only or list(BENCHMARKS), args.scale)
+    
+    if args.baseline:
+        baselines = [{**json.loads(Path(args.baseline).read_text()), "path": Path(args.baseline).name}]
+    else:
+        baselines = load_baselines(directory)
+    rows = compare(current, baselines, args.threshold)
+    print_report(rows)
+    
+    if not args.no_save:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path.write_text(json.dumps(current, indent=2))
+        print(f"\nSaved baseline {path}")
+    
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
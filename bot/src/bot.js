@@ -8,6 +8,13 @@ const { pathfinder, Movements, goals } = require("mineflayer-pathfinder");
 const logger = require("./utils/logger");
 const config = require("./utils/config");
 
+// Mineflayer yaw/pitch (radians) as the degrees /tp takes, like
+// Mineflayer's own toNotchianYaw/toNotchianPitch
+const toNotchianYaw = (yaw) => 180 - (yaw * 180) / Math.PI;
+const toNotchianPitch = (pitch) => (-pitch * 180) / Math.PI;
+// Difference of two angles in degrees, in [0, 180]
+const angleBetween = (a, b) => Math.abs(((((a - b) % 360) + 540) % 360) - 180);
+
 class TerraScoutBot {
   constructor() {
     this.bot = null;
@@ -18,6 +25,11 @@ class TerraScoutBot {
     this.totalReward = 0;
     this.startPosition = null;
     this.spawnPosition = null;
+
+    // Spawn states reset can teleport to ({ x, y, z, yaw, pitch, valid });
+    // valid is null until the state's surroundings have been checked
+    this.spawnStates = [];
+    this.lastReset = null;
     this.visitedBlocks = new Set();
     this.minedOres = new Set();
     this.lastPosition = null;
@@ -66,6 +78,19 @@ class TerraScoutBot {
     };
 
     this.valuableOres = new Set(Object.keys(this.oreValues));
+
+    // Block observation format: "list" (nearbyBlocks dicts), "grid"
+    // (palette-encoded uint16 voxel grid) or "delta" (changes since the
+    // previous step/reset frame)
+    this.blockFormat = config.observation.blockFormat;
+    this.resetPalette();
+    this.deltaSeq = 0;
+    this.deltaFrame = null;
+
+    // Pipelined stepping: the action still running after its reply
+    // (a promise of its duration in ms) and the result it finished with
+    this.pendingAction = null;
+    this.pendingResult = { success: true };
   }
 
   async connect() {
@@ -99,6 +124,7 @@ class TerraScoutBot {
           this.isConnected = true;
           this.isConnecting = false;
           this.spawnPosition = this.bot.entity.position.clone();
+          this.initSpawnStates();
           this.loadPlugins();
           this.setupEventHandlers();
           resolve();
@@ -419,7 +445,7 @@ class TerraScoutBot {
         onGround: this.bot.entity.onGround,
         inventory: this.getInventoryState(),
         visibleOres: visibleOres,
-        nearbyBlocks: this.getNearbyBlocks(),
+        ...this.getBlockObservation(),
         stepCount: this.stepCount,
         visitedCount: this.visitedBlocks.size,
         diamondsThisEpisode: this.diamondsThisEpisode,
@@ -491,6 +517,133 @@ class TerraScoutBot {
     }
   }
 
+  getBlockObservation() {
+    if (this.blockFormat === "grid") {
+      return {
+        blockGrid: this.getBlockGrid(),
+        blockPalette: this.blockPalette,
+      };
+    }
+    return { nearbyBlocks: this.getNearbyBlocks() };
+  }
+
+  /**
+   * Palette id for a block name. Ids are stable for the whole episode;
+   * 0 is reserved for air and unloaded blocks.
+   */
+  paletteId(name) {
+    let id = this.paletteIds.get(name);
+    if (id === undefined) {
+      id = this.blockPalette.length;
+      this.blockPalette.push(name);
+      this.paletteIds.set(name, id);
+    }
+    return id;
+  }
+
+  resetPalette() {
+    this.blockPalette = ["air"];
+    this.paletteIds = new Map([["air", 0]]);
+  }
+
+  /**
+   * Dense 9x9x9 grid of palette ids around the bot, indexed [x][y][z]
+   * and sent as base64 little-endian uint16.
+   */
+  getBlockGrid() {
+    const radius = 4;
+    const size = 2 * radius + 1;
+    const grid = new Uint16Array(size * size * size);
+    let origin = { x: 0, y: 0, z: 0 };
+
+    try {
+      const pos = this.bot.entity.position;
+      origin = {
+        x: Math.floor(pos.x) - radius,
+        y: Math.floor(pos.y) - radius,
+        z: Math.floor(pos.z) - radius,
+      };
+
+      let i = 0;
+      for (let x = -radius; x <= radius; x++) {
+        for (let y = -radius; y <= radius; y++) {
+          for (let z = -radius; z <= radius; z++) {
+            const block = this.bot.blockAt(pos.offset(x, y, z));
+            grid[i++] = block ? this.paletteId(block.name) : 0;
+          }
+        }
+      }
+    } catch (err) {}
+
+    return {
+      shape: [size, size, size],
+      origin: origin,
+      data: Buffer.from(grid.buffer).toString("base64"),
+    };
+  }
+
+  /**
+   * In "delta" block format, replace nearbyBlocks and visibleOres with a
+   * blockDelta holding only what changed since the previous frame. Every
+   * frame has a sequence number; a delta names the frame it patches
+   * (base) so the client can detect a missed frame and ask for a keyframe.
+   */
+  encodeObservation(observation, keyframe = false) {
+    if (!observation || this.blockFormat !== "delta") return observation;
+
+    const { nearbyBlocks, visibleOres, ...rest } = observation;
+    const blocks = new Map();
+    for (const b of nearbyBlocks) {
+      const { x, y, z } = b.position;
+      blocks.set(`${x},${y},${z}`, [x, y, z, b.name]);
+    }
+    const ores = new Map();
+    for (const o of visibleOres) {
+      const x = Math.floor(o.position.x);
+      const y = Math.floor(o.position.y);
+      const z = Math.floor(o.position.z);
+      ores.set(`${x},${y},${z}`, [x, y, z, o.name, o.value]);
+    }
+
+    const prev = this.deltaFrame;
+    const delta = { seq: ++this.deltaSeq, keyframe: keyframe || !prev };
+
+    if (delta.keyframe) {
+      delta.blocks = [...blocks.values()];
+      delta.ores = [...ores.values()];
+    } else {
+      delta.base = prev.seq;
+      delta.positionDelta = {
+        x: rest.position.x - prev.position.x,
+        y: rest.position.y - prev.position.y,
+        z: rest.position.z - prev.position.z,
+      };
+      delta.added = [];
+      delta.changed = [];
+      delta.removed = [];
+      for (const [key, block] of blocks) {
+        const old = prev.blocks.get(key);
+        if (old === undefined) delta.added.push(block);
+        else if (old[3] !== block[3]) delta.changed.push(block);
+      }
+      for (const [key, block] of prev.blocks) {
+        if (!blocks.has(key)) delta.removed.push(block.slice(0, 3));
+      }
+      delta.oresAdded = [];
+      delta.oresRemoved = [];
+      for (const [key, ore] of ores) {
+        const old = prev.ores.get(key);
+        if (old === undefined || old[3] !== ore[3]) delta.oresAdded.push(ore);
+      }
+      for (const [key, ore] of prev.ores) {
+        if (!ores.has(key)) delta.oresRemoved.push(ore.slice(0, 3));
+      }
+    }
+
+    this.deltaFrame = { seq: delta.seq, position: rest.position, blocks, ores };
+    return { ...rest, blockDelta: delta };
+  }
+
   // ===== ACTIONS =====
 
   async executeAction(action) {
@@ -1094,8 +1247,216 @@ class TerraScoutBot {
 
   // ===== EPISODE =====
 
-  async reset() {
+  /**
+   * Spawn states: the world spawn plus config.bot.spawnStates. Configured
+   * states are validated the first time they are used and dropped if
+   * they turn out unsafe.
+   */
+  initSpawnStates() {
+    const sp = this.spawnPosition;
+    this.spawnStates = [
+      {
+        x: Math.floor(sp.x),
+        y: Math.floor(sp.y),
+        z: Math.floor(sp.z),
+        yaw: 0,
+        pitch: 0,
+        valid: true,
+      },
+      ...config.bot.spawnStates.map((s) => ({ ...s, valid: null })),
+    ];
+  }
+
+  /**
+   * Save the bot's current position as a spawn state. It is validated
+   * right away (its chunk is loaded); returns the new state's index.
+   */
+  addSpawnState() {
+    const pos = this.bot.entity.position;
+    const state = {
+      x: Math.floor(pos.x),
+      y: Math.floor(pos.y),
+      z: Math.floor(pos.z),
+      yaw: toNotchianYaw(this.bot.entity.yaw),
+      pitch: toNotchianPitch(this.bot.entity.pitch),
+      valid: null,
+    };
+    if (this.validateSpawnState(state) !== true) {
+      throw new Error("Current position is not a safe spawn state");
+    }
+    state.valid = true;
+    this.spawnStates.push(state);
+    return this.spawnStates.length - 1;
+  }
+
+  /**
+   * Whether a spawn state is safe: free feet and head, solid ground and
+   * no dangerous blocks within 2 blocks. null if its chunk is not loaded.
+   */
+  validateSpawnState(state) {
+    // Positions relative to the bot's block, so no Vec3 import is needed
+    const origin = this.bot.entity.position.floored();
+    const at = (dx, dy, dz) =>
+      this.bot.blockAt(
+        origin.offset(
+          state.x - origin.x + dx,
+          state.y - origin.y + dy,
+          state.z - origin.z + dz,
+        ),
+      );
+    const feet = at(0, 0, 0);
+    const head = at(0, 1, 0);
+    const ground = at(0, -1, 0);
+    if (!feet || !head || !ground) return null;
+    if (feet.boundingBox !== "empty" || head.boundingBox !== "empty") {
+      return false;
+    }
+    if (ground.boundingBox !== "block") return false;
+
+    for (let dx = -2; dx <= 2; dx++) {
+      for (let dy = -2; dy <= 2; dy++) {
+        for (let dz = -2; dz <= 2; dz++) {
+          const block = at(dx, dy, dz);
+          if (block && this.dangerousBlocks.has(block.name)) return false;
+        }
+      }
+    }
+    return true;
+  }
+
+  /**
+   * Whether the bot faces the way spawn state `state` was saved (within
+   * 1 degree): the round-trip check of its yaw and pitch after a reset.
+   */
+  facesSpawnState(state) {
+    const entity = this.bot.entity;
+    return (
+      angleBetween(toNotchianYaw(entity.yaw), state.yaw) < 1 &&
+      Math.abs(toNotchianPitch(entity.pitch) - state.pitch) < 1
+    );
+  }
+
+  /** Index of the spawn state to reset to: a number, "random" or 0. */
+  pickSpawnState(spawn) {
+    const usable = this.spawnStates
+      .map((state, i) => i)
+      .filter((i) => this.spawnStates[i].valid !== false);
+    if (spawn === "random") {
+      return usable[Math.floor(Math.random() * usable.length)];
+    }
+    const index = Number.isInteger(spawn) ? spawn : 0;
+    return usable.includes(index) ? index : 0;
+  }
+
+  /**
+   * Resolve true once emitter fires event with arguments passing check,
+   * or false after timeoutMs.
+   */
+  waitFor(emitter, event, check, timeoutMs = config.bot.resetTimeout) {
+    return new Promise((resolve) => {
+      const onEvent = (...args) => {
+        if (check(...args)) finish(true);
+      };
+      const finish = (confirmed) => {
+        clearTimeout(timer);
+        emitter.removeListener(event, onEvent);
+        resolve(confirmed);
+      };
+      const timer = setTimeout(() => finish(false), timeoutMs);
+      emitter.on(event, onEvent);
+    });
+  }
+
+  /** Send a chat command; resolves when the server's event confirms it. */
+  command(text, emitter, event, check) {
+    const confirmed = this.waitFor(emitter, event, check);
+    this.bot.chat(text);
+    return confirmed;
+  }
+
+  /**
+   * Put the player back into spawn state `index`: empty inventory but a
+   * pickaxe, teleported, full health and food. Commands are sent
+   * back-to-back and each is confirmed by its inventory, position or
+   * health event instead of a fixed sleep. Resolves true if all were.
+   */
+  async restorePlayer(index) {
+    const state = this.spawnStates[index];
+    const inventory = this.bot.inventory;
+    const target = { x: state.x + 0.5, y: state.y, z: state.z + 0.5 };
+    const confirmations = [];
+
+    if (inventory.items().length > 0) {
+      confirmations.push(
+        this.command(
+          "/clear",
+          inventory,
+          "updateSlot",
+          () => inventory.items().length === 0,
+        ),
+      );
+    }
+    confirmations.push(
+      this.command(
+        "/give @s iron_pickaxe",
+        inventory,
+        "updateSlot",
+        (slot, oldItem, newItem) => !!newItem && newItem.name === "iron_pickaxe",
+      ),
+    );
+    confirmations.push(
+      this.command(
+        `/tp @s ${target.x} ${target.y} ${target.z} ${state.yaw} ${state.pitch}`,
+        this.bot,
+        "forcedMove",
+        () => {
+          const pos = this.bot.entity.position;
+          return (
+            Math.abs(pos.x - target.x) < 1 &&
+            Math.abs(pos.y - target.y) < 1 &&
+            Math.abs(pos.z - target.z) < 1
+          );
+        },
+      ),
+    );
+    if (this.bot.health < 20) {
+      confirmations.push(
+        this.command(
+          "/effect give @s instant_health 1 10",
+          this.bot,
+          "health",
+          () => this.bot.health >= 20,
+        ),
+      );
+    }
+    if (this.bot.food < 20) {
+      confirmations.push(
+        this.command(
+          "/effect give @s saturation 1 10",
+          this.bot,
+          "health",
+          () => this.bot.food >= 20,
+        ),
+      );
+    }
+
+    if (!(await Promise.all(confirmations)).every(Boolean)) return false;
+    if (!this.facesSpawnState(state)) {
+      logger.warn(`Spawn state ${index} restored facing the wrong way`);
+      return false;
+    }
+    return true;
+  }
+
+  async reset(options = {}) {
     logger.info("Resetting episode...");
+    await this.finishPending();
+
+    if (options.blockFormat) {
+      this.blockFormat = options.blockFormat;
+    }
+    this.resetPalette();
+    this.deltaFrame = null;
 
     this.stepCount = 0;
     this.totalReward = 0;
@@ -1111,41 +1472,97 @@ class TerraScoutBot {
     this.currentStrategy = "descend";
     this.inCave = false;
 
-    if (this.bot && this.isConnected) {
+    const start = Date.now();
+    let spawn = null;
+    let confirmed = false;
+    if (this.bot && this.isConnected && this.spawnStates.length) {
       try {
         // Stop movement
         ["forward", "back", "left", "right", "jump", "sprint"].forEach((s) =>
           this.bot.setControlState(s, false),
         );
 
-        // Reset player
-        this.bot.chat("/clear");
-        await this.sleep(100);
-        this.bot.chat("/give @s iron_pickaxe");
-        await this.sleep(100);
+        spawn = this.pickSpawnState(options.spawn);
+        confirmed = await this.restorePlayer(spawn);
 
-        if (this.spawnPosition) {
-          const sp = this.spawnPosition;
-          this.bot.chat(
-            `/tp @s ${Math.floor(sp.x)} ${Math.floor(sp.y)} ${Math.floor(sp.z)}`,
-          );
-          await this.sleep(200);
+        const state = this.spawnStates[spawn];
+        if (confirmed && state.valid === null) {
+          state.valid = this.validateSpawnState(state);
+          if (state.valid === false) {
+            logger.warn(`Spawn state ${spawn} is unsafe, using the world spawn`);
+            spawn = 0;
+            confirmed = await this.restorePlayer(spawn);
+          }
         }
-
-        this.bot.chat("/effect give @s instant_health 1 10");
-        this.bot.chat("/effect give @s saturation 1 10");
-        await this.sleep(100);
-      } catch (err) {}
+        if (!confirmed) {
+          logger.warn("Reset commands not confirmed in time");
+        }
+      } catch (err) {
+        logger.warn("Reset failed:", err.message);
+      }
     }
+    this.lastReset = { spawn, confirmed, resetMs: Date.now() - start };
 
-    return this.getObservation();
+    return this.encodeObservation(this.getObservation(), true);
   }
 
-  async step(action) {
+  async step(action, encode = true) {
+    if (action.pipeline) return this.stepPipelined(action);
+    await this.finishPending();
     const result = await this.executeAction(action);
-    const observation = this.getObservation();
+    const observation = encode
+      ? this.encodeObservation(this.getObservation(), action.keyframe)
+      : this.getObservation();
+    const reward = this.calculateReward();
+    const done = !this.episodeRunning || (this.bot && this.bot.health <= 0);
+
+    return {
+      observation,
+      reward,
+      done,
+      info: {
+        stepCount: this.stepCount,
+        totalReward: this.totalReward,
+        success: result.success,
+        minedOres: this.minedOres.size,
+        diamondsThisEpisode: this.diamondsThisEpisode,
+        strategy: this.currentStrategy,
+        inCave: this.inCave,
+      },
+    };
+  }
+
+  /**
+   * Pipelined step: wait for the previous pipelined action, reply with
+   * a snapshot of the state it left (observation, reward, done) and
+   * start this action without awaiting it, so it runs while the agent
+   * processes the snapshot and picks the next action. The reply's
+   * pipeline field holds how long the previous action ran (actionMs) and
+   * how long this request waited for it (waitMs); the difference ran in
+   * parallel with the agent.
+   */
+  async stepPipelined(action) {
+    const waitStart = Date.now();
+    const actionMs = await this.finishPending();
+    const waitMs = Date.now() - waitStart;
+    const result = this.pendingResult;
+    this.pendingResult = { success: true };
+
+    const observation = this.encodeObservation(
+      this.getObservation(),
+      action.keyframe,
+    );
     const reward = this.calculateReward();
     const done = !this.episodeRunning || (this.bot && this.bot.health <= 0);
+    if (!done) {
+      const start = Date.now();
+      this.pendingAction = this.executeAction(action)
+        .catch((err) => ({ success: false, error: err.message }))
+        .then((actionResult) => {
+          this.pendingResult = actionResult;
+          return Date.now() - start;
+        });
+    }
 
     return {
       observation,
@@ -1160,6 +1577,55 @@ class TerraScoutBot {
         strategy: this.currentStrategy,
         inCave: this.inCave,
       },
+      pipeline: { actionMs, waitMs },
+    };
+  }
+
+  /** Wait for a running pipelined action; returns its duration in ms. */
+  async finishPending() {
+    if (!this.pendingAction) return 0;
+    const actionMs = await this.pendingAction;
+    this.pendingAction = null;
+    return actionMs;
+  }
+
+  /**
+   * Execute several actions back-to-back for one bridge round-trip.
+   * Stops early when the episode ends, a diamond is mined or, with
+   * options.stopOnDiamond, a diamond comes into view. Returns every step
+   * result ({ results }), or with options.aggregate a single step result:
+   * the last observation, the summed reward and the number of substeps.
+   */
+  async stepMany(actions, options = {}) {
+    if (!actions || !actions.length) throw new Error("No actions to execute");
+    const results = [];
+    const diamondsBefore = this.diamondsThisEpisode;
+    for (const action of actions) {
+      const result = await this.step(action, !options.aggregate);
+      results.push(result);
+      if (
+        result.done ||
+        this.diamondsThisEpisode > diamondsBefore ||
+        (options.stopOnDiamond &&
+          result.observation &&
+          result.observation.diamondNearby)
+      ) {
+        break;
+      }
+    }
+
+    if (!options.aggregate) return { results };
+
+    // Only the final frame is encoded, so "delta" frames stay in sequence
+    const last = results[results.length - 1];
+    return {
+      ...last,
+      observation: this.encodeObservation(
+        last.observation,
+        actions.some((a) => a.keyframe),
+      ),
+      reward: results.reduce((sum, r) => sum + r.reward, 0),
+      substeps: results.length,
     };
   }
 
@@ -6,10 +6,24 @@
 const express = require("express");
 const { WebSocketServer } = require("ws");
 const http = require("http");
+const net = require("net");
 const logger = require("./utils/logger");
 const config = require("./utils/config");
 const TerraScoutBot = require("./bot");
 
+// Optional: MessagePack encoding for the framed protocol
+let msgpack = null;
+try {
+  msgpack = require("@msgpack/msgpack");
+} catch (err) {}
+
+/**
+ * Framed protocol: every frame is a 4-byte big-endian payload length
+ * followed by the payload. The first frame on a connection is a JSON
+ * hello ({ encoding }) choosing the encoding of all later frames.
+ */
+const FRAME_HEADER_BYTES = 4;
+
 class TerraScoutServer {
   constructor() {
     this.bot = new TerraScoutBot();
@@ -18,11 +32,24 @@ class TerraScoutServer {
     this.server = http.createServer(this.app);
     this.wss = new WebSocketServer({ server: this.server });
     this.clients = new Set();
+    this.framedServer = net.createServer((socket) =>
+      this.handleFramedConnection(socket),
+    );
+    this.framedPort = null; // Port actually bound; null until listening or after a failure
+    this.framedServer.on("error", (err) => {
+      logger.error("Framed protocol server failed:", err.message);
+      logger.warn("Only HTTP will be offered by /negotiate");
+      this.framedPort = null;
+    });
 
     this.setupRoutes();
     this.setupWebSocket();
   }
 
+  get encodings() {
+    return msgpack ? ["msgpack", "json"] : ["json"];
+  }
+
   setupRoutes() {
     // Health check
     this.app.get("/health", (req, res) => {
@@ -50,17 +77,43 @@ class TerraScoutServer {
       }
     });
 
+    // Execute a sequence of actions in one round-trip
+    this.app.post("/actions", async (req, res) => {
+      try {
+        const { actions = [], ...options } = req.body || {};
+        const result = await this.bot.stepMany(actions, options);
+        res.json(result);
+        this.broadcast("steps", result);
+      } catch (err) {
+        res.status(500).json({ error: err.message });
+      }
+    });
+
     // Reset episode
     this.app.post("/reset", async (req, res) => {
       try {
-        const obs = await this.bot.reset();
-        res.json({ observation: obs });
+        const obs = await this.bot.reset(req.body || {});
+        res.json({ observation: obs, info: this.bot.lastReset });
         this.broadcast("reset", { observation: obs });
       } catch (err) {
         res.status(500).json({ error: err.message });
       }
     });
 
+    // Spawn states reset can use ({ spawn: index | "random" })
+    this.app.get("/spawns", (req, res) => {
+      res.json({ spawns: this.bot.spawnStates });
+    });
+
+    // Save the current position as a spawn state
+    this.app.post("/spawns", (req, res) => {
+      try {
+        res.json({ index: this.bot.addSpawnState() });
+      } catch (err) {
+        res.status(400).json({ error: err.message });
+      }
+    });
+
     // Get bot status
     this.app.get("/status", (req, res) => {
       res.json({
@@ -87,6 +140,66 @@ class TerraScoutServer {
       this.bot.disconnect();
       res.json({ success: true, message: "Disconnected" });
     });
+
+    // Negotiate transport: pick the first client encoding we support
+    this.app.post("/negotiate", (req, res) => {
+      const requested = (req.body && req.body.encodings) || [];
+      const encoding = requested.find((e) => this.encodings.includes(e));
+      if (!encoding || !this.framedPort) {
+        res.json({ transport: "http", encoding: "json" });
+        return;
+      }
+      res.json({
+        transport: "framed",
+        encoding: encoding,
+        port: this.framedPort,
+      });
+    });
+  }
+
+  /**
+   * Handle one request message ({ id, type, ... }) from a streaming
+   * transport and build the reply ({ id, type, data } or error).
+   */
+  async handleMessage(data) {
+    try {
+      switch (data.type) {
+        case "action":
+          return {
+            id: data.id,
+            type: "step",
+            data: await this.bot.step(data.action),
+          };
+        case "actions":
+          return {
+            id: data.id,
+            type: "steps",
+            data: await this.bot.stepMany(data.actions || [], data.options || {}),
+          };
+        case "reset": {
+          const obs = await this.bot.reset(data.options || {});
+          return {
+            id: data.id,
+            type: "reset",
+            data: { observation: obs, info: this.bot.lastReset },
+          };
+        }
+        case "observation":
+          return {
+            id: data.id,
+            type: "observation",
+            data: this.bot.getObservation(),
+          };
+        default:
+          return {
+            id: data.id,
+            type: "error",
+            error: `Unknown message type: ${data.type}`,
+          };
+      }
+    } catch (err) {
+      return { id: data.id, type: "error", error: err.message };
+    }
   }
 
   setupWebSocket() {
@@ -95,30 +208,14 @@ class TerraScoutServer {
       this.clients.add(ws);
 
       ws.on("message", async (message) => {
+        let data;
         try {
-          const data = JSON.parse(message);
-
-          switch (data.type) {
-            case "action":
-              const result = await this.bot.step(data.action);
-              ws.send(JSON.stringify({ type: "step", data: result }));
-              break;
-            case "reset":
-              const obs = await this.bot.reset();
-              ws.send(
-                JSON.stringify({ type: "reset", data: { observation: obs } }),
-              );
-              break;
-            case "observation":
-              const observation = this.bot.getObservation();
-              ws.send(
-                JSON.stringify({ type: "observation", data: observation }),
-              );
-              break;
-          }
+          data = JSON.parse(message);
         } catch (err) {
           ws.send(JSON.stringify({ type: "error", error: err.message }));
+          return;
         }
+        ws.send(JSON.stringify(await this.handleMessage(data)));
       });
 
       ws.on("close", () => {
@@ -128,6 +225,84 @@ class TerraScoutServer {
     });
   }
 
+  handleFramedConnection(socket) {
+    logger.info("Framed client connected");
+    socket.setNoDelay(true);
+
+    let encoding = null;
+    let buffered = Buffer.alloc(0);
+
+    const send = (message, enc) => {
+      const payload = this.encodeFrame(message, enc);
+      const header = Buffer.alloc(FRAME_HEADER_BYTES);
+      header.writeUInt32BE(payload.length, 0);
+      socket.write(Buffer.concat([header, payload]));
+    };
+
+    socket.on("data", (chunk) => {
+      buffered = buffered.length ? Buffer.concat([buffered, chunk]) : chunk;
+
+      while (buffered.length >= FRAME_HEADER_BYTES) {
+        const length = buffered.readUInt32BE(0);
+        if (buffered.length < FRAME_HEADER_BYTES + length) break;
+        const payload = buffered.subarray(
+          FRAME_HEADER_BYTES,
+          FRAME_HEADER_BYTES + length,
+        );
+        buffered = buffered.subarray(FRAME_HEADER_BYTES + length);
+
+        if (encoding === null) {
+          // Hello frame (always JSON)
+          try {
+            const hello = JSON.parse(payload.toString("utf8"));
+            if (!this.encodings.includes(hello.encoding)) {
+              throw new Error(`Unsupported encoding: ${hello.encoding}`);
+            }
+            encoding = hello.encoding;
+            send({ type: "hello", encoding: encoding }, "json");
+          } catch (err) {
+            send({ type: "error", error: err.message }, "json");
+            socket.end();
+            return;
+          }
+          continue;
+        }
+
+        let data;
+        try {
+          data = this.decodeFrame(payload, encoding);
+        } catch (err) {
+          send({ type: "error", error: err.message }, encoding);
+          continue;
+        }
+        this.handleMessage(data).then((reply) => send(reply, encoding));
+      }
+    });
+
+    socket.on("error", (err) => {
+      logger.warn("Framed client error:", err.message);
+    });
+
+    socket.on("close", () => {
+      logger.info("Framed client disconnected");
+    });
+  }
+
+  encodeFrame(message, encoding) {
+    if (encoding === "msgpack") {
+      const encoded = msgpack.encode(withBinaryGrid(message));
+      return Buffer.from(encoded.buffer, encoded.byteOffset, encoded.byteLength);
+    }
+    return Buffer.from(JSON.stringify(message), "utf8");
+  }
+
+  decodeFrame(payload, encoding) {
+    if (encoding === "msgpack") {
+      return msgpack.decode(payload);
+    }
+    return JSON.parse(payload.toString("utf8"));
+  }
+
   broadcast(type, data) {
     const message = JSON.stringify({ type, data });
     this.clients.forEach((client) => {
@@ -154,7 +329,35 @@ class TerraScoutServer {
       );
       logger.success(`WebSocket running on ws://localhost:${config.api.port}`);
     });
+
+    // Start framed (binary) server
+    this.framedServer.listen(config.api.framedPort, () => {
+      this.framedPort = this.framedServer.address().port;
+      logger.success(
+        `Framed protocol on tcp://localhost:${this.framedPort} (${this.encodings.join(", ")})`,
+      );
+    });
   }
 }
 
+/**
+ * Send the block grid of a reply as raw bytes instead of base64 text
+ * when the encoding supports binary data.
+ */
+function withBinaryGrid(message) {
+  const data = message.data;
+  const obs = data && (data.observation || data);
+  const grid = obs && obs.blockGrid;
+  if (!grid || typeof grid.data !== "string") return message;
+
+  const binaryObs = {
+    ...obs,
+    blockGrid: { ...grid, data: Buffer.from(grid.data, "base64") },
+  };
+  return {
+    ...message,
+    data: data.observation ? { ...data, observation: binaryObs } : binaryObs,
+  };
+}
+
 module.exports = TerraScoutServer;
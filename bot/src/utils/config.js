@@ -17,6 +17,7 @@ const config = {
   api: {
     port: parseInt(process.env.API_PORT) || 3000,
     wsPort: parseInt(process.env.WS_PORT) || 3001,
+    framedPort: parseInt(process.env.FRAMED_PORT) || 0, // Binary framed protocol; 0: any free port (see /negotiate)
   },
 
   // Bot Settings
@@ -26,6 +27,15 @@ const config = {
     autoEat: true,
     autoReconnect: true,
     reconnectDelay: 5000,
+    // Extra spawn states for reset ("x,y,z[,yaw,pitch];..."); the world spawn is always state 0
+    spawnStates: (process.env.SPAWN_STATES || "")
+      .split(";")
+      .filter((s) => s.trim())
+      .map((s) => {
+        const [x, y, z, yaw = 0, pitch = 0] = s.split(",").map(Number);
+        return { x, y, z, yaw, pitch };
+      }),
+    resetTimeout: parseInt(process.env.RESET_TIMEOUT) || 2000, // ms to wait for each reset command's confirmation
   },
 
   // Observation Settings
@@ -34,6 +44,7 @@ const config = {
     includeNearbyBlocks: true,
     includeNearbyEntities: true,
     nearbyBlockRadius: 5,
+    blockFormat: process.env.OBS_BLOCK_FORMAT || "list", // "list", "grid" or "delta"
     nearbyEntityRadius: 10,
   },
 
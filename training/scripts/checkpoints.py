@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Terra Scout Checkpoints
+Non-blocking model checkpoints with retention and full resume state
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import torch
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.save_util import recursive_getattr, save_to_zip_file
+
+PathLike = Union[str, Path]
+
+# Zip member holding the training state beside the SB3 model files
+STATE_MEMBER = "training_state.json"
+
+
+def _cpu_copy(value: Any) -> Any:
+    """Copy a (nested) state dict with every tensor cloned to the CPU."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return {key: _cpu_copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_cpu_copy(item) for item in value)
+    return copy.deepcopy(value)
+
+
+def snapshot_model(model: BaseAlgorithm) -> Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    In-memory copy of what model.save() writes: (data, params,
+    pytorch_variables). Parameters and optimizer state are cloned to the
+    CPU, so training can go on while the copy is serialized.
+    """
+    data = model.__dict__.copy()
+    exclude = set(model._excluded_save_params())
+    state_dicts_names, torch_variable_names = model._get_torch_save_params()
+    for name in state_dicts_names + torch_variable_names:
+        exclude.add(name.split(".")[0])
+    for name in exclude:
+        data.pop(name, None)
+    
+    pytorch_variables = None
+    if torch_variable_names:
+        pytorch_variables = {name: _cpu_copy(recursive_getattr(model, name)) for name in torch_variable_names}
+    params = {name: _cpu_copy(state_dict) for name, state_dict in model.get_parameters().items()}
+    return copy.deepcopy(data), params, pytorch_variables
+
+
+def write_checkpoint(
+    path: PathLike,
+    snapshot: Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]],
+    state: Optional[Dict[str, Any]] = None,
+):
+    """
+    Write a snapshot as an SB3 model zip (PPO.load reads it) with the
+    training state added as a JSON member. The file is written and synced
+    under a temporary name, then renamed into place.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    data, params, pytorch_variables = snapshot
+    with open(tmp, "wb") as f:
+        save_to_zip_file(f, data=data, params=params, pytorch_variables=pytorch_variables)
+    with zipfile.ZipFile(tmp, mode="a") as archive:
+        archive.writestr(STATE_MEMBER, json.dumps(state or {}, indent=2))
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_training_state(path: PathLike) -> Dict[str, Any]:
+    """Training state of a checkpoint zip; {} for plain model zips."""
+    with zipfile.ZipFile(path) as archive:
+        if STATE_MEMBER not in archive.namelist():
+            return {}
+        return json.loads(archive.read(STATE_MEMBER))
+
+
+def latest_checkpoint(path: PathLike) -> Path:
+    """
+    The checkpoint to resume from: path itself if it is a file, else the
+    newest checkpoint (most timesteps) listed in the indexes under it.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return path
+    entries = [
+        {**entry, "dir": index.parent}
+        for index in path.glob("*_checkpoints.json")
+        for entry in json.loads(index.read_text()).get("checkpoints", [])
+        if (index.parent / entry["file"]).exists()
+    ]
+    if not entries:
+        raise FileNotFoundError(f"No checkpoints under {path}")
+    newest = max(entries, key=lambda entry: (entry["timesteps"], entry["time"]))
+    return newest["dir"] / newest["file"]
+
+
+class CheckpointManager:
+    """
+    Saves model checkpoints without blocking training.
+    
+    save() only snapshots the parameters and optimizer state in memory; a
+    writer thread serializes the snapshot, renames it into place and
+    applies retention. If a snapshot is still waiting when the next one
+    arrives, the newer one replaces it, so training never waits on disk
+    I/O and at most two snapshots are held in memory.
+    
+    Retention keeps the keep_last newest checkpoints plus the keep_best
+    with the highest metric. They are listed in
+    save_dir/<name_prefix>_checkpoints.json, which a resumed run with the
+    same prefix continues.
+    """
+    
+    def __init__(
+        self,
+        save_dir: PathLike = "training/checkpoints",
+        name_prefix: str = "terra_scout",
+        keep_last: int = 3,
+        keep_best: int = 1,
+    ):
+        self.save_dir = Path(save_dir)
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        self.name_prefix = name_prefix
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.index_path = self.save_dir / f"{name_prefix}_checkpoints.json"
+        self.checkpoints: List[Dict[str, Any]] = []
+        if self.index_path.exists():
+            self.checkpoints = json.loads(self.index_path.read_text()).get("checkpoints", [])
+        
+        self.errors: List[str] = []
+        self._pending: Optional[Dict[str, Any]] = None
+        self._writing = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="terra-scout-checkpoints", daemon=True)
+        self._thread.start()
+    
+    def save(
+        self,
+        model: BaseAlgorithm,
+        metric: Optional[float] = None,
+        state: Optional[Dict[str, Any]] = None,
+    ) -> Path:
+        """
+        Snapshot the model now and write it in the background. metric
+        ranks the checkpoint for keep_best (None: never kept as best);
+        state is stored as the checkpoint's training state.
+        """
+        timesteps = int(model.num_timesteps)
+        path = self.save_dir / f"{self.name_prefix}_{timesteps}_steps.zip"
+        job = {
+            "path": path,
+            "snapshot": snapshot_model(model),
+            "state": {**(state or {}), "num_timesteps": timesteps},
+            "entry": {"file": path.name, "timesteps": timesteps, "metric": metric, "time": time.time()},
+        }
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("CheckpointManager is closed")
+            self._pending = job
+            self._condition.notify()
+        return path
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                job, self._pending = self._pending, None
+                self._writing = True
+            try:
+                write_checkpoint(job["path"], job["snapshot"], job["state"])
+                self._add(job["entry"])
+            except Exception as e:
+                self.errors.append(f"{job['path']}: {e}")
+                print(f"Checkpoint {job['path']} failed: {e}", file=sys.stderr)
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+    
+    def _add(self, entry: Dict[str, Any]):
+        """Index a written checkpoint and delete the ones retention drops."""
+        checkpoints = [c for c in self.checkpoints if c["file"] != entry["file"]] + [entry]
+        newest = sorted(checkpoints, key=lambda c: c["timesteps"], reverse=True)[:self.keep_last]
+        ranked = [c for c in checkpoints if c["metric"] is not None]
+        best = sorted(ranked, key=lambda c: c["metric"], reverse=True)[:self.keep_best]
+        keep = {c["file"] for c in newest + best}
+        
+        for dropped in checkpoints:
+            if dropped["file"] not in keep:
+                (self.save_dir / dropped["file"]).unlink(missing_ok=True)
+        self.checkpoints = sorted(
+            (c for c in checkpoints if c["file"] in keep), key=lambda c: c["timesteps"]
+        )
+        
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "name_prefix": self.name_prefix,
+            "checkpoints": self.checkpoints,
+            "best": best[0]["file"] if best else None,
+        }, indent=2))
+        os.replace(tmp, self.index_path)
+    
+    def wait(self):
+        """Block until every snapshot taken so far is on disk."""
+        with self._condition:
+            while self._pending is not None or self._writing:
+                self._condition.wait()
+    
+    def close(self):
+        """Write the remaining snapshot and stop the writer thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """
+    Checkpoints through a CheckpointManager every save_freq timesteps,
+    at the start of a rollout (right after the policy update, so the
+    saved counters and weights agree) and at the end of training.
+    
+    state_fn returns extra training state to store (callback counters,
+    metrics run); metric_fn the value ranking checkpoints for keep_best.
+    """
+    
+    def __init__(
+        self,
+        manager: CheckpointManager,
+        save_freq: int,
+        state_fn: Optional[Callable[[], Dict[str, Any]]] = None,
+        metric_fn: Optional[Callable[[], Optional[float]]] = None,
+        verbose: int = 0,
+    ):
+        super().__init__(verbose)
+        self.manager = manager
+        self.save_freq = save_freq
+        self.state_fn = state_fn
+        self.metric_fn = metric_fn
+        self._last_save = 0
+        self.snapshot_seconds = 0.0
+    
+    def _init_callback(self) -> None:
+        self._last_save = self.model.num_timesteps
+    
+    def _on_rollout_start(self) -> None:
+        if self.model.num_timesteps - self._last_save >= self.save_freq:
+            self.save()
+    
+    def _on_step(self) -> bool:
+        return True
+    
+    def _on_training_end(self) -> None:
+        if self.model.num_timesteps > self._last_save:
+            self.save()
+    
+    def save(self) -> Path:
+        """Checkpoint now; returns the path being written."""
+        start = time.perf_counter()
+        path = self.manager.save(
+            self.model,
+            metric=self.metric_fn() if self.metric_fn else None,
+            state=self.state_fn() if self.state_fn else None,
+        )
+        self.snapshot_seconds += time.perf_counter() - start
+        self._last_save = self.model.num_timesteps
+        if self.verbose:
+            print(f"  Checkpoint {path.name} ({self.model.num_timesteps} steps)")
+        return path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List Terra Scout checkpoints")
+    parser.add_argument("path", nargs="?", default="training/checkpoints",
+                        help="Checkpoint directory or checkpoint zip")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    path = Path(args.path)
+    if path.is_dir():
+        for index in sorted(path.glob("*_checkpoints.json")):
+            data = json.loads(index.read_text())
+            print(f"{data['name_prefix']} (best: {data.get('best')})")
+            for entry in data["checkpoints"]:
+                metric = "-" if entry["metric"] is None else f"{entry['metric']:.2f}"
+                print(f"  {entry['file']}: {entry['timesteps']} steps, metric {metric}")
+        path = latest_checkpoint(path)
+        print(f"Latest: {path}")
+    print(json.dumps(load_training_state(path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ import numpy as np
 from stable_baselines3 import PPO
 
 from agent.src.bridge.environment import TerraScoutEnv
+from agent.src.environment import TerraScoutVecEnv
 
 
 def parse_args():
@@ -23,6 +24,12 @@ def parse_args():
     parser.add_argument("--max-steps", type=int, default=2000, help="Max steps per episode")
     parser.add_argument("--host", type=str, default="localhost", help="Bot API host")
     parser.add_argument("--port", type=int, default=3000, help="Bot API port")
+    parser.add_argument("--num-envs", type=int, default=1, help="Number of bots (ports port..port+N-1)")
+    parser.add_argument("--ports", type=int, nargs="+", default=None, help="Explicit bot API ports (overrides --num-envs)")
+    parser.add_argument("--backend", choices=["http", "binary", "websocket", "sim"], default="http",
+                        help="Bot connection (sim: in-process simulator, no Minecraft)")
+    parser.add_argument("--block-format", choices=["list", "grid", "delta"], default="list",
+                        help="Block observation format")
     parser.add_argument("--deterministic", action="store_true", help="Use deterministic actions")
     parser.add_argument("--verbose", action="store_true", help="Verbose output")
     return parser.parse_args()
@@ -40,14 +47,13 @@ def main():
     print(f"Loading model: {args.model}")
     model = PPO.load(args.model)
     
-    # Create environment
-    print("Creating environment...")
-    env = TerraScoutEnv(
-        host=args.host,
-        port=args.port,
+    ports = args.ports or [args.port + i for i in range(args.num_envs)]
+    env_kwargs = dict(
         max_steps=args.max_steps,
         use_enhanced_obs=True,
         use_enhanced_rewards=True,
+        backend=args.backend,
+        block_format=args.block_format,
     )
     
     # Evaluation metrics
@@ -57,25 +63,8 @@ def main():
     diamond_zone_entries = []
     diamonds_found = 0
     
-    print(f"\nEvaluating for {args.episodes} episodes...")
-    print()
-    
-    for ep in range(args.episodes):
-        obs, info = env.reset()
-        episode_reward = 0
-        steps = 0
-        done = False
-        
-        while not done and steps < args.max_steps:
-            action, _ = model.predict(obs, deterministic=args.deterministic)
-            obs, reward, terminated, truncated, info = env.step(action)
-            episode_reward += reward
-            steps += 1
-            done = terminated or truncated
-            
-            if args.verbose and steps % 100 == 0:
-                stats = info.get('episode_stats', {})
-                print(f"  Step {steps}: y={stats.get('lowest_y', 'N/A')}, reward={episode_reward:.2f}")
+    def record_episode(episode_reward: float, steps: int, info: dict):
+        nonlocal diamonds_found
         
         # Get final stats
         stats = info.get('episode_stats', {})
@@ -92,12 +81,60 @@ def main():
         if raw_obs and raw_obs.get('inventory', {}).get('diamond', 0) > 0:
             diamonds_found += 1
         
-        print(f"Episode {ep + 1}/{args.episodes}: "
+        print(f"Episode {len(episode_rewards)}/{args.episodes}: "
               f"reward={episode_reward:.2f}, "
               f"steps={steps}, "
               f"lowest_y={lowest_y}, "
               f"diamond_zone={entered_diamond}")
     
+    print(f"\nEvaluating for {args.episodes} episodes...")
+    print()
+    
+    if len(ports) > 1:
+        # Several bots: episodes finish out of order, collect until enough
+        print(f"Bots: {args.host} ports {ports}")
+        env = TerraScoutVecEnv(args.host, ports, **env_kwargs)
+        obs = env.reset()
+        running_rewards = np.zeros(env.num_envs)
+        running_steps = np.zeros(env.num_envs, dtype=np.int64)
+        
+        while len(episode_rewards) < args.episodes:
+            actions, _ = model.predict(obs, deterministic=args.deterministic)
+            obs, rewards, dones, infos = env.step(actions)
+            running_rewards += rewards
+            running_steps += 1
+            
+            for i in np.flatnonzero(dones):
+                if len(episode_rewards) < args.episodes:
+                    record_episode(running_rewards[i], running_steps[i], infos[i])
+                running_rewards[i] = 0
+                running_steps[i] = 0
+        
+        env.close()
+    else:
+        env = TerraScoutEnv(host=args.host, port=ports[0], **env_kwargs)
+        
+        for ep in range(args.episodes):
+            obs, info = env.reset()
+            episode_reward = 0
+            steps = 0
+            done = False
+            
+            while not done and steps < args.max_steps:
+                action, _ = model.predict(obs, deterministic=args.deterministic)
+                obs, reward, terminated, truncated, info = env.step(action)
+                episode_reward += reward
+                steps += 1
+                done = terminated or truncated
+                
+                if args.verbose and steps % 100 == 0:
+                    stats = info.get('episode_stats', {})
+                    print(f"  Step {steps}: y={stats.get('lowest_y', 'N/A')}, reward={episode_reward:.2f}")
+            
+            record_episode(episode_reward, steps, info)
+        
+        env.close()
+    
     # Print summary
     print()
     print("=" * 60)
@@ -122,8 +159,6 @@ def main():
     print(f"  Diamonds Found: {diamonds_found}/{args.episodes}")
     print()
     
-    env.close()
-
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
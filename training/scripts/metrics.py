@@ -4,24 +4,134 @@ Terra Scout Metrics Tracker
 Track and visualize training performance
 """
 
+import argparse
+import heapq
 import json
 import os
+import sys
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
+PathLike = Union[str, Path]
+
+# Windowed per-episode values kept in ring buffers
+WINDOW_FIELDS = ("reward", "length", "lowest_y", "diamond_zone", "diamond_found")
+
+
+class RollingMetrics:
+    """
+    Episode aggregates updated in O(1) per episode.
+    
+    The last `window` episodes live in fixed-size ring buffers with
+    running sums, so the windowed means never rescan history; run totals
+    and extremes are plain scalars.
+    """
+    
+    def __init__(self, window: int = 100):
+        self.window = window
+        self.buffers = {name: np.zeros(window, dtype=np.float64) for name in WINDOW_FIELDS}
+        self.sums = dict.fromkeys(WINDOW_FIELDS, 0.0)
+        self.count = 0
+        self.total_diamonds = 0
+        self.total_ores = 0
+        self.best_reward = -np.inf
+        self.deepest_y = np.inf
+    
+    def update(self, record: Dict[str, Any]):
+        """Add one episode record (the fields of MetricsTracker.log_episode)."""
+        values = {
+            "reward": float(record["reward"]),
+            "length": float(record["length"]),
+            "lowest_y": float(record["lowest_y"]),
+            "diamond_zone": float(bool(record["diamond_zone"])),
+            "diamond_found": float(record["diamonds_found"] > 0),
+        }
+        slot = self.count % self.window
+        for name, value in values.items():
+            buffer = self.buffers[name]
+            self.sums[name] += value - buffer[slot]
+            buffer[slot] = value
+        self.count += 1
+        if self.count % self.window == 0:
+            # Re-add once per window so float error cannot accumulate
+            self.sums = {name: float(buffer.sum()) for name, buffer in self.buffers.items()}
+        
+        self.total_diamonds += int(record["diamonds_found"])
+        self.total_ores += int(record["ores_mined"])
+        self.best_reward = max(self.best_reward, values["reward"])
+        self.deepest_y = min(self.deepest_y, values["lowest_y"])
+    
+    def _window_sums(self, last_n: int) -> Tuple[Dict[str, float], int]:
+        n = min(last_n, self.count, self.window)
+        if n == min(self.count, self.window):
+            return self.sums, n
+        # Shorter window than the buffers: sum the newest n slots
+        slots = (self.count - 1 - np.arange(n)) % self.window
+        return {name: float(buffer[slots].sum()) for name, buffer in self.buffers.items()}, n
+    
+    def summary(self, last_n: Optional[int] = None) -> Dict[str, Any]:
+        """Summary statistics; averages over the last min(last_n, window) episodes."""
+        if not self.count:
+            return {}
+        sums, n = self._window_sums(last_n or self.window)
+        return {
+            "total_episodes": self.count,
+            "avg_reward": sums["reward"] / n,
+            "avg_length": sums["length"] / n,
+            "avg_lowest_y": sums["lowest_y"] / n,
+            "diamond_zone_rate": sums["diamond_zone"] / n,
+            "diamond_found_rate": sums["diamond_found"] / n,
+            "total_diamonds": self.total_diamonds,
+            "total_ores": self.total_ores,
+            "best_reward": float(self.best_reward),
+            "deepest_y": float(self.deepest_y),
+        }
+
 
 class MetricsTracker:
-    """Track training metrics over time."""
+    """
+    Track training metrics over time.
+    
+    Every episode is appended as one JSON line to
+    save_dir/metrics_<run_id>.jsonl and flushed at once, with an fsync at
+    most every fsync_interval seconds, so a crash loses at most the last
+    unsynced lines. Summaries come from RollingMetrics, so memory and
+    per-episode cost stay constant however long training runs. Passing
+    an existing run_id appends to that run's file (resume).
+    """
     
-    def __init__(self, save_dir: str = "training/logs/metrics"):
+    def __init__(
+        self,
+        save_dir: str = "training/logs/metrics",
+        run_id: Optional[str] = None,
+        window: int = 100,
+        fsync_interval: float = 5.0,
+    ):
         self.save_dir = Path(save_dir)
         self.save_dir.mkdir(parents=True, exist_ok=True)
         
-        self.episode_data: List[Dict[str, Any]] = []
-        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.rolling = RollingMetrics(window)
+        self.path = self.save_dir / f"metrics_{self.run_id}.jsonl"
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._last_sync = time.monotonic()
+        if self.path.exists():
+            self.load(self.path)
+    
+    def _open(self):
+        if self._file is None or self._file.closed:
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self._file.tell():
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._file.write("\n")  # Terminate a line torn by a crash
+        return self._file
         
     def log_episode(
         self,
@@ -37,7 +147,7 @@ class MetricsTracker:
     ):
         """Log a single episode."""
         # Ensure all numeric values are native Python types (not numpy)
-        self.episode_data.append({
+        record = {
             "episode": int(episode),
             "reward": float(reward),
             "length": int(length),
@@ -48,28 +158,43 @@ class MetricsTracker:
             "strategy": str(strategy),
             "in_cave": bool(in_cave),
             "timestamp": datetime.now().isoformat(),
-        })
+        }
+        self.rolling.update(record)
+        
+        f = self._open()
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        f.flush()
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+    
+    def sync(self):
+        """Flush and fsync the episode log."""
+        if self._file is not None and not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+    
+    def tell(self) -> int:
+        """Size in bytes of the episode log so far (a resume point for rewind)."""
+        if self._file is not None and not self._file.closed:
+            self._file.flush()
+        return self.path.stat().st_size if self.path.exists() else 0
+    
+    def rewind(self, offset: int):
+        """
+        Drop the episodes logged after byte offset (from tell()) and
+        rebuild the aggregates, e.g. when resuming from a checkpoint.
+        """
+        self.close()
+        if self.path.exists():
+            if self.path.stat().st_size > offset:
+                with open(self.path, "r+b") as f:
+                    f.truncate(offset)
+            self.load(self.path)
     
     def get_summary(self, last_n: int = 100) -> Dict[str, Any]:
         """Get summary statistics."""
-        if not self.episode_data:
-            return {}
-        
-        recent = self.episode_data[-last_n:]
-        
-        # Convert numpy types to native Python types for JSON serialization
-        return {
-            "total_episodes": len(self.episode_data),
-            "avg_reward": float(np.mean([e["reward"] for e in recent])),
-            "avg_length": float(np.mean([e["length"] for e in recent])),
-            "avg_lowest_y": float(np.mean([float(e["lowest_y"]) for e in recent])),
-            "diamond_zone_rate": float(sum(1 for e in recent if e["diamond_zone"]) / len(recent)),
-            "diamond_found_rate": float(sum(1 for e in recent if e["diamonds_found"] > 0) / len(recent)),
-            "total_diamonds": int(sum(e["diamonds_found"] for e in self.episode_data)),
-            "total_ores": int(sum(e["ores_mined"] for e in self.episode_data)),
-            "best_reward": float(max(e["reward"] for e in self.episode_data)),
-            "deepest_y": float(min(float(e["lowest_y"]) for e in self.episode_data)),
-        }
+        return self.rolling.summary(last_n)
     
     def print_summary(self, last_n: int = 100):
         """Print summary to console."""
@@ -88,40 +213,165 @@ class MetricsTracker:
         print("=" * 50 + "\n")
     
     def save(self):
-        """Save metrics to file."""
-        filepath = self.save_dir / f"metrics_{self.run_id}.json"
-        with open(filepath, "w") as f:
-            json.dump({
-                "run_id": self.run_id,
-                "summary": self.get_summary(),
-                "episodes": self.episode_data,
-            }, f, indent=2)
-        print(f"Metrics saved to {filepath}")
-    
-    def load(self, filepath: str):
-        """Load metrics from file."""
-        with open(filepath, "r") as f:
-            data = json.load(f)
-        self.episode_data = data.get("episodes", [])
-        self.run_id = data.get("run_id", self.run_id)
+        """Sync the episode log and write the run summary next to it."""
+        self.sync()
+        filepath = self.save_dir / f"metrics_{self.run_id}_summary.json"
+        tmp = filepath.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "run_id": self.run_id,
+            "episodes_file": self.path.name,
+            "summary": self.get_summary(),
+        }, indent=2))
+        os.replace(tmp, filepath)
+        print(f"Metrics saved to {self.path}")
+    
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+    
+    def load(self, filepath: PathLike):
+        """Rebuild the aggregates from an episode log (or a legacy metrics JSON)."""
+        filepath = Path(filepath)
+        self.rolling = RollingMetrics(self.rolling.window)
+        if filepath.suffix == ".json":
+            with open(filepath, "r") as f:
+                data = json.load(f)
+            records = data.get("episodes", [])
+            self.run_id = data.get("run_id", self.run_id)
+        else:
+            records = read_records(filepath)
+        for record in records:
+            self.rolling.update(record)
+
+
+def read_records(path: PathLike) -> Iterator[Dict[str, Any]]:
+    """Complete episode records of one JSONL file (a torn last line is skipped)."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Line torn by a crash, terminated when the log was reopened
+
+
+class MetricsReader:
+    """
+    Read the episode logs of one or more runs.
+    
+    paths are metrics_*.jsonl files or directories holding them; runs may
+    still be writing. records() merges all files in timestamp order,
+    tail() follows them (and runs started later) as they grow, and
+    summaries() aggregates each run.
+    """
+    
+    def __init__(self, paths: Union[PathLike, Sequence[PathLike]] = "training/logs/metrics"):
+        self.paths = [Path(p) for p in ([paths] if isinstance(paths, (str, Path)) else paths)]
+    
+    def files(self) -> List[Path]:
+        files = set()
+        for path in self.paths:
+            files.update(path.glob("metrics_*.jsonl") if path.is_dir() else [path])
+        return sorted(files)
+    
+    @staticmethod
+    def run_id(path: Path) -> str:
+        return path.stem[len("metrics_"):]
+    
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """All episodes of all runs in timestamp order, tagged with run_id."""
+        def tagged(path: Path):
+            run_id = self.run_id(path)
+            for record in read_records(path):
+                record["run_id"] = run_id
+                yield record
+        
+        return heapq.merge(*(tagged(path) for path in self.files()), key=lambda r: r["timestamp"])
+    
+    def tail(self, from_start: bool = False, poll_interval: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield episodes as they are appended, forever. Existing lines are
+        skipped unless from_start; new files are picked up on each poll.
+        """
+        offsets: Dict[Path, int] = {}
+        partial: Dict[Path, bytes] = {}
+        first = True
+        while True:
+            found = False
+            for path in self.files():
+                if path not in offsets:
+                    offsets[path] = 0 if (from_start or not first) else path.stat().st_size
+                    partial[path] = b""
+                with open(path, "rb") as f:
+                    f.seek(offsets[path])
+                    data = f.read()
+                    offsets[path] = f.tell()
+                if not data:
+                    continue
+                lines = (partial[path] + data).split(b"\n")
+                partial[path] = lines.pop()  # Unterminated line still being written
+                for line in lines:
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Line torn by a crash, as in read_records
+                    found = True
+                    yield {**record, "run_id": self.run_id(path)}
+            first = False
+            if not found:
+                time.sleep(poll_interval)
+    
+    def summaries(self, window: int = 100) -> Dict[str, Dict[str, Any]]:
+        """Summary per run, plus "all" over the merged runs (windowed by time order)."""
+        rolling = {self.run_id(path): RollingMetrics(window) for path in self.files()}
+        merged = RollingMetrics(window)
+        for record in self.records():
+            rolling[record["run_id"]].update(record)
+            merged.update(record)
+        summaries = {run_id: metrics.summary() for run_id, metrics in rolling.items()}
+        if len(rolling) > 1:
+            summaries["all"] = merged.summary()
+        return summaries
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Summarize or follow Terra Scout training metrics")
+    parser.add_argument("paths", nargs="*", default=["training/logs/metrics"],
+                        help="metrics_*.jsonl files or directories")
+    parser.add_argument("--window", type=int, default=100, help="Episodes in the rolling averages")
+    parser.add_argument("--follow", action="store_true", help="Print new episodes as they are logged")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    reader = MetricsReader(args.paths)
+    if not reader.files():
+        print("No metrics files found")
+        return 1
+    
+    for run_id, summary in reader.summaries(args.window).items():
+        print(f"{run_id}: {summary.get('total_episodes', 0)} episodes, "
+              f"avg reward {summary.get('avg_reward', 0):.2f}, "
+              f"diamond zone {summary.get('diamond_zone_rate', 0) * 100:.1f}%, "
+              f"diamonds {summary.get('total_diamonds', 0)}, "
+              f"best {summary.get('best_reward', 0):.2f}")
+    
+    if args.follow:
+        try:
+            for record in reader.tail():
+                print(f"  [{record['run_id']}] episode {record['episode']}: "
+                      f"reward={record['reward']:.2f}, len={record['length']}, "
+                      f"y={record['lowest_y']}, diamonds={record['diamonds_found']}")
+        except KeyboardInterrupt:
+            pass
+    return 0
 
 
 if __name__ == "__main__":
-    # Test metrics tracker
-    tracker = MetricsTracker()
-    
-    for i in range(10):
-        tracker.log_episode(
-            episode=i,
-            reward=np.random.uniform(100, 500),
-            length=300,
-            lowest_y=np.random.uniform(-63, -50),
-            diamond_zone=True,
-            diamonds_found=1 if np.random.random() > 0.8 else 0,
-            ores_mined=np.random.randint(5, 20),
-            strategy="strip_mine",
-            in_cave=np.random.random() > 0.5,
-        )
-    
-    tracker.print_summary()
-    tracker.save()
\ No newline at end of file
+    sys.exit(main())
+    
\ No newline at end of file
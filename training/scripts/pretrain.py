@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Terra Scout Behaviour Cloning
+Warm-start the PPO policy from recorded trajectories
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from agent.src.environment import TrajectoryReader
+
+PathLike = Union[str, Path]
+
+
+class TrajectoryActionDataset(IterableDataset):
+    """
+    (observation, action) batches streamed from recorded trajectories.
+    
+    The label of an observation is the action executed next in the same
+    episode: the recorded taken_action (smart action overrides included)
+    or, with labels="policy", the action the policy chose. Chunks are
+    split between DataLoader workers and visited in a new random order
+    every epoch; samples are shuffled within a buffer of at most
+    shuffle_buffer rows per worker, so memory stays bounded however
+    large the dataset is.
+    """
+    
+    def __init__(
+        self,
+        paths: Union[PathLike, Sequence[PathLike]],
+        batch_size: int = 256,
+        shuffle_buffer: int = 65536,
+        labels: str = "taken",
+        seed: int = 0,
+    ):
+        if labels not in ("taken", "policy"):
+            raise ValueError(f"Unknown labels {labels!r}, expected 'taken' or 'policy'")
+        paths = [paths] if isinstance(paths, (str, Path)) else list(paths)
+        runs = [run for path in paths for run in TrajectoryReader.find(path)]
+        if not runs:
+            raise FileNotFoundError(f"No trajectory recordings under {paths}")
+        self.chunks: List[Tuple[str, int]] = [
+            (str(run), index) for run in runs for index in range(len(TrajectoryReader(run)))
+        ]
+        self.num_steps = sum(TrajectoryReader(run).num_steps for run in runs)
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.label_column = "taken_action" if labels == "taken" else "action"
+        self.seed = seed
+        self.epoch = 0
+    
+    def set_epoch(self, epoch: int):
+        """Reshuffle chunk order and samples for the next pass."""
+        self.epoch = epoch
+    
+    def _pairs(self, run: str, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Observations of one chunk paired with the action taken after each."""
+        reader = TrajectoryReader(run)
+        chunk = reader.chunk(index)
+        obs = np.asarray(chunk["obs"])
+        actions = np.asarray(chunk[self.label_column], dtype=np.int64)
+        steps = np.asarray(chunk["step"])
+        
+        # Row t holds the action of step t and the observation after it,
+        # so the input of label t is the observation of row t-1
+        prev_obs = np.empty_like(obs)
+        prev_obs[1:] = obs[:-1]
+        if len(obs) and steps[0] > 0 and index > 0:
+            prev_obs[0] = reader.chunk(index - 1)["obs"][-1]
+        keep = (steps > 0) & (actions >= 0)
+        if len(obs) and steps[0] > 0 and index == 0:
+            keep[0] = False
+        return prev_obs[keep], actions[keep]
+    
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        worker = get_worker_info()
+        worker_id, num_workers = (worker.id, worker.num_workers) if worker else (0, 1)
+        rng = np.random.default_rng((self.seed, self.epoch, worker_id))
+        chunks = self.chunks[worker_id::num_workers]
+        order = rng.permutation(len(chunks))
+        
+        buffer_obs: List[np.ndarray] = []
+        buffer_actions: List[np.ndarray] = []
+        size = 0
+        for i in order:
+            obs, actions = self._pairs(*chunks[i])
+            buffer_obs.append(obs)
+            buffer_actions.append(actions)
+            size += len(actions)
+            if size >= self.shuffle_buffer:
+                obs, actions = np.concatenate(buffer_obs), np.concatenate(buffer_actions)
+                keep = yield from self._emit(rng, obs, actions, final=False)
+                buffer_obs, buffer_actions, size = [keep[0]], [keep[1]], len(keep[1])
+        if size:
+            yield from self._emit(rng, np.concatenate(buffer_obs), np.concatenate(buffer_actions), final=True)
+    
+    def _emit(self, rng: np.random.Generator, obs: np.ndarray, actions: np.ndarray, final: bool):
+        """Yield shuffled full batches; return the leftover rows (yielded too when final)."""
+        perm = rng.permutation(len(actions))
+        obs, actions = obs[perm], actions[perm]
+        full = len(actions) if final else len(actions) - len(actions) % self.batch_size
+        for start in range(0, full, self.batch_size):
+            yield torch.from_numpy(obs[start:start + self.batch_size]), torch.from_numpy(actions[start:start + self.batch_size])
+        return obs[full:], actions[full:]
+
+
+def make_loader(
+    paths: Union[PathLike, Sequence[PathLike]],
+    batch_size: int = 256,
+    num_workers: int = 2,
+    prefetch_factor: int = 4,
+    shuffle_buffer: int = 65536,
+    labels: str = "taken",
+    seed: int = 0,
+) -> DataLoader:
+    """DataLoader over a TrajectoryActionDataset; workers read and shuffle ahead of training."""
+    dataset = TrajectoryActionDataset(paths, batch_size, shuffle_buffer, labels, seed)
+    return DataLoader(
+        dataset,
+        batch_size=None,  # The dataset yields whole batches
+        num_workers=num_workers,
+        prefetch_factor=prefetch_factor if num_workers else None,
+        pin_memory=torch.cuda.is_available(),
+    )
+
+
+def pretrain_policy(
+    policy,
+    loader: DataLoader,
+    epochs: int = 3,
+    learning_rate: float = 1e-3,
+    ent_coef: float = 0.0,
+    log_interval: int = 200,
+) -> List[dict]:
+    """
+    Behaviour cloning: maximize the log-likelihood of the recorded actions
+    under an SB3 ActorCriticPolicy (shared and policy layers; the value
+    head is left to PPO). Uses its own Adam optimizer, so the policy's
+    PPO optimizer state is untouched. Returns per-epoch loss/accuracy.
+    """
+    optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate)
+    dataset = loader.dataset
+    history = []
+    policy.set_training_mode(True)
+    for epoch in range(epochs):
+        if hasattr(dataset, "set_epoch"):
+            dataset.set_epoch(epoch)  # type: ignore
+        start = time.perf_counter()
+        total_loss = total_correct = samples = 0.0
+        for batch, (obs, actions) in enumerate(loader, 1):
+            obs = obs.to(policy.device, non_blocking=True)
+            actions = actions.to(policy.device, non_blocking=True)
+            
+            distribution = policy.get_distribution(obs)
+            log_prob = distribution.log_prob(actions)
+            loss = -log_prob.mean() - ent_coef * distribution.entropy().mean()
+            
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            
+            with torch.no_grad():
+                correct = (distribution.distribution.probs.argmax(dim=1) == actions).sum().item()
+            total_loss += loss.item() * len(actions)
+            total_correct += correct
+            samples += len(actions)
+            if log_interval and batch % log_interval == 0:
+                print(f"    epoch {epoch + 1} batch {batch}: loss {total_loss / samples:.4f}, "
+                      f"accuracy {total_correct / samples:.3f}")
+        
+        elapsed = time.perf_counter() - start
+        stats = {
+            "epoch": epoch + 1,
+            "loss": total_loss / max(samples, 1),
+            "accuracy": total_correct / max(samples, 1),
+            "samples": int(samples),
+            "samples_per_s": samples / max(elapsed, 1e-9),
+        }
+        history.append(stats)
+        print(f"    BC epoch {stats['epoch']}/{epochs}: loss {stats['loss']:.4f}, "
+              f"accuracy {stats['accuracy']:.3f}, {stats['samples']:,} samples ({stats['samples_per_s']:,.0f}/s)")
+    policy.set_training_mode(False)
+    return history
+
+
+def parse_args():
+    from training.scripts.train import add_model_args
+    
+    parser = argparse.ArgumentParser(description="Behaviour-clone the Terra Scout policy from recordings")
+    parser.add_argument("recordings", nargs="+", help="Recording run directories (searched recursively)")
+    parser.add_argument("--epochs", type=int, default=3, help="Passes over the recordings")
+    parser.add_argument("--bc-batch-size", type=int, default=256, help="Behaviour cloning batch size")
+    parser.add_argument("--bc-learning-rate", type=float, default=1e-3, help="Behaviour cloning learning rate")
+    parser.add_argument("--labels", choices=["taken", "policy"], default="taken",
+                        help="taken: executed actions incl. smart overrides; policy: the policy's own choices")
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader worker processes")
+    parser.add_argument("--shuffle-buffer", type=int, default=65536, help="Rows shuffled together per worker")
+    parser.add_argument("--save-path", type=str, default="training/checkpoints", help="Checkpoint directory")
+    add_model_args(parser)
+    return parser.parse_args()
+
+
+def main():
+    from agent.src.environment import TerraScoutReplayEnv
+    from training.scripts.train import create_model
+    
+    args = parse_args()
+    
+    print("=" * 60)
+    print("Terra Scout Behaviour Cloning")
+    print("=" * 60)
+    
+    loader = make_loader(
+        args.recordings, args.bc_batch_size, args.workers,
+        shuffle_buffer=args.shuffle_buffer, labels=args.labels, seed=args.seed,
+    )
+    print(f"Recordings: {len(loader.dataset.chunks)} chunks, {loader.dataset.num_steps:,} steps")  # type: ignore
+    
+    # The replay env supplies the spaces; PPO never steps it here
+    env = TerraScoutReplayEnv(args.recordings)
+    model = create_model(args, env)
+    pretrain_policy(model.policy, loader, args.epochs, args.bc_learning_rate)
+    
+    os.makedirs(args.save_path, exist_ok=True)
+    path = os.path.join(args.save_path, f"terra_scout_bc_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    model.save(path)
+    env.close()
+    print(f"\nSaved {path}.zip (continue with: train.py --resume {path}.zip)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Terra Scout Reward Recomputation
+Re-score recorded trajectories with a candidate reward config
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import yaml
+
+from agent.src.bridge.rewards import RewardCalculator
+from agent.src.environment import TrajectoryReader
+from agent.src.environment.recorder import DECODE_ROWS, check_replayable
+
+# Row range of whole episodes of one run, recomputed by one worker
+Task = Dict[str, Any]
+
+
+def load_rewards(path: str, overrides: List[str]) -> Dict[str, float]:
+    """Reward weights from a YAML/JSON file (optionally under "rewards") and KEY=VALUE overrides."""
+    rewards: Dict[str, float] = {}
+    if path:
+        config = yaml.safe_load(Path(path).read_text()) or {}
+        rewards.update(config.get("rewards", config))
+    for override in overrides:
+        key, _, value = override.partition("=")
+        rewards[key.strip()] = float(value)
+    RewardCalculator(rewards)  # Validates the keys
+    return {key: float(value) for key, value in rewards.items()}
+
+
+def plan_tasks(runs: List[Path], part_steps: int) -> List[Task]:
+    """Split every run into parts of whole episodes with about part_steps rows each."""
+    tasks: List[Task] = []
+    for run in runs:
+        reader = TrajectoryReader(run)
+        check_replayable(reader.metadata, run)
+        offsets = np.concatenate([[0], np.cumsum([c["steps"] for c in reader.manifest["chunks"]])])
+        episodes: List[List[Tuple[int, int, int]]] = []
+        rows = 0
+        current = None
+        for episode, chunk, start, stop in reader.episode_segments():
+            if episode != current:
+                if rows >= part_steps:
+                    tasks.append(_task(run, offsets, episodes))
+                    episodes, rows = [], 0
+                episodes.append([])
+                current = episode
+            episodes[-1].append((chunk, start, stop))
+            rows += stop - start
+        if episodes:
+            tasks.append(_task(run, offsets, episodes))
+    for index, task in enumerate(tasks):
+        task["part"] = f"part_{index:05d}"
+    return tasks
+
+
+def _task(run: Path, offsets: np.ndarray, episodes: List[List[Tuple[int, int, int]]]) -> Task:
+    first, last = episodes[0][0], episodes[-1][-1]
+    return {
+        "run": str(run),
+        "rows": [int(offsets[first[0]] + first[1]), int(offsets[last[0]] + last[2])],
+        "episodes": episodes,
+    }
+
+
+def _component_stats(breakdown: np.ndarray, keys: List[str]) -> Dict[str, Dict[str, float]]:
+    """Per-component step count, sum, min and max of a (steps, K) breakdown (NaN = absent)."""
+    stats = {}
+    for i, key in enumerate(keys):
+        values = breakdown[:, i]
+        values = values[~np.isnan(values)]
+        if len(values):
+            stats[key] = {
+                "steps": int(len(values)),
+                "sum": float(values.sum()),
+                "min": float(values.min()),
+                "max": float(values.max()),
+            }
+    return stats
+
+
+def recompute_part(task: Task, rewards: Dict[str, float], output: str) -> Dict[str, Any]:
+    """
+    Recompute rewards of one task's episodes and write its columns to
+    output/<part>. Returns summary statistics of candidate and recorded
+    rewards for the parent to merge.
+    """
+    reader = TrajectoryReader(task["run"])
+    calculator = RewardCalculator(rewards)
+    chunks = {}
+    reward_rows: List[float] = []
+    breakdown_rows: List[Dict[str, float]] = []
+    recorded_rewards: List[np.ndarray] = []
+    recorded_breakdowns: List[Tuple[np.ndarray, List[str]]] = []
+    episode_rows: List[int] = []
+    episode_returns = []
+    
+    for number, episode in enumerate(task["episodes"]):
+        calculator.reset()
+        prev_obs = None
+        total = 0.0
+        first = True
+        for index, start, stop in episode:
+            chunk = chunks.get(index)
+            if chunk is None:
+                chunk = chunks[index] = reader.chunk(index)
+            recorded_rewards.append(np.asarray(chunk["reward"][start:stop]))
+            recorded_breakdowns.append((np.asarray(chunk["breakdown"][start:stop]), chunk.breakdown_keys))
+            raw_rows = (
+                raw_obs
+                for window in range(start, stop, DECODE_ROWS)
+                for raw_obs in chunk.raw_observations(window, min(window + DECODE_ROWS, stop))
+            )
+            for raw_obs in raw_rows:
+                if first:
+                    # Reset row: nothing to score, it only seeds prev_obs
+                    reward, breakdown = 0.0, {}
+                    first = False
+                elif raw_obs is None:
+                    reward, breakdown = -1.0, {}  # Failed step, as TerraScoutEnv scores it
+                else:
+                    reward, breakdown = calculator.calculate(raw_obs, prev_obs)
+                if raw_obs is not None:
+                    prev_obs = raw_obs
+                reward_rows.append(reward)
+                breakdown_rows.append(breakdown)
+                episode_rows.append(number)
+                total += reward
+        episode_returns.append(total)
+    
+    keys = sorted({key for breakdown in breakdown_rows for key in breakdown})
+    column_of = {key: i for i, key in enumerate(keys)}
+    breakdown = np.full((len(breakdown_rows), len(keys)), np.nan, dtype=np.float64)
+    for row, components in enumerate(breakdown_rows):
+        for key, value in components.items():
+            breakdown[row, column_of[key]] = value
+    
+    part = Path(output) / task["part"]
+    part.mkdir(parents=True, exist_ok=True)
+    np.save(part / "reward.npy", np.asarray(reward_rows, dtype=np.float64))
+    np.save(part / "breakdown.npy", breakdown)
+    np.save(part / "episode.npy", np.asarray(episode_rows, dtype=np.int32))
+    (part / "meta.json").write_text(json.dumps({
+        "run": task["run"], "rows": task["rows"], "breakdown_keys": keys,
+    }, indent=2))
+    
+    # Recorded values of the same rows, per chunk layout
+    recorded = {}
+    for values, recorded_keys in recorded_breakdowns:
+        for key, stats in _component_stats(values, recorded_keys).items():
+            _merge(recorded, key, stats)
+    recorded_all = np.concatenate(recorded_rewards)
+    rows = np.asarray(episode_rows)
+    recorded_returns = np.bincount(rows, weights=recorded_all, minlength=len(task["episodes"]))
+    # VecEnv recordings hold float32 rewards, so unchanged weights can differ by ~1e-7
+    max_diff = float(np.abs(np.asarray(reward_rows) - recorded_all).max()) if reward_rows else 0.0
+    
+    return {
+        "part": task["part"],
+        "steps": len(reward_rows),
+        "candidate": _component_stats(breakdown, keys),
+        "recorded": recorded,
+        "candidate_returns": episode_returns,
+        "recorded_returns": recorded_returns.tolist(),
+        "max_diff": max_diff,
+    }
+
+
+def _merge(into: Dict[str, Dict[str, float]], key: str, stats: Dict[str, float]):
+    current = into.get(key)
+    if current is None:
+        into[key] = dict(stats)
+        return
+    current["steps"] += stats["steps"]
+    current["sum"] += stats["sum"]
+    current["min"] = min(current["min"], stats["min"])
+    current["max"] = max(current["max"], stats["max"])
+
+
+def print_report(summary: Dict[str, Any]):
+    episodes = max(summary["episodes"], 1)
+    steps = max(summary["steps"], 1)
+    recorded, candidate = summary["recorded"], summary["candidate"]
+    
+    print()
+    print(f"Episodes: {summary['episodes']}, steps: {summary['steps']}")
+    for name in ("recorded", "candidate"):
+        returns = np.asarray(summary[f"{name}_returns"])
+        if len(returns):
+            print(f"  {name:<10} return: mean {returns.mean():10.2f}  std {returns.std():9.2f}  "
+                  f"min {returns.min():10.2f}  max {returns.max():10.2f}")
+    print(f"  Largest per-step change from recorded reward: {summary['max_diff']:.4g}")
+    
+    print()
+    print(f"  {'component':<22} {'% steps':>8} {'recorded/ep':>12} {'candidate/ep':>13} {'change':>9}"
+          f" {'min':>9} {'max':>9}")
+    for key in sorted(set(recorded) | set(candidate), key=lambda k: -abs(candidate.get(k, {}).get("sum", 0))):
+        old = recorded.get(key, {}).get("sum", 0.0) / episodes
+        new = candidate.get(key, {"sum": 0.0})
+        change = f"{(new['sum'] / episodes - old) / abs(old):+.1%}" if old and np.isfinite(old) else "-"
+        share = 100.0 * new.get("steps", 0) / steps
+        low = f"{new['min']:9.3f}" if "min" in new else f"{'-':>9}"
+        high = f"{new['max']:9.3f}" if "max" in new else f"{'-':>9}"
+        print(f"  {key:<22} {share:8.2f} {old:12.3f} {new['sum'] / episodes:13.3f} {change:>9} {low} {high}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute rewards of recorded trajectories")
+    parser.add_argument("recordings", nargs="+", help="Recording run directories (searched recursively)")
+    parser.add_argument("--rewards", type=str, default=None, help="YAML/JSON file of RewardCalculator.REWARDS overrides")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Override one reward weight")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Output directory (default: training/logs/rewards/<timestamp>)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--part-steps", type=int, default=50000, help="Rows per work unit (whole episodes)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rewards = load_rewards(args.rewards, args.set)
+    runs = sorted({run for path in args.recordings for run in TrajectoryReader.find(path)})
+    if not runs:
+        print("No recordings found")
+        return 1
+    
+    output = Path(args.output or f"training/logs/rewards/{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    output.mkdir(parents=True, exist_ok=True)
+    try:
+        tasks = plan_tasks(runs, args.part_steps)
+    except ValueError as e:
+        print(e)
+        return 1
+    
+    print("=" * 60)
+    print("Terra Scout Reward Recomputation")
+    print("=" * 60)
+    print(f"Runs: {len(runs)}, parts: {len(tasks)}, workers: {args.workers}")
+    print(f"Reward overrides: {rewards or 'none'}")
+    
+    summary: Dict[str, Any] = {
+        "episodes": 0, "steps": 0, "max_diff": 0.0, "recorded": {}, "candidate": {},
+        "recorded_returns": [], "candidate_returns": [],
+    }
+    parts = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(recompute_part, task, rewards, str(output)) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            parts[result["part"]] = result
+            summary["steps"] += result["steps"]
+            summary["episodes"] += len(result["candidate_returns"])
+            summary["max_diff"] = max(summary["max_diff"], result["max_diff"])
+            for name in ("recorded", "candidate"):
+                for key, stats in result[name].items():
+                    _merge(summary[name], key, stats)
+            elapsed = time.perf_counter() - start
+            print(f"  [{done}/{len(tasks)}] {summary['steps']:,} steps, {summary['steps'] / elapsed:,.0f} steps/s")
+    
+    # Episode order follows the part order
+    for task in tasks:
+        for name in ("recorded_returns", "candidate_returns"):
+            summary[name].extend(parts[task["part"]][name])
+    
+    (output / "results.json").write_text(json.dumps({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "rewards": {**RewardCalculator.REWARDS, **rewards},
+        "overrides": rewards,
+        "parts": [{"part": t["part"], "run": t["run"], "rows": t["rows"]} for t in tasks],
+        "summary": summary,
+    }, indent=2))
+    
+    print_report(summary)
+    print(f"\nResults: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,94 +13,212 @@ from pathlib import Path
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from training.scripts.checkpoints import (
+    AsyncCheckpointCallback,
+    CheckpointManager,
+    latest_checkpoint,
+    load_training_state,
+)
 from training.scripts.metrics import MetricsTracker
+from training.scripts.pretrain import make_loader, pretrain_policy
 
 import numpy as np
 import torch
 from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import (
     BaseCallback,
-    CheckpointCallback,
     EvalCallback,
 )
 from stable_baselines3.common.logger import configure
 from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import VecMonitor
 
 from agent.src.bridge.environment import TerraScoutEnv
+from agent.src.environment import (
+    TerraScoutSimVecEnv,
+    TerraScoutVecEnv,
+    TrajectoryRecorder,
+    VecTrajectoryRecorder,
+)
 
 
 class TerraScoutCallback(BaseCallback):
-    """Custom callback with metrics tracking."""
+    """
+    Custom callback with metrics tracking.
+    
+    Tracks every env of the (vectorized) training env in preallocated
+    arrays; per step it only adds the rewards and checks dones. Finished
+    episodes are queued and handed to the MetricsTracker, printed and
+    recorded to TensorBoard once per rollout.
+    """
     
-    def __init__(self, verbose=0, log_freq=10, metrics_tracker=None):
+    def __init__(self, verbose=0, log_freq=10, metrics_tracker=None, log_timings=True):
         super().__init__(verbose)
         self.log_freq = log_freq
-        self.episode_rewards = []
-        self.episode_lengths = []
-        self.episode_stats = []
-        self.current_episode_reward = 0
-        self.current_episode_length = 0
+        self.log_timings = log_timings
+        self.episodes = 0
+        self.current_episode_rewards = np.zeros(1)
+        self.current_episode_lengths = np.zeros(1, dtype=np.int64)
+        self.pending_episodes = []
+        self._last_printed = 0
         self.metrics = metrics_tracker or MetricsTracker()
         
+    def _init_callback(self) -> None:
+        # One running episode per env of the (vectorized) training env
+        num_envs = self.training_env.num_envs
+        self.current_episode_rewards = np.zeros(num_envs)
+        self.current_episode_lengths = np.zeros(num_envs, dtype=np.int64)
+    
     def _on_step(self) -> bool:
-        self.current_episode_reward += self.locals.get('rewards', [0])[0]
-        self.current_episode_length += 1
+        self.current_episode_rewards += self.locals["rewards"]
+        self.current_episode_lengths += 1
         
-        dones = self.locals.get('dones', [False])
-        infos = self.locals.get('infos', [{}])
+        dones = self.locals["dones"]
+        if not dones.any():
+            return True
         
-        if dones[0]:
-            self.episode_rewards.append(self.current_episode_reward)
-            self.episode_lengths.append(self.current_episode_length)
-            
-            stats = infos[0].get('episode_stats', {})
-            self.episode_stats.append(stats)
-            
-            # Log to metrics tracker
-            ep_num = len(self.episode_rewards)
+        infos = self.locals["infos"]
+        for i in np.flatnonzero(dones):
+            self.pending_episodes.append((
+                float(self.current_episode_rewards[i]),
+                int(self.current_episode_lengths[i]),
+                infos[i],
+            ))
+        self.current_episode_rewards[dones] = 0
+        self.current_episode_lengths[dones] = 0
+        return True
+    
+    def _flush_episodes(self):
+        """Log queued episodes to the metrics tracker, console and TensorBoard."""
+        if not self.pending_episodes:
+            return
+        
+        for episode_reward, episode_length, info in self.pending_episodes:
+            self.episodes += 1
+            stats = info.get('episode_stats', {})
             self.metrics.log_episode(
-                episode=ep_num,
-                reward=self.current_episode_reward,
-                length=self.current_episode_length,
+                episode=self.episodes,
+                reward=episode_reward,
+                length=episode_length,
                 lowest_y=stats.get('lowest_y', 64),
                 diamond_zone=stats.get('entered_diamond_zone', False),
-                diamonds_found=1 if self.current_episode_reward > 500 else 0,
+                diamonds_found=info.get('diamonds_found', 0),
                 ores_mined=stats.get('ores_mined', 0),
-                strategy=infos[0].get('strategy', 'unknown'),
-                in_cave=infos[0].get('in_cave', False),
+                strategy=info.get('strategy', 'unknown'),
+                in_cave=info.get('in_cave', False),
             )
-            
-            if ep_num % self.log_freq == 0 or ep_num <= 10:
-                avg_reward = np.mean(self.episode_rewards[-100:])
-                lowest_y = stats.get('lowest_y', 'N/A')
-                diamond_zone = stats.get('entered_diamond_zone', False)
-                
-                print(f"  Episode {ep_num}: "
-                      f"reward={self.current_episode_reward:.2f}, "
-                      f"avg={avg_reward:.2f}, "
-                      f"len={self.current_episode_length}, "
-                      f"y={lowest_y}, "
-                      f"diamond_zone={diamond_zone}")
-            
-            self.current_episode_reward = 0
-            self.current_episode_length = 0
+        self.pending_episodes.clear()
         
-        return True
+        summary = self.metrics.get_summary()
+        self.logger.record("terra_scout/avg_lowest_y", summary["avg_lowest_y"])
+        self.logger.record("terra_scout/diamond_zone_rate", summary["diamond_zone_rate"])
+        self.logger.record("terra_scout/diamond_found_rate", summary["diamond_found_rate"])
+        self.logger.record("terra_scout/total_diamonds", summary["total_diamonds"])
+        
+        if self.verbose and (self.episodes - self._last_printed >= self.log_freq or self._last_printed == 0):
+            print(f"  Episodes {self._last_printed + 1}-{self.episodes}: "
+                  f"last reward={episode_reward:.2f}, "
+                  f"avg={summary['avg_reward']:.2f}, "
+                  f"avg len={summary['avg_length']:.0f}, "
+                  f"avg y={summary['avg_lowest_y']:.1f}, "
+                  f"diamond_zone={summary['diamond_zone_rate'] * 100:.0f}%, "
+                  f"diamonds={summary['total_diamonds']}")
+            self._last_printed = self.episodes
+    
+    def _on_rollout_end(self) -> None:
+        self._flush_episodes()
+        if self.log_timings:
+            self._log_timing_stats()
+    
+    def _log_timing_stats(self):
+        """Push per-phase step timings (averaged over envs) to TensorBoard."""
+        try:
+            env_stats = self.training_env.env_method("get_timing_stats")
+        except AttributeError:
+            self.log_timings = False  # Env has no timing surface
+            return
+        
+        env_stats = [stats for stats in env_stats if stats]
+        if not env_stats:
+            return
+        for phase in env_stats[0]:
+            for key in ("mean_ms", "p95_ms"):
+                value = np.mean([stats[phase][key] for stats in env_stats])
+                self.logger.record(f"timing/{phase}_{key}", value)
     
     def _on_training_end(self):
+        self._flush_episodes()
         self.metrics.print_summary()
         self.metrics.save()
+    
+    def flush(self):
+        """Log the queued episodes now and fsync the metrics log (before a checkpoint on interrupt)."""
+        self._flush_episodes()
+        self.metrics.sync()
 
-def parse_args():
-    parser = argparse.ArgumentParser(description="Train Terra Scout Agent")
+    def state_dict(self) -> dict:
+        """Counters and metrics position to resume from (see load_state_dict)."""
+        return {
+            "episodes": self.episodes,
+            "last_printed": self._last_printed,
+            "metrics_run_id": self.metrics.run_id,
+            "metrics_offset": self.metrics.tell(),
+        }
     
-    # Environment
-    parser.add_argument("--host", type=str, default="localhost", help="Bot API host")
-    parser.add_argument("--port", type=int, default=3000, help="Bot API port")
-    parser.add_argument("--max-steps", type=int, default=2000, help="Max steps per episode")
+    def load_state_dict(self, state: dict):
+        """Continue from state_dict(): later episodes in the metrics log are dropped."""
+        self.episodes = state["episodes"]
+        self._last_printed = state["last_printed"]
+        self.metrics.rewind(state["metrics_offset"])
     
-    # Training
-    parser.add_argument("--total-timesteps", type=int, default=100000, help="Total training timesteps")
+    def checkpoint_metric(self):
+        """Average episode reward, ranking checkpoints (None before any episode)."""
+        return self.metrics.get_summary().get("avg_reward")
+
+def bot_ports(args) -> list:
+    """Bot API ports from --ports, or --num-envs consecutive ports from --port."""
+    return args.ports or [args.port + i for i in range(args.num_envs)]
+
+
+def make_env(args):
+    """
+    One monitored TerraScoutEnv, a TerraScoutVecEnv for several bots, or a
+    TerraScoutSimVecEnv for the batched simulator. With --record, every
+    step is also written to trajectory files.
+    """
+    if args.backend == "batched":
+        print(f"    Batched simulator: {args.num_envs} worlds")
+        return VecMonitor(TerraScoutSimVecEnv(args.num_envs, seed=args.seed, max_steps=args.max_steps))
+    
+    ports = bot_ports(args)
+    env_kwargs = dict(
+        max_steps=args.max_steps,
+        use_enhanced_obs=True,
+        use_enhanced_rewards=True,
+        backend=args.backend,
+        block_format=args.block_format,
+        action_repeat=args.action_repeat,
+        pipeline=args.pipeline,
+        spawn_state=args.spawn_state,
+        prefetch_reset=args.prefetch_reset,
+    )
+    if len(ports) == 1:
+        env = TerraScoutEnv(host=args.host, port=ports[0], **env_kwargs)
+        if args.record:
+            print(f"    Recording trajectories to {args.record}")
+            env = TrajectoryRecorder(env, args.record)
+        return Monitor(env)
+    
+    print(f"    Bots: {args.host} ports {ports}")
+    venv = TerraScoutVecEnv(args.host, ports, **env_kwargs)
+    if args.record:
+        print(f"    Recording trajectories to {args.record}/env_*")
+        venv = VecTrajectoryRecorder(venv, args.record)
+    return VecMonitor(venv)
+
+
+def add_model_args(parser: argparse.ArgumentParser):
+    """PPO hyperparameters and device/seed options (shared with pretrain.py)."""
     parser.add_argument("--learning-rate", type=float, default=3e-4, help="Learning rate")
     parser.add_argument("--n-steps", type=int, default=2048, help="Steps per update")
     parser.add_argument("--batch-size", type=int, default=64, help="Batch size")
@@ -109,24 +227,85 @@ def parse_args():
     parser.add_argument("--gae-lambda", type=float, default=0.95, help="GAE lambda")
     parser.add_argument("--clip-range", type=float, default=0.2, help="PPO clip range")
     parser.add_argument("--ent-coef", type=float, default=0.01, help="Entropy coefficient")
+    parser.add_argument("--log-path", type=str, default="training/logs", help="Log directory")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--device", type=str, default="auto", help="Device (auto/cuda/cpu)")
+
+
+def create_model(args, env) -> PPO:
+    """New PPO model with the MlpPolicy and the hyperparameters of add_model_args."""
+    return PPO(
+        "MlpPolicy",
+        env,
+        learning_rate=args.learning_rate,
+        n_steps=args.n_steps,
+        batch_size=args.batch_size,
+        n_epochs=args.n_epochs,
+        gamma=args.gamma,
+        gae_lambda=args.gae_lambda,
+        clip_range=args.clip_range,
+        ent_coef=args.ent_coef,
+        verbose=0,
+        device=args.device,
+        seed=args.seed,
+        tensorboard_log=args.log_path,
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train Terra Scout Agent")
+    
+    # Environment
+    parser.add_argument("--host", type=str, default="localhost", help="Bot API host")
+    parser.add_argument("--port", type=int, default=3000, help="Bot API port")
+    parser.add_argument("--num-envs", type=int, default=1, help="Number of bots (ports port..port+N-1)")
+    parser.add_argument("--ports", type=int, nargs="+", default=None, help="Explicit bot API ports (overrides --num-envs)")
+    parser.add_argument("--max-steps", type=int, default=2000, help="Max steps per episode")
+    parser.add_argument("--backend", choices=["http", "binary", "websocket", "sim", "batched"], default="http",
+                        help="Bot connection (sim: in-process simulator, no Minecraft; "
+                             "batched: --num-envs simulated worlds stepped together)")
+    parser.add_argument("--block-format", choices=["list", "grid", "delta"], default="list",
+                        help="Block observation format")
+    parser.add_argument("--action-repeat", type=int, default=1,
+                        help="Bot actions per env step, sent in one request (rewards summed)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Let the bot run each action while the policy picks the next "
+                             "(observations lag the action by one step)")
+    parser.add_argument("--spawn-state", type=lambda s: int(s) if s.isdigit() else s, default=None,
+                        metavar="INDEX|random", help="Bot spawn state to reset to (default: world spawn)")
+    parser.add_argument("--prefetch-reset", action="store_true",
+                        help="Start each bot reset in the background as soon as its episode ends")
+    
+    # Training
+    parser.add_argument("--total-timesteps", type=int, default=100000, help="Total training timesteps")
+    add_model_args(parser)
+    parser.add_argument("--pretrain", type=str, nargs="+", default=None, metavar="RECORDING",
+                        help="Behaviour-clone the policy on recorded trajectories before PPO")
+    parser.add_argument("--pretrain-epochs", type=int, default=3, help="Behaviour cloning epochs")
     
     # Saving
     parser.add_argument("--save-freq", type=int, default=10000, help="Checkpoint save frequency")
     parser.add_argument("--save-path", type=str, default="training/checkpoints", help="Checkpoint directory")
-    parser.add_argument("--log-path", type=str, default="training/logs", help="Log directory")
+    parser.add_argument("--keep-last", type=int, default=3, help="Newest checkpoints to keep")
+    parser.add_argument("--keep-best", type=int, default=1, help="Best-reward checkpoints to keep")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Record raw/processed observations, actions and rewards to this directory")
     
     # Resume
-    parser.add_argument("--resume", type=str, default=None, help="Resume from checkpoint")
-    
-    # Misc
-    parser.add_argument("--seed", type=int, default=42, help="Random seed")
-    parser.add_argument("--device", type=str, default="auto", help="Device (auto/cuda/cpu)")
+    parser.add_argument("--resume", type=str, default=None,
+                        help="Resume from a checkpoint zip, or the newest checkpoint in a directory")
     
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
+    if args.record and args.backend == "batched":
+        sys.exit("--record needs bridge observations; use --backend sim instead of batched")
+    if args.action_repeat > 1 and args.backend == "batched":
+        sys.exit("--action-repeat needs a bridge backend; use --backend sim instead of batched")
+    if args.pipeline and (args.backend == "batched" or args.action_repeat > 1):
+        sys.exit("--pipeline needs a bridge backend and cannot be combined with --action-repeat")
     
     print("=" * 60)
     print("Terra Scout Training")
@@ -137,9 +316,14 @@ def main():
     os.makedirs(args.save_path, exist_ok=True)
     os.makedirs(args.log_path, exist_ok=True)
     
-    # Create experiment name
+    # Checkpoints made by this script carry the run's state; plain model
+    # zips (pretrain.py, final models) resume with fresh counters
+    resume_path = latest_checkpoint(args.resume) if args.resume else None
+    resume_state = load_training_state(resume_path) if resume_path else {}
+    
+    # Create experiment name (a resumed run keeps its own)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    exp_name = f"terra_scout_{timestamp}"
+    exp_name = resume_state.get("exp_name", f"terra_scout_{timestamp}")
     
     print(f"Experiment: {exp_name}")
     print(f"Device: {args.device}")
@@ -148,67 +332,82 @@ def main():
     
     # Create environment
     print("[1] Creating environment...")
-    env = TerraScoutEnv(
-        host=args.host,
-        port=args.port,
-        max_steps=args.max_steps,
-        use_enhanced_obs=True,
-        use_enhanced_rewards=True,
-    )
-    env = Monitor(env)
+    env = make_env(args)
     print(f"    Action space: {env.action_space}")
     print(f"    Observation space: {env.observation_space}")
     print()
     
     # Create or load model
-    if args.resume:
-        print(f"[2] Loading model from {args.resume}...")
-        model = PPO.load(args.resume, env=env, device=args.device)
+    if resume_path:
+        print(f"[2] Loading model from {resume_path}...")
+        model = PPO.load(resume_path, env=env, device=args.device)
+        print(f"    Resuming at {model.num_timesteps} timesteps")
     else:
         print("[2] Creating new PPO model...")
-        model = PPO(
-            "MlpPolicy",
-            env,
-            learning_rate=args.learning_rate,
-            n_steps=args.n_steps,
-            batch_size=args.batch_size,
-            n_epochs=args.n_epochs,
-            gamma=args.gamma,
-            gae_lambda=args.gae_lambda,
-            clip_range=args.clip_range,
-            ent_coef=args.ent_coef,
-            verbose=0,
-            device=args.device,
-            seed=args.seed,
-            tensorboard_log=args.log_path,
+        model = create_model(args, env)
+    
+    if args.pretrain:
+        print(f"    Behaviour cloning on {', '.join(args.pretrain)}...")
+        pretrain_policy(
+            model.policy,
+            make_loader(args.pretrain, batch_size=256, seed=args.seed),
+            epochs=args.pretrain_epochs,
         )
     
     print(f"    Model device: {model.device}")
     print()
     
     # Setup callbacks
-    callbacks = [
-        TerraScoutCallback(verbose=1, log_freq=10),
-        CheckpointCallback(
-            save_freq=args.save_freq,
-            save_path=args.save_path,
-            name_prefix=exp_name,
-        ),
-    ]
-    
-    # Train
+    metrics_callback = TerraScoutCallback(
+        verbose=1,
+        log_freq=10,
+        metrics_tracker=MetricsTracker(run_id=resume_state.get("callback", {}).get("metrics_run_id")),
+    )
+    if "callback" in resume_state:
+        metrics_callback.load_state_dict(resume_state["callback"])
+    checkpoints = CheckpointManager(
+        args.save_path,
+        name_prefix=exp_name,
+        keep_last=args.keep_last,
+        keep_best=args.keep_best,
+    )
+    checkpoint_callback = AsyncCheckpointCallback(
+        checkpoints,
+        save_freq=args.save_freq,
+        state_fn=lambda: {
+            "exp_name": exp_name,
+            "total_timesteps": args.total_timesteps,
+            "callback": metrics_callback.state_dict(),
+        },
+        metric_fn=metrics_callback.checkpoint_metric,
+    )
+    callbacks = [metrics_callback, checkpoint_callback]
+    
+    # Train; --total-timesteps counts the resumed steps too, so the
+    # learning schedules continue where the checkpoint left them
     print("[3] Starting training...")
     print()
     
+    remaining = args.total_timesteps - model.num_timesteps
     try:
-        model.learn(
-            total_timesteps=args.total_timesteps,
-            callback=callbacks,
-            progress_bar=True,
-            tb_log_name=exp_name,
-        )
+        if remaining > 0:
+            model.learn(
+                total_timesteps=remaining,
+                callback=callbacks,
+                progress_bar=True,
+                tb_log_name=exp_name,
+                reset_num_timesteps=False,
+            )
+        else:
+            print(f"    Already at {model.num_timesteps} of {args.total_timesteps} timesteps")
     except KeyboardInterrupt:
         print("\n\nTraining interrupted by user")
+        # Episodes finished since the last rollout end are counted in num_timesteps
+        metrics_callback.flush()
+        checkpoint_callback.save()
+    checkpoints.close()
+    if checkpoints.errors:
+        print(f"    {len(checkpoints.errors)} checkpoint(s) failed to save")
     
     # Save final model
     final_path = os.path.join(args.save_path, f"{exp_name}_final")